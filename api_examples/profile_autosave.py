@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import tempfile
+import popupcad
+from popupcad.filetypes.design import Design
+from popupcad.filetypes.journal import Journal
+
+def timed(function, *args, **kwargs):
+    t0 = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - t0
+
+if __name__=='__main__':
+    filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    sketches = list(design.sketches.values())
+    for ii in range(50):
+        for sketch in sketches:
+            new = sketch.copy(identical=False)
+            new.regen_id()
+            design.sketches[new.id] = new
+
+    folder = tempfile.mkdtemp()
+    journal = Journal(design, folder)
+    start_time = timed(journal.start)[1]
+
+    full_time = timed(design.backup, folder, '_autosave_')[1]
+    sketch = sketches[0]
+    sketch.operationgeometry = sketch.operationgeometry[:]
+    design.operations[-1].customname = 'edited'
+    size = journal.size
+    flush_time = timed(journal.flush)[1]
+    idle_time = timed(journal.flush)[1]
+
+    print('checkpoint: {0:.4f}s'.format(start_time))
+    print('full backup: {0:.4f}s'.format(full_time))
+    print('journal flush after an edit: {0:.4f}s, {1} bytes'.format(flush_time, journal.size - size))
+    print('journal flush with no edits: {0:.4f}s'.format(idle_time))
+    recovered, recover_time = timed(Journal.recover, journal.journal_filename())
+    print('recovery: {0:.4f}s'.format(recover_time))
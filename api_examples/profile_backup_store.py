@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import glob
+import time
+import tempfile
+import popupcad
+from popupcad.filetypes.design import Design
+from popupcad.filetypes.backup_store import BackupStore
+
+def folder_size(folder):
+    filenames = glob.glob(os.path.join(folder, '**', '*'), recursive=True)
+    return sum([os.path.getsize(item) for item in filenames if os.path.isfile(item)])
+
+if __name__=='__main__':
+    filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    count = 20
+
+    full_folder = tempfile.mkdtemp()
+    t0 = time.time()
+    for ii in range(count):
+        design.operations[-1].customname = 'edit {0}'.format(ii)
+        design.save_yaml(design.backup_filename(full_folder, '_{0:03d}_'.format(ii)), update_filename=False)
+    full_time = time.time() - t0
+
+    store_folder = tempfile.mkdtemp()
+    store = BackupStore(store_folder)
+    t0 = time.time()
+    for ii in range(count):
+        design.operations[-1].customname = 'edit {0}'.format(ii)
+        store.backup(design, '_{0:03d}_'.format(ii))
+    store_time = time.time() - t0
+
+    print('{0} backups, one small edit between each'.format(count))
+    print('full copies: {0:.3f}s {1} bytes'.format(full_time, folder_size(full_folder)))
+    print('backup store: {0:.3f}s {1} bytes'.format(store_time, folder_size(store_folder)))
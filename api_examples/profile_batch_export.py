@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import popupcad
+import popupcad.algorithms.batch_export as batch_export
+from popupcad.filetypes.design import Design
+
+if __name__=='__main__':
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    design.reprocessoperations()
+
+    for processes in [1, 4]:
+        popupcad.parallel_processes = processes
+        destination = tempfile.mkdtemp()
+        t0 = time.time()
+        written = batch_export.export_outputs(design, directory=destination)
+        t1 = time.time()
+        print('{0} processes: {1} files in {2:.3f}s'.format(popupcad.algorithms.parallel.num_processes(), len(written), t1 - t0))
+    popupcad.algorithms.parallel.shutdown()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import glob
+import time
+import tempfile
+import yaml
+import popupcad
+import popupcad.filetypes.binary_format as binary_format
+
+def timed(function, *args, **kwargs):
+    t0 = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - t0
+
+if __name__=='__main__':
+    test_files = glob.glob(os.path.join(popupcad.supportfiledir, 'test_files', '*.cad'))
+    folder = tempfile.mkdtemp()
+
+    for filename in test_files:
+        with open(filename, 'r') as f:
+            obj = yaml.load(f, Loader=yaml.FullLoader)
+
+        yaml_file = os.path.join(folder, 'design.cad')
+        binary_file = os.path.join(folder, 'design.cadb')
+        compressed_file = os.path.join(folder, 'design_compressed.cadb')
+
+        def save_yaml():
+            with open(yaml_file, 'w') as f:
+                yaml.dump(obj, f)
+
+        def load_yaml():
+            with open(yaml_file, 'r') as f:
+                return yaml.load(f, Loader=yaml.FullLoader)
+
+        print(os.path.split(filename)[1])
+        for name, save, load, path in [('yaml', save_yaml, load_yaml, yaml_file),
+                                       ('binary', lambda: binary_format.dump(obj, binary_file), lambda: binary_format.load(binary_file), binary_file),
+                                       ('compressed', lambda: binary_format.dump(obj, compressed_file, True), lambda: binary_format.load(compressed_file), compressed_file)]:
+            save_time = timed(save)[1]
+            load_time = timed(load)[1]
+            print('  {0:<10} save: {1:.4f}s load: {2:.4f}s size: {3} bytes'.format(name, save_time, load_time, os.path.getsize(path)))
+        print('  {0:<10} load: {1:.4f}s'.format('lazy', timed(binary_format.load, binary_file, True)[1]))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import sys
+import time
+import numpy
+import popupcad
+from popupcad.geometry.vertex import ShapeVertex
+from popupcad.constraints.constraint_system import ConstraintSystem
+import popupcad.constraints.constraints as constraints
+
+
+def synthetic_sketch(num_squares, squares_per_cluster=None, seed=0, fixed=True):
+    '''
+    rows of unit squares, each held square by horizontal, vertical and distance
+    constraints and joined to the next by a coincident corner. the first square
+    of every cluster is fixed, unless fixed is False. vertex positions start out
+    perturbed.
+    '''
+    if squares_per_cluster is None:
+        squares_per_cluster = num_squares
+    r = numpy.random.RandomState(seed)
+    vertices = []
+    system = ConstraintSystem()
+    previous = None
+    for ii in range(num_squares):
+        x0, y0 = 2 * (ii % squares_per_cluster), 3 * (ii // squares_per_cluster)
+        a, b, c, d = [ShapeVertex(numpy.array(point) + r.rand(2) * .1) for point in [(x0, y0), (x0 + 1, y0), (x0 + 1, y0 + 1), (x0, y0 + 1)]]
+        vertices.extend([a, b, c, d])
+        system.add_constraint(constraints.HorizontalConstraint([a.id, b.id], []))
+        system.add_constraint(constraints.HorizontalConstraint([d.id, c.id], []))
+        system.add_constraint(constraints.VerticalConstraint([a.id, d.id], []))
+        system.add_constraint(constraints.VerticalConstraint([b.id, c.id], []))
+        system.add_constraint(constraints.DistanceConstraint(1., [a.id, b.id], []))
+        system.add_constraint(constraints.DistanceConstraint(1., [a.id, d.id], []))
+        if ii % squares_per_cluster == 0:
+            if fixed:
+                system.add_constraint(constraints.FixedConstraint([a.id], [(x0, y0)]))
+        else:
+            system.add_constraint(constraints.DistanceConstraint(1., [previous.id, a.id], []))
+            system.add_constraint(constraints.HorizontalConstraint([previous.id, a.id], []))
+        previous = b
+    system.get_vertices = lambda: vertices
+    return system, vertices
+
+
+def residual(system):
+    generator = system.generator
+    q = system.inilist(generator.variables, system.ini(None))
+    return abs(generator.residual(q)).max()
+
+
+def svd_shift(system, items):
+    '''the shift made before drags were kept between moves: a full svd of the whole jacobian every move'''
+    generator = system.generator
+    variables = generator.variables
+    ini = system.ini(None)
+    dx = numpy.zeros(len(variables))
+    for vertex, dxdy in items:
+        for key, value in zip(vertex.constraints_ref().variables(), dxdy):
+            dx[generator.var_index[key]] = value
+    x0 = system.inilist(variables, ini)
+    L, S, R = numpy.linalg.svd(generator.j(x0))
+    m = (abs(S) > (abs(S[0]) / 100)).sum()
+    rnull = R[m:]
+    system.set_variables(variables, x0 + rnull.T.dot(rnull.dot(dx)))
+
+
+def drag(system, vertex, shift, moves=20):
+    times = []
+    for ii in range(moves):
+        t0 = time.time()
+        shift(system, [(vertex, (.01, .005))])
+        times.append(time.time() - t0)
+    moved = residual(system)
+    t0 = time.time()
+    system.update([vertex])
+    return numpy.mean(times), max(times), moved, time.time() - t0
+
+if __name__=='__main__':
+    sizes = [int(item) for item in sys.argv[1:]] or [10, 50, 200]
+    for num_squares in sizes:
+        for sparse in [False, True]:
+            popupcad.sparse_constraint_threshold = 0 if sparse else sys.maxsize
+            system, vertices = synthetic_sketch(num_squares)
+            t0 = time.time()
+            generator = system.generator
+            q = system.inilist(generator.variables, system.ini(None))
+            generator.residual(q)
+            generator.j(q)
+            t1 = time.time()
+            system.update()
+            t2 = time.time()
+            print('{0:5d} vertices, {1}: setup {2:.3f}s, solve {3:.3f}s, residual {4:.1e}'.format(len(vertices), 'sparse' if sparse else 'dense ', t1 - t0, t2 - t1, residual(system)))
+
+    popupcad.sparse_constraint_threshold = 200
+    for num_squares in sizes:
+        system, vertices = synthetic_sketch(num_squares, 10)
+        system.update()
+        vertices[-1].shift((.05, .02))
+        t0 = time.time()
+        system.update()
+        t1 = time.time()
+        vertices[-1].shift((.05, .02))
+        system.update([vertices[-1]])
+        t2 = time.time()
+        print('{0:5d} vertices in {1} groups: all {2:.3f}s, touched group only {3:.3f}s'.format(len(vertices), len(system.generator.components()), t1 - t0, t2 - t1))
+
+    for num_squares in sizes:
+        for name, shift in [('svd every move', svd_shift), ('kept drag', ConstraintSystem.constrained_shift)]:
+            system, vertices = synthetic_sketch(num_squares, fixed=False)
+            system.update()
+            mean, worst, moved, release = drag(system, vertices[-2], shift)
+            print('{0:5d} vertices, {1}: {2:.4f}s per move ({3:.4f}s worst), residual while dragging {4:.1e}, release {5:.3f}s, residual {6:.1e}'.format(len(vertices), name, mean, worst, moved, release, residual(system)))
+
+    for num_squares in sizes:
+        for kernels in [False, True]:
+            popupcad.constraint_kernels = kernels
+            system, vertices = synthetic_sketch(num_squares)
+            generator = system.generator
+            q = system.inilist(generator.variables, system.ini(None))
+            t0 = time.time()
+            for ii in range(10):
+                generator.residual(q)
+                generator.sparse_jacobian(q)
+            t1 = time.time()
+            system.update()
+            t2 = time.time()
+            print('{0:5d} vertices, {1}: residual and jacobian {2:.4f}s, solve {3:.3f}s'.format(len(vertices), 'kernels ' if kernels else 'compiled', (t1 - t0) / 10, t2 - t1))
+    popupcad.constraint_kernels = True
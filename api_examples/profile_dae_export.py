@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import glob
+import tempfile
+import numpy
+import collada
+import popupcad
+from popupcad.filetypes.design import Design
+from popupcad.filetypes.genericshapes import GenericPoly
+
+def per_shape_dae(generic, filename):
+    '''the previous layout: an effect, material, geometry and node for every shape'''
+    mesh = collada.Collada()
+    nodes = []
+    for layer in generic.layers():
+        z = generic.layerdef.z_values[layer]
+        for s in generic.geoms[layer]:
+            if not isinstance(s, GenericPoly):
+                continue
+            vertices = numpy.array(s.extrudeVertices(layer.thickness, z0=z)) / popupcad.SI_length_scaling
+            source = collada.source.FloatSource('array' + str(s.id), vertices, ('X', 'Y', 'Z'))
+            geom = collada.geometry.Geometry(mesh, 'geometry-' + str(s.id), str(generic.id), [source])
+            input_list = collada.source.InputList()
+            input_list.addInput(0, 'VERTEX', '#array' + str(s.id))
+            triset = geom.createTriangleSet(numpy.arange(len(vertices) // 3), input_list, 'materialref' + str(s.id))
+            triset.generateNormals()
+            geom.primitives.append(triset)
+            mesh.geometries.append(geom)
+            effect = collada.material.Effect('effect', [], 'phong', diffuse=(1, 0, 0), specular=(0, 1, 0))
+            mat = collada.material.Material('material', 'mymaterial' + str(s.id), effect)
+            mesh.effects.append(effect)
+            mesh.materials.append(mat)
+            matnode = collada.scene.MaterialNode('materialref' + str(s.id), mat, inputs=[])
+            nodes.append(collada.scene.Node('node' + str(s.id), children=[collada.scene.GeometryNode(geom, [matnode])]))
+    scene = collada.scene.Scene('myscene', nodes)
+    mesh.scenes.append(scene)
+    mesh.scene = scene
+    mesh.write(filename)
+
+def links():
+    '''every output of the test designs, each appearing twice in different places, as a stand in for a robot's links'''
+    links = []
+    for name in ['basic_operations.cad', 'pendulum.cad']:
+        design = Design.load_yaml(os.path.join(popupcad.supportfiledir, 'test_files', name))
+        design.reprocessoperations()
+        for operation in design.operations:
+            for output in operation.output:
+                generic = output.generic_laminate()
+                if generic.all_geoms():
+                    links.append(generic)
+                    links.append(generic.copy(identical=False).shift((100., 50.)))
+    return links
+
+def folder_size(folder):
+    return sum([os.path.getsize(item) for item in glob.glob(os.path.join(folder, '*'))])
+
+if __name__=='__main__':
+    generics = links()
+    for generic in generics:
+        generic.toDAE(directory=tempfile.mkdtemp())
+
+    folder = tempfile.mkdtemp()
+    t0 = time.time()
+    for ii, generic in enumerate(generics):
+        per_shape_dae(generic, os.path.join(folder, '{0:d}.dae'.format(ii)))
+    t1 = time.time()
+    print('one material and geometry per shape: {0:d} files, {1:.1f}kB, {2:.3f}s'.format(len(generics), folder_size(folder) / 1e3, t1 - t0))
+
+    folder = tempfile.mkdtemp()
+    t0 = time.time()
+    for generic in generics:
+        generic.toDAE(directory=folder, centered=True)
+    t1 = time.time()
+    print('one geometry per layer, shared meshes: {0:d} files, {1:.1f}kB, {2:.3f}s'.format(len(glob.glob(os.path.join(folder, '*'))), folder_size(folder) / 1e3, t1 - t0))
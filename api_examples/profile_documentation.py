@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import popupcad
+from popupcad.filetypes.design import Design
+
+if __name__=='__main__':
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    design.reprocessoperations()
+    destination = tempfile.mkdtemp()
+
+    t0 = time.time()
+    design.build_documentation(destination)
+    t1 = time.time()
+    print('first build: {0:.3f}s'.format(t1 - t0))
+
+    design.build_documentation(destination)
+    t2 = time.time()
+    print('unchanged: {0:.3f}s'.format(t2 - t1))
+
+    design.operations[-1].customname = 'renamed'
+    design.build_documentation(destination)
+    t3 = time.time()
+    print('last operation changed: {0:.3f}s'.format(t3 - t2))
+    popupcad.algorithms.parallel.shutdown()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy
+import ezdxf
+from popupcad.algorithms import spline_functions
+from popupcad.filetypes.dxfimport import DXFImport
+
+def make_dxf(filename, num_splines=2000, num_lines=2000):
+    '''writes a dxf full of random splines, lines and polylines across a few layers'''
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    random = numpy.random.RandomState(0)
+    for ii in range(num_splines):
+        points = (random.rand(8, 2) * 10 + ii % 100).tolist()
+        msp.add_open_spline(points, degree=3, dxfattribs={'layer': 'splines%d' % (ii % 3)})
+    for ii in range(num_lines):
+        start, end = (random.rand(2, 2) * 100).tolist()
+        msp.add_line(start, end, dxfattribs={'layer': 'lines'})
+        msp.add_lwpolyline((random.rand(5, 2) * 100).tolist(), close=ii % 2 == 0, dxfattribs={'layer': 'polylines'})
+    doc.saveas(filename)
+
+def evaluate_pointwise(importer):
+    '''evaluates each spline on its own through the recursive basis functions'''
+    for entity in importer.entities():
+        if entity.dxftype() == 'SPLINE':
+            control_points, knots, weights = importer.spline_data(entity)
+            n = len(control_points) - 1
+            domain = spline_functions.make_domain(knots, n * 5)
+            y = spline_functions.calc_spline(knots, n, weights, domain)
+            (y.dot(numpy.array(control_points)).T / y.sum(1)).T
+
+if __name__=='__main__':
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(tempfile.mkdtemp(), 'profile.dxf')
+        make_dxf(filename)
+
+    importer = DXFImport(filename)
+    t0 = time.time()
+    importer.read()
+    t1 = time.time()
+    print(importer.report())
+    print('import: {0:.3f}s'.format(t1 - t0))
+
+    t0 = time.time()
+    evaluate_pointwise(importer)
+    t1 = time.time()
+    print('reading and evaluating splines point by point: {0:.3f}s'.format(t1 - t0))
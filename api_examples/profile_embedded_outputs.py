@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import tempfile
+import popupcad
+from popupcad.filetypes.design import Design
+
+def timed(function, *args, **kwargs):
+    t0 = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - t0
+
+if __name__=='__main__':
+    filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    popupcad.embed_outputs = True
+    design = Design.load_yaml(filename)
+    design.reprocessoperations()
+    folder = tempfile.mkdtemp()
+
+    for extension in ['.cad', '.cadb']:
+        plain = os.path.join(folder, 'plain' + extension)
+        embedded = os.path.join(folder, 'embedded' + extension)
+        design.save_yaml(plain, update_filename=False, embed_outputs=False)
+        design.save_yaml(embedded, update_filename=False, embed_outputs=True)
+
+        loaded, load_time = timed(Design.load_yaml, plain)
+        regen_time = timed(loaded.reprocessoperations)[1]
+        loaded, embedded_time = timed(Design.load_yaml, embedded)
+        missing = [op for op in loaded.operations if not hasattr(op, 'output')]
+        print(extension)
+        print('  load and regenerate: {0:.4f}s, {1} bytes'.format(load_time + regen_time, os.path.getsize(plain)))
+        print('  load embedded: {0:.4f}s, {1} bytes, {2} operations left to regenerate'.format(embedded_time, os.path.getsize(embedded), len(missing)))
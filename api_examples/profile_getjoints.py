@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import time
+import numpy
+import popupcad
+
+if __name__=='__main__':
+
+    for num_points in [100,1000,5000]:
+        points = numpy.random.rand(num_points,2)*100
+        triangles = popupcad.algorithms.triangulate.triangulate(points)
+        num_segments = 3*len(triangles)
+
+        t0 = time.time()
+        generic_lines = popupcad.algorithms.getjoints.getjoints(triangles,5)
+        t1 = time.time()
+        print('segments:',num_segments,'shared edges:',len(generic_lines),'time:',t1-t0)
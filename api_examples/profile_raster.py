@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import popupcad
+import popupcad.algorithms.raster as raster
+from popupcad.filetypes.design import Design
+
+if __name__=='__main__':
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    design.reprocessoperations()
+
+    for dpi in [150, 600]:
+        for processes in [1, 4]:
+            popupcad.parallel_processes = processes
+            destination = tempfile.mkdtemp()
+            t0 = time.time()
+            written = raster.raster_outputs(design, destination, dpi=dpi, separate_layers=True)
+            t1 = time.time()
+            print('{0} dpi, {1} processes: {2} images in {3:.3f}s'.format(dpi, popupcad.algorithms.parallel.num_processes(), len(written), t1 - t0))
+    popupcad.algorithms.parallel.shutdown()
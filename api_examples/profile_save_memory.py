@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import tempfile
+import threading
+import tracemalloc
+import yaml
+import popupcad
+from popupcad.filetypes.design import Design
+
+def rss():
+    '''resident set size in bytes, where /proc is available'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        return 0
+
+def measure(function):
+    '''returns the time taken and the peak rss and python allocations above the starting point'''
+    peak = [rss()]
+    running = [True]
+
+    def sample():
+        while running[0]:
+            peak[0] = max(peak[0], rss())
+            time.sleep(.001)
+
+    start_rss = peak[0]
+    thread = threading.Thread(target=sample)
+    thread.start()
+    tracemalloc.start()
+    t0 = time.time()
+    function()
+    t1 = time.time()
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    running[0] = False
+    thread.join()
+    return t1 - t0, peak[0] - start_rss, allocated
+
+if __name__=='__main__':
+    filename = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+    design = Design.load_yaml(filename)
+    sketches = list(design.sketches.values())
+    for ii in range(50):
+        for sketch in sketches:
+            new = sketch.copy(identical=False)
+            new.regen_id()
+            design.sketches[new.id] = new
+    design.reprocessoperations()
+
+    destination = os.path.join(tempfile.mkdtemp(), 'design.cad')
+
+    def save_copy():
+        with open(destination, 'w') as f:
+            yaml.dump(design.copy(), f)
+
+    def save_live():
+        design.save_yaml(destination, update_filename=False)
+
+    for name, function in [('direct', save_live), ('copy then dump', save_copy)]:
+        duration, rss_increase, allocated = measure(function)
+        print('{0:<15} time: {1:.3f}s peak rss increase: {2:.1f}MB peak python allocations: {3:.1f}MB'.format(name, duration, rss_increase / 1e6, allocated / 1e6))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import sys
+import time
+import numpy
+import popupcad
+from popupcad.filetypes.solidworksimport import Assembly, Component, Face
+
+
+def rotation(angle, offset=(0, 0, 0)):
+    T = numpy.eye(4)
+    T[:2, :2] = [[numpy.cos(angle), -numpy.sin(angle)], [numpy.sin(angle), numpy.cos(angle)]]
+    T[:3, 3] = offset
+    return T.tolist()
+
+
+def synthetic_assembly(num_components=100, num_faces=20, seed=0):
+    '''an assembly of plates, each face a square with a round hole, as the solidworks macro would export it'''
+    r = numpy.random.RandomState(seed)
+    t = numpy.linspace(0, 2 * numpy.pi, 64, endpoint=False)
+    assembly = Assembly()
+    assembly.transform = rotation(.3)
+    assembly.components = []
+    for ii in range(num_components):
+        component = Component()
+        component.name = 'part{0:d}'.format(ii)
+        component.transform = rotation(r.rand() * 2 * numpy.pi, r.rand(3) * .5)
+        component.faces = []
+        for jj in range(num_faces):
+            x0, y0 = r.rand(2) * .1
+            w = .01 + r.rand() * .01
+            face = Face()
+            face.loops = [[[x0, y0, 0], [x0 + w, y0, 0], [x0 + w, y0 + w, 0], [x0, y0 + w, 0]],
+                          numpy.c_[x0 + w / 2 + w / 4 * numpy.cos(t), y0 + w / 2 + w / 4 * numpy.sin(t), t * 0].tolist()]
+            component.faces.append(face)
+        assembly.components.append(component)
+    return assembly
+
+if __name__=='__main__':
+    num_components = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    assembly = synthetic_assembly(num_components)
+    for processes in [1, 4]:
+        popupcad.parallel_processes = processes
+        t0 = time.time()
+        assembly._convert(1., 1e-3, .1, 0., .01)
+        t1 = time.time()
+        print('{0} processes: {1} shapes in {2:.3f}s'.format(popupcad.algorithms.parallel.num_processes(), len(assembly.geoms), t1 - t0))
+    print(assembly.report())
+    popupcad.algorithms.parallel.shutdown()
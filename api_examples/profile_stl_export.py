@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import tempfile
+import numpy
+import popupcad
+import popupcad.algorithms.mesh as mesh
+from popupcad.filetypes.genericlaminate import GenericLaminate
+from popupcad.filetypes.genericshapes import GenericPoly
+from popupcad.filetypes.layerdef import LayerDef
+from popupcad.filetypes.material2 import default_sublaminate
+
+def make_laminate(polygons_per_layer=80, points_per_polygon=100):
+    '''a laminate of many round polygons with holes on every layer'''
+    layerdef = LayerDef(*default_sublaminate)
+    theta = numpy.linspace(0, 2 * numpy.pi, points_per_polygon, endpoint=False)
+    circle = numpy.c_[numpy.cos(theta), numpy.sin(theta)]
+    geoms = {}
+    for layer in layerdef.layers:
+        geoms[layer] = []
+        for ii in range(polygons_per_layer):
+            center = numpy.r_[ii % 20, ii // 20] * 3
+            exterior = (circle + center).tolist()
+            interior = (circle[::-1] * .5 + center).tolist()
+            geoms[layer].append(GenericPoly.gen_from_point_lists(exterior, [interior]))
+    return GenericLaminate(layerdef, geoms)
+
+if __name__=='__main__':
+    generic = make_laminate()
+    filename = os.path.join(tempfile.mkdtemp(), 'laminate.stl')
+
+    t0 = time.time()
+    triangles = mesh.laminate_triangles(generic)
+    t1 = time.time()
+    print('triangulating and building {0} triangles: {1:.3f}s'.format(len(triangles), t1 - t0))
+
+    for binary in [True, False]:
+        t0 = time.time()
+        generic.toSTL(filename, binary)
+        t1 = time.time()
+        print('toSTL, binary={0}, triangulation cached: {1:.3f}s, {2:.1f}MB'.format(binary, t1 - t0, os.path.getsize(filename) / 1e6))
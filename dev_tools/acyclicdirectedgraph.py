@@ -17,6 +17,12 @@ class Node(object):
         self.id = id(self)
         self.network = None
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if 'network' in state:
+            state['network'] = None
+        return state
+
     def setnetwork(self, network):
         self.network = network
 
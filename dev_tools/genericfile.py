@@ -9,6 +9,32 @@ import qt
 import qt.QtCore as qc
 import qt.QtGui as qg
 import os
+import contextlib
+
+@contextlib.contextmanager
+def atomic_write(filename, mode='w'):
+    '''writes to a temporary file in the destination folder, which replaces filename only once it is complete'''
+    import tempfile
+    import stat
+    filename = os.path.abspath(filename)
+    directory, basename = os.path.split(filename)
+    fd, tempname = tempfile.mkstemp(prefix='.' + basename + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(filename):
+            os.chmod(tempname, stat.S_IMODE(os.stat(filename).st_mode))
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tempname, 0o666 & ~umask)
+        os.replace(tempname, filename)
+    except BaseException:
+        if os.path.exists(tempname):
+            os.remove(tempname)
+        raise
 
 class FileMissing(Exception):
 
@@ -80,6 +106,15 @@ class GenericFile(object):
     def get_parent_program_version(self):
         return None
 
+    @classmethod
+    def get_file_format_version(self):
+        return None
+
+    def is_current(self):
+        '''whether the file was written in the current file format, and needs no upgrade'''
+        current = self.get_file_format_version()
+        return current is not None and getattr(self, 'file_format_version', None) == current
+
     def copy_file_params(self, new, identical):
         try:
             new.dirname = self.dirname
@@ -183,15 +218,22 @@ class GenericFile(object):
         except AttributeError:
             raise NoFileName()
 
+    def save_state(self, identical=True):
+        '''returns the object to write when saving. when ids are kept, this is
+        the live object itself, and transient data is left out by __getstate__.'''
+        if identical:
+            return self
+        return self.copy(identical)
+
     def save_yaml(self, filename, identical=True, update_filename=True):
-        import yaml
+        import dev_tools.streamingyaml as streamingyaml
         if update_filename:
             self.updatefilename(filename)
         self.parent_program_name = self.get_parent_program_name()
         self.parent_program_version = self.get_parent_program_version()
-        new = self.copy(identical)
-        with open(filename, 'w') as f:
-            yaml.dump(new, f)
+        self.file_format_version = self.get_file_format_version()
+        with atomic_write(filename, 'w') as f:
+            streamingyaml.dump(self.save_state(identical), f)
         return True
 
     def __str__(self):
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import yaml
+from yaml.events import StreamStartEvent, StreamEndEvent, DocumentStartEvent, DocumentEndEvent, AliasEvent, ScalarEvent, SequenceStartEvent, SequenceEndEvent, MappingStartEvent, MappingEndEvent
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+
+
+class Deferred(object):
+    '''stands in for a child object while its parent is being represented'''
+    __slots__ = ['data']
+
+    def __init__(self, data):
+        self.data = data
+
+
+class StreamingDumper(yaml.Dumper):
+    '''produces the same document as yaml.Dumper, but emits events while it
+    walks the object graph instead of representing the whole graph as nodes
+    first, so memory use does not grow with the size of the document.
+    objects referenced more than once are found in a first pass.'''
+
+    def represent_data(self, data):
+        return Deferred(data)
+
+    def represent_shallow(self, data):
+        '''represents data with its children left as Deferred placeholders'''
+        self.alias_key = None
+        data_types = type(data).__mro__
+        if data_types[0] in self.yaml_representers:
+            return self.yaml_representers[data_types[0]](self, data)
+        for data_type in data_types:
+            if data_type in self.yaml_multi_representers:
+                return self.yaml_multi_representers[data_type](self, data)
+        if None in self.yaml_multi_representers:
+            return self.yaml_multi_representers[None](self, data)
+        if None in self.yaml_representers:
+            return self.yaml_representers[None](self, data)
+        return ScalarNode(None, str(data))
+
+    @staticmethod
+    def children(node):
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, Deferred):
+                yield item.data
+            elif isinstance(item, SequenceNode):
+                stack.extend(item.value[::-1])
+            elif isinstance(item, MappingNode):
+                for key, value in item.value[::-1]:
+                    stack.append(value)
+                    stack.append(key)
+
+    def count_references(self, data):
+        self.counts = {}
+        self.keep = []
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if self.ignore_aliases(item):
+                continue
+            key = id(item)
+            if key in self.counts:
+                self.counts[key] += 1
+                continue
+            self.counts[key] = 1
+            self.keep.append(item)
+            stack.extend(self.children(self.represent_shallow(item)))
+
+    def stream_data(self, data):
+        anchor = None
+        if not self.ignore_aliases(data) and self.counts.get(id(data), 0) > 1:
+            key = id(data)
+            if key in self.anchors:
+                self.emit(AliasEvent(self.anchors[key]))
+                return
+            self.last_anchor_id += 1
+            anchor = self.ANCHOR_TEMPLATE % self.last_anchor_id
+            self.anchors[key] = anchor
+        self.stream_node(self.represent_shallow(data), anchor)
+
+    def stream_node(self, node, anchor=None):
+        if isinstance(node, Deferred):
+            self.stream_data(node.data)
+        elif isinstance(node, ScalarNode):
+            detected_tag = self.resolve(ScalarNode, node.value, (True, False))
+            default_tag = self.resolve(ScalarNode, node.value, (False, True))
+            implicit = (node.tag == detected_tag), (node.tag == default_tag)
+            self.emit(ScalarEvent(anchor, node.tag, implicit, node.value, style=node.style))
+        elif isinstance(node, SequenceNode):
+            implicit = (node.tag == self.resolve(SequenceNode, node.value, True))
+            self.emit(SequenceStartEvent(anchor, node.tag, implicit, flow_style=node.flow_style))
+            for item in node.value:
+                self.stream_node(item)
+            self.emit(SequenceEndEvent())
+        elif isinstance(node, MappingNode):
+            implicit = (node.tag == self.resolve(MappingNode, node.value, True))
+            self.emit(MappingStartEvent(anchor, node.tag, implicit, flow_style=node.flow_style))
+            for key, value in node.value:
+                self.stream_node(key)
+                self.stream_node(value)
+            self.emit(MappingEndEvent())
+
+    def dump_document(self, data):
+        self.count_references(data)
+        self.anchors = {}
+        self.emit(StreamStartEvent(encoding=self.use_encoding))
+        self.emit(DocumentStartEvent(explicit=self.use_explicit_start, version=self.use_version, tags=self.use_tags))
+        self.stream_data(data)
+        self.emit(DocumentEndEvent(explicit=self.use_explicit_end))
+        self.emit(StreamEndEvent())
+        self.counts = {}
+        self.keep = []
+        self.anchors = {}
+
+
+def dump(data, stream):
+    '''writes data to stream as yaml.dump would'''
+    dumper = StreamingDumper(stream)
+    try:
+        dumper.dump_document(data)
+    finally:
+        dumper.dispose()
@@ -6,6 +6,7 @@ Please see LICENSE for full license.
 """
 
 import sys
+import multiprocessing
 import qt.QtCore as qc
 import qt.QtGui as qg
 
@@ -14,8 +15,11 @@ import sympy
 #must import pyqtgraph before creating app
 import pyqtgraph
 
-app = qg.QApplication([sys.argv[0]])
-import popupcad
-program = popupcad.filetypes.program.Program(app, *sys.argv)
-app.exec_()
-sys.exit()
\ No newline at end of file
+if __name__ == '__main__':
+    #worker processes re-import this module where multiprocessing spawns them, and must not start another editor
+    multiprocessing.freeze_support()
+    app = qg.QApplication([sys.argv[0]])
+    import popupcad
+    program = popupcad.filetypes.program.Program(app, *sys.argv)
+    app.exec_()
+    sys.exit()
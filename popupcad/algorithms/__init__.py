@@ -4,20 +4,28 @@ Written by Daniel M. Aukes and CONTRIBUTORS
 Email: danaukes<at>asu.edu.
 Please see LICENSE for full license.
 """
+from . import batch_export
 from . import body_detection
 from . import csg_shapely
 from . import design_documentation
+from . import fingerprint
 from . import getjoints
 from . import keepout
 from . import manufacturing_functions
+from . import mesh
+from . import mass_properties
 from . import minimal_enclosing_circle
 from . import modify_device
 from . import morphology
+from . import parallel
 from . import points
 from . import python_syntax_formatter
+from . import raster
 from . import removability
 from . import spline_functions
 from . import toolclearance
 from . import triangulate
+from . import triangulation_engine
+from . import vertex_index
 from . import web
 
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import popupcad
+import popupcad.algorithms.parallel
+
+formats = ('dxf', 'svg')
+
+
+class Recorder(object):
+    '''
+    stands in for an ezdxf modelspace, recording what each shape's output_dxf
+    would draw as plain lists which can be sent to a worker process
+    '''
+
+    def __init__(self):
+        self.entities = []
+
+    @staticmethod
+    def point(point):
+        return float(point[0]), float(point[1])
+
+    def add_lwpolyline(self, points, dxfattribs=None):
+        dxfattribs = dict(dxfattribs or {})
+        closed = dxfattribs.pop('closed', False)
+        self.entities.append(('lwpolyline', [self.point(point) for point in points], closed))
+
+    def add_point(self, point, dxfattribs=None):
+        self.entities.append(('point', [self.point(point)], False))
+
+
+def layer_entities(geoms):
+    recorder = Recorder()
+    for item in geoms:
+        if not item.is_construction():
+            item.output_dxf(recorder)
+    return recorder.entities
+
+
+def layer_name(ii, layer):
+    return '{:03.0f}_'.format(ii) + layer.name
+
+
+def laminate_tasks(basename, generic, formats=formats, directory=None, separate_layers=True):
+    '''
+    the files needed to export a generic laminate. each task holds everything
+    needed to write one file, so that tasks can be written in any process.
+    '''
+    if directory is None:
+        directory = popupcad.exportdir
+    layers = [(layer_name(ii, layer), layer_entities(generic.geoms[layer])) for ii, layer in enumerate(generic.layerdef.layers)]
+    tasks = []
+    if 'dxf' in formats:
+        if separate_layers:
+            for name, entities in layers:
+                filename = os.path.normpath(os.path.join(directory, basename + '_' + name + '.dxf'))
+                tasks.append(('dxf', filename, [(name, entities)]))
+        else:
+            filename = os.path.normpath(os.path.join(directory, basename + '.dxf'))
+            tasks.append(('dxf', filename, layers))
+    if 'svg' in formats:
+        for ii, (name, entities) in enumerate(layers):
+            filename = os.path.normpath(os.path.join(directory, basename + '_layer{0:02d}.svg'.format(ii + 1)))
+            tasks.append(('svg', filename, [(name, entities)]))
+    return tasks
+
+
+def write_dxf(filename, layers):
+    import ezdxf
+    dwg = ezdxf.new('AC1015')
+    msp = dwg.modelspace()
+    for name, entities in layers:
+        dwg.layers.new(name=name)
+        for kind, points, closed in entities:
+            if kind == 'point':
+                msp.add_point(points[0], dxfattribs={'layer': name})
+            else:
+                msp.add_lwpolyline(points, dxfattribs={'layer': name, 'closed': closed})
+    dwg.saveas(filename)
+
+
+def write_svg(filename, layers, stroke_width=.025):
+    '''
+    writes the layers as an svg in millimeters, so that it opens at the right
+    size in any program without the scaling the Qt renderer needs
+    '''
+    all_points = [point for name, entities in layers for kind, points, closed in entities for point in points]
+    if all_points:
+        xs, ys = zip(*all_points)
+        x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+    else:
+        x0 = x1 = y0 = y1 = 0.
+    margin = stroke_width
+    x0, y0, x1, y1 = x0 - margin, y0 - margin, x1 + margin, y1 + margin
+    width, height = x1 - x0, y1 - y0
+
+    def transform(point):
+        if popupcad.flip_y:
+            return point[0], y0 + y1 - point[1]
+        return point
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{0!r}mm" height="{1!r}mm" viewBox="{2!r} {3!r} {0!r} {1!r}">'.format(width, height, x0, y0)]
+    for name, entities in layers:
+        lines.append('<g id="{0}" fill="none" stroke="black" stroke-width="{1!r}">'.format(name, stroke_width))
+        for kind, points, closed in entities:
+            points = [transform(point) for point in points]
+            if kind == 'point':
+                lines.append('<circle cx="{0!r}" cy="{1!r}" r="{2!r}"/>'.format(points[0][0], points[0][1], stroke_width))
+            else:
+                path = 'M' + ' L'.join(['{0!r},{1!r}'.format(*point) for point in points])
+                if closed:
+                    path += ' Z'
+                lines.append('<path d="{0}"/>'.format(path))
+        lines.append('</g>')
+    lines.append('</svg>')
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def write_task(task):
+    '''writes one file. module level, so that it can run in a worker process.'''
+    file_format, filename, layers = task
+    if file_format == 'dxf':
+        write_dxf(filename, layers)
+    elif file_format == 'svg':
+        write_svg(filename, layers)
+    else:
+        raise ValueError('unknown export format: ' + str(file_format))
+    return filename
+
+
+def export_laminates(items, formats=formats, directory=None, separate_layers=True):
+    '''
+    exports a list of (basename, generic laminate) pairs in each of the given
+    formats, writing the files in parallel. returns the files written.
+    '''
+    if directory is None:
+        directory = popupcad.exportdir
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tasks = []
+    for basename, generic in items:
+        tasks.extend(laminate_tasks(basename, generic, formats, directory, separate_layers))
+    return popupcad.algorithms.parallel.map_parallel(write_task, tasks)
+
+
+def output_basename(design, operation, output_index):
+    basename = design.get_basename() + '_' + str(operation)
+    if output_index > 0:
+        basename += '_output{0:d}'.format(output_index)
+    return basename
+
+
+def export_outputs(design, indices=None, formats=formats, directory=None, separate_layers=True):
+    '''
+    exports operation outputs of a design, given as (operation index, output
+    index) pairs. every output of every operation is exported if indices is None.
+    '''
+    if indices is None:
+        indices = [(ii, jj) for ii, operation in enumerate(design.operations) for jj in range(len(operation.output))]
+    items = []
+    for ii, jj in indices:
+        operation = design.operations[ii]
+        items.append((output_basename(design, operation, jj), operation.output[jj].generic_laminate()))
+    return export_laminates(items, formats, directory, separate_layers)
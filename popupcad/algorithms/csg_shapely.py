@@ -104,3 +104,59 @@ def unary_union_safe(listin):
         except IndexError:
             #            return sg.GeometryCollection()
             raise
+
+def pack_entities(entities):
+    '''packs points, linestrings and polygons into flat coordinate arrays,
+    returned as a dict of bytes which both yaml and the binary format store compactly'''
+    import numpy
+    types = []
+    rings = []
+    counts = []
+    coords = []
+    for entity in entities:
+        if isinstance(entity, sg.Polygon):
+            types.append(2)
+            entity_rings = [entity.exterior] + list(entity.interiors)
+        elif isinstance(entity, sg.LineString):
+            types.append(1)
+            entity_rings = [entity]
+        elif isinstance(entity, sg.Point):
+            types.append(0)
+            entity_rings = [entity]
+        else:
+            raise GeometryNotHandled()
+        rings.append(len(entity_rings))
+        for ring in entity_rings:
+            ring_coords = numpy.asarray(ring.coords, dtype='<f8')[:, :2]
+            counts.append(len(ring_coords))
+            coords.append(ring_coords)
+    if coords:
+        coords = numpy.concatenate(coords)
+    else:
+        coords = numpy.zeros((0, 2), dtype='<f8')
+    return {'types': numpy.array(types, dtype='<i1').tobytes(),
+            'rings': numpy.array(rings, dtype='<i4').tobytes(),
+            'counts': numpy.array(counts, dtype='<i4').tobytes(),
+            'coords': coords.tobytes()}
+
+def unpack_entities(packed):
+    '''rebuilds the entities packed by pack_entities'''
+    import numpy
+    types = numpy.frombuffer(packed['types'], dtype='<i1')
+    rings = numpy.frombuffer(packed['rings'], dtype='<i4')
+    counts = numpy.frombuffer(packed['counts'], dtype='<i4')
+    coords = numpy.frombuffer(packed['coords'], dtype='<f8').reshape(-1, 2)
+    ends = numpy.cumsum(counts)
+    starts = ends - counts
+    entities = []
+    ring_index = 0
+    for entity_type, ring_count in zip(types.tolist(), rings.tolist()):
+        entity_rings = [coords[starts[ii]:ends[ii]] for ii in range(ring_index, ring_index + ring_count)]
+        ring_index += ring_count
+        if entity_type == 2:
+            entities.append(sg.Polygon(entity_rings[0], entity_rings[1:]))
+        elif entity_type == 1:
+            entities.append(sg.LineString(entity_rings[0]))
+        else:
+            entities.append(sg.Point(entity_rings[0][0]))
+    return entities
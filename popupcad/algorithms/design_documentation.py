@@ -5,6 +5,8 @@ Email: danaukes<at>asu.edu.
 Please see LICENSE for full license.
 """
 import os
+import popupcad.algorithms.parallel
+from popupcad.algorithms import raster
 
 template = \
 '''---
@@ -12,33 +14,64 @@ template = \
 ---
 '''
 
-def process_output(output, filename_in, destination):
+manifest_filename = 'documentation.json'
+image_formats = ('png', 'svg')
 
-    generic = output.csg.to_generic_laminate()
+def load_manifest(destination):
+    '''the fingerprint each image in a documentation folder was rendered from'''
+    import json
+    try:
+        with open(os.path.join(destination, manifest_filename), 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
 
-    png_image_file = generic.raster(filename_in,'png',destination)
-    png_image_file = os.path.split(png_image_file)[1]
-
-    svg_image_file = generic.to_svg(filename_in+'.svg',destination)
-    svg_image_file = os.path.split(svg_image_file)[1]
+def save_manifest(destination, manifest):
+    import json
+    from dev_tools.genericfile import atomic_write
+    with atomic_write(os.path.join(destination, manifest_filename), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
 
+def process_output(output, filename_in, destination, fingerprint=None, manifest=None, tasks=None):
+    '''
+    describes one output. its images are only rendered again if they are
+    missing or were rendered from a different fingerprint. the rendering is
+    added to tasks when given, to be done later, and done right away if not.
+    '''
+    if manifest is None:
+        manifest = {}
     name = str(output)
 
     output_dict = {}
-    output_dict['name'] = name 
-    output_dict['svg_image_file'] = svg_image_file 
-    output_dict['png_image_file'] = png_image_file 
-    output_dict['description'] = output.description 
+    output_dict['name'] = name
+    output_dict['description'] = output.description
     output_dict['cut_files'] = ['cut-dummy1.svg','cut-dummy2.svg']
+
+    new_tasks = []
+    generic = None
+    for filetype in image_formats:
+        image_file = filename_in + '.' + filetype
+        output_dict[filetype + '_image_file'] = image_file
+        stale = fingerprint is None or manifest.get(image_file) != fingerprint or not os.path.exists(os.path.join(destination, image_file))
+        if stale:
+            if generic is None:
+                generic = output.csg.to_generic_laminate()
+            new_tasks.extend(raster.laminate_tasks(filename_in, generic, destination, filetype))
+            manifest[image_file] = fingerprint
+
+    if tasks is None:
+        popupcad.algorithms.parallel.map_parallel(raster.render_task, new_tasks)
+    else:
+        tasks.extend(new_tasks)
     return output_dict
 
-def process_operation(operation, ii, destination):
+def process_operation(operation, ii, destination, fingerprint=None, manifest=None, tasks=None):
     name = str(operation)
 
     outputs = []
     for jj, out in enumerate(operation.output):
         filename = '{0:02.0f}_{1:02.0f}'.format(ii, jj)
-        outputs.append(process_output(out, filename, destination))
+        outputs.append(process_output(out, filename, destination, fingerprint, manifest, tasks))
 
     output = {}
     output['name'] = name
@@ -51,8 +84,28 @@ def process_operation(operation, ii, destination):
     return output
     
 def process_design(design,subdir,slugified_name):
+    '''
+    describes a design, rendering the images of any output whose operation
+    has changed since the documentation in subdir was last built. the images
+    of all operations are rendered together, in parallel.
+    '''
     title = slugified_name
-    operations = [process_operation(operation, ii, subdir) for ii, operation in enumerate(design.operations)]
+    fingerprints = design.operation_fingerprints()
+    previous = load_manifest(subdir)
+    manifest = dict(previous)
+    tasks = []
+    operations = [process_operation(operation, ii, subdir, fingerprints[operation.id], manifest, tasks) for ii, operation in enumerate(design.operations)]
+    popupcad.algorithms.parallel.map_parallel(raster.render_task, tasks)
+
+    current = set()
+    for item in operations + [output for operation in operations for output in operation['outputs']]:
+        current.update([item['png_image_file'], item['svg_image_file']])
+    for key in set(manifest) - current:
+        del manifest[key]
+        if os.path.exists(os.path.join(subdir, key)):
+            os.remove(os.path.join(subdir, key))
+    if manifest != previous:
+        save_manifest(subdir, manifest)
 
     ii = design.operation_index(design.main_operation[0])
 
@@ -71,4 +124,17 @@ def format_template(design_dict):
     import yaml
     output = template.format(yaml.dump(design_dict))
     return output
+
+def write_if_changed(filename, text):
+    '''writes text to filename unless the file already holds exactly that. returns whether it was written.'''
+    try:
+        with open(filename, 'r') as f:
+            if f.read() == text:
+                return False
+    except IOError:
+        pass
+    from dev_tools.genericfile import atomic_write
+    with atomic_write(filename, 'w') as f:
+        f.write(text)
+    return True
     
\ No newline at end of file
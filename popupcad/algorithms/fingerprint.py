@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import hashlib
+import numpy
+import popupcad.filetypes.binary_format as binary_format
+
+
+class Fingerprinter(object):
+    '''
+    hashes the content of an object graph, the same way for a live object as
+    for one loaded back from any file format. dictionaries and sets are hashed
+    independent of their order, and shared objects the same as copies.
+    '''
+
+    def __init__(self):
+        self.memo = {}
+        self.keep = []
+        self.active = set()
+
+    def digest(self, obj):
+        if isinstance(obj, binary_format.scalar_types):
+            return self.hash(type(obj).__name__, repr(obj))
+        key = id(obj)
+        try:
+            return self.memo[key]
+        except KeyError:
+            pass
+        if key in self.active:
+            return self.hash('cycle')
+        self.active.add(key)
+        try:
+            result = self.digest_object(obj)
+        finally:
+            self.active.discard(key)
+        self.memo[key] = result
+        self.keep.append(obj)
+        return result
+
+    def hexdigest(self, obj):
+        return self.digest(obj).hex()
+
+    @staticmethod
+    def hash(*parts):
+        h = hashlib.sha1()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            h.update(len(part).to_bytes(8, 'little'))
+            h.update(part)
+        return h.digest()
+
+    def digest_object(self, obj):
+        if isinstance(obj, (list, tuple)):
+            return self.hash('list', *[self.digest(item) for item in obj])
+        if isinstance(obj, dict):
+            items = sorted([self.digest(key) + self.digest(value) for key, value in dict.items(obj)])
+            return self.hash('dict', *items)
+        if isinstance(obj, (set, frozenset)):
+            return self.hash('set', *sorted([self.digest(item) for item in obj]))
+        if isinstance(obj, bytes):
+            return self.hash('bytes', obj)
+        if isinstance(obj, numpy.ndarray):
+            array = numpy.ascontiguousarray(obj)
+            return self.hash('array', array.dtype.str, repr(array.shape), array.tobytes())
+        if isinstance(obj, numpy.generic):
+            return self.digest(obj.item())
+        if isinstance(obj, binary_format.reference_types):
+            return self.hash('reference', binary_format.class_name(obj))
+        name = binary_format.class_name(type(obj))
+        if binary_format.is_packed_vertex(obj):
+            return self.hash('vertex', name, self.digest(obj.listify()))
+        state = binary_format.get_state(obj)
+        if state is None:
+            return self.hash('object', name, repr(obj))
+        return self.hash('object', name, self.digest(state))
+
+
+def fingerprint(obj):
+    '''hex digest of the content of obj'''
+    return Fingerprinter().hexdigest(obj)
@@ -5,14 +5,71 @@ Email: danaukes<at>asu.edu.
 Please see LICENSE for full license.
 """
 
-import popupcad
 import numpy
+import popupcad.algorithms.points as points
+
+def line_signatures(lines, roundvalue):
+    '''returns a rounded (ux,uy,offset) signature and the unit direction of each line.
+    collinear lines share a signature regardless of their orientation.'''
+    lines = numpy.array(lines, dtype=float).reshape(-1, 2, 2)
+    p0 = lines[:, 0, :]
+    v = lines[:, 1, :] - p0
+    l = (v**2).sum(1)**.5
+    u = v / l[:, None]
+    ur = u.round(roundvalue)
+    flip = (ur[:, 0] < 0) | ((ur[:, 0] == 0) & (ur[:, 1] < 0))
+    u[flip] *= -1
+    offset = u[:, 0] * p0[:, 1] - u[:, 1] * p0[:, 0]
+    signature = numpy.c_[u, offset].round(roundvalue) + 0.
+    return signature, u
+
+def shared_segments(lines, roundvalue):
+    '''finds the portions of lines which are covered by more than one line.
+
+    lines are hashed by their collinear signature, sorted along each line's
+    parameter, and the overlap count of every interval between consecutive
+    endpoints is computed with a cumulative sum of start/end events.'''
+    tolerance = 10**(-roundvalue)
+
+    lines = numpy.array(lines, dtype=float).reshape(-1, 2, 2)
+    lines = lines[~points.pointsthesame(lines[:, 0, :], lines[:, 1, :], tolerance)]
+    if len(lines) < 2:
+        return []
+
+    signature, u = line_signatures(lines, roundvalue)
+    signature_ids = numpy.unique(signature, axis=0, return_inverse=True)[1].reshape(-1)
+
+    t = (lines * u[:, None, :]).sum(2)
+    forward = t[:, 0] <= t[:, 1]
+    delta = numpy.where(forward[:, None], [1, -1], [-1, 1])
+
+    group = numpy.repeat(signature_ids, 2)
+    t = t.reshape(-1)
+    delta = delta.reshape(-1)
+    endpoints = lines.reshape(-1, 2)
+
+    order = numpy.lexsort((t, group))
+    group = group[order]
+    t = t[order]
+    delta = delta[order]
+    endpoints = endpoints[order]
+
+    new_breakpoint = numpy.ones(len(t), dtype=bool)
+    new_breakpoint[1:] = (group[1:] != group[:-1]) | (numpy.diff(t) > tolerance)
+    breakpoint_ids = new_breakpoint.cumsum() - 1
+
+    breakpoint_group = group[new_breakpoint]
+    breakpoint_points = endpoints[new_breakpoint]
+    coverage = numpy.bincount(breakpoint_ids, weights=delta).round().astype(int).cumsum()
+
+    shared = (breakpoint_group[1:] == breakpoint_group[:-1]) & (coverage[:-1] > 1)
+    starts = breakpoint_points[:-1][shared]
+    ends = breakpoint_points[1:][shared]
+    return [(tuple(p1), tuple(p2)) for p1, p2 in zip(starts.tolist(), ends.tolist())]
 
 def getjoints(geoms,roundvalue):
     from popupcad.geometry.vertex import ShapeVertex
     from popupcad.filetypes.genericshapes import GenericLine
-    
-    tolerance = 10**(-roundvalue)
 
     lines = []
 
@@ -22,36 +79,7 @@ def getjoints(geoms,roundvalue):
         for interior in geom.interiorpoints():
             lines.extend(zip(interior, interior[1:] + interior[:1]))
 
-    l3 = popupcad.algorithms.points.distance_of_lines(lines, [0, 0])
-    l4 = popupcad.algorithms.points.distance_of_lines(lines, [10 * tolerance, 0])
-    l5 = popupcad.algorithms.points.distance_of_lines(lines, [10 * tolerance, 10 * tolerance])
-    l6 = popupcad.algorithms.points.distance_of_lines(lines, [0, 10 * tolerance])
-    l7 = popupcad.algorithms.points.distance_of_lines(lines, [10 * tolerance, 20 * tolerance])
-    
-    m = numpy.c_[l3, l4, l5, l6, l7]
-    m = m.round(roundvalue)
-    m2 = [tuple(items) for items in m.tolist()]
-    m3 = list(set(m2))
-#    jj = numpy.searchsorted(m3,m2)
-    index_to_unique = [m3.index(item) for item in m2]
-    indeces_to_orig = [[] for item in m3]
-    [indeces_to_orig[item].append(ii) for ii, item in enumerate(index_to_unique)]
-
-    newsegments = []
-    for segments in indeces_to_orig:
-        if len(segments) > 1:
-            a = [lines[ii] for ii in segments]
-            vertices = []
-            [vertices.extend(item) for item in a[1:]]
-            ordered_vertices = popupcad.algorithms.points.order_vertices(vertices,a[0],tolerance=tolerance)
-            segs = list(zip(ordered_vertices[:-1], ordered_vertices[1:]))
-            midpoints = popupcad.algorithms.points.segment_midpoints(segs)
-            count = [0 for item in midpoints]
-            for ii in segments:
-                for jj, point in enumerate(midpoints):
-                    if popupcad.algorithms.points.point_within_line(point,lines[ii],tolerance=tolerance):
-                        count[jj] += 1
-            newsegments.extend([seg for count_ii, seg in zip(count, segs) if count_ii > 1])
+    newsegments = shared_segments(lines, roundvalue)
 
     generic_lines = [GenericLine([ShapeVertex(v1), ShapeVertex(v2)], []) for v1, v2 in newsegments]
     generic_lines = [item for item in generic_lines if len(item.get_exterior()) == 2]
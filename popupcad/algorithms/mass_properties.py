@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+
+def ring_moments(ring):
+    '''signed area, first moments [Sx,Sy] and second moments [Ixx,Iyy,Ixy]=[int x^2,int y^2,int xy]
+    of the region enclosed by a closed ring, from green's theorem. counter-clockwise rings are positive.'''
+    p = numpy.array(ring, dtype=float).reshape(-1, 2)
+    x0, y0 = p.T
+    x1, y1 = numpy.roll(p, -1, 0).T
+    c = x0 * y1 - x1 * y0
+    area = c.sum() / 2
+    first = numpy.array([((x0 + x1) * c).sum(), ((y0 + y1) * c).sum()]) / 6
+    second = numpy.array([((x0**2 + x0 * x1 + x1**2) * c).sum() / 12,
+                          ((y0**2 + y0 * y1 + y1**2) * c).sum() / 12,
+                          ((x0 * y1 + 2 * x0 * y0 + 2 * x1 * y1 + x1 * y0) * c).sum() / 24])
+    return area, first, second
+
+def area_moments(exterior, interiors):
+    '''area, first moments and second moments of a polygon with holes, regardless of ring orientation'''
+    area, first, second = 0., numpy.zeros(2), numpy.zeros(3)
+    for ring, sign in [(exterior, 1)] + [(interior, -1) for interior in interiors]:
+        if len(ring) < 3:
+            continue
+        a, f, s = ring_moments(ring)
+        sign = sign * numpy.sign(a)
+        area += sign * a
+        first += sign * f
+        second += sign * s
+    return area, first, second
+
+def sum_moments(moments):
+    area = sum([item[0] for item in moments])
+    first = sum([item[1] for item in moments], numpy.zeros(2))
+    second = sum([item[2] for item in moments], numpy.zeros(3))
+    return area, first, second
+
+def extruded_inertia_tensor(moments, about_point, density, z_lower, z_upper):
+    '''inertia tensor of a region with the given area moments, extruded from z_lower to z_upper,
+    about about_point'''
+    area, first, second = moments
+    px, py, pz = about_point
+    Sx, Sy = first
+    Mxx, Myy, Mxy = second
+
+    X1 = Sx - px * area
+    Y1 = Sy - py * area
+    X2 = Mxx - 2 * px * Sx + px**2 * area
+    Y2 = Myy - 2 * py * Sy + py**2 * area
+    XY = Mxy - px * Sy - py * Sx + px * py * area
+
+    h = z_upper - z_lower
+    Z1 = ((z_upper - pz)**2 - (z_lower - pz)**2) / 2
+    Z2 = ((z_upper - pz)**3 - (z_lower - pz)**3) / 3
+
+    Ixx = Y2 * h + area * Z2
+    Iyy = X2 * h + area * Z2
+    Izz = (X2 + Y2) * h
+    Ixy = -XY * h
+    Iyz = -Y1 * Z1
+    Izx = -X1 * Z1
+    return density * numpy.array([[Ixx, Ixy, Izx], [Ixy, Iyy, Iyz], [Izx, Iyz, Izz]])
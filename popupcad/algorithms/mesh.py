@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import hashlib
+import numpy
+import popupcad
+
+stl_dtype = numpy.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+def signed_area(loop):
+    x, y = loop.T
+    return (x * numpy.roll(y, -1) - numpy.roll(x, -1) * y).sum() / 2
+
+
+def oriented_loops(loops):
+    '''
+    the loops of a polygon as arrays, exteriors turned counter-clockwise and
+    interiors clockwise so that every extruded wall faces out
+    '''
+    exterior, interiors = loops
+    oriented = []
+    for ii, loop in enumerate([exterior] + list(interiors)):
+        loop = numpy.array(loop, dtype=float).reshape(-1, 2)
+        if len(loop) < 2:
+            continue
+        if (signed_area(loop) > 0) != (ii == 0):
+            loop = loop[::-1]
+        oriented.append(loop)
+    return oriented
+
+
+def with_z(points, z):
+    z = numpy.broadcast_to(numpy.asarray(z, dtype=float).reshape((-1,) + (1,) * (points.ndim - 1)), points.shape[:-1] + (1,))
+    return numpy.concatenate([points, z], -1)
+
+
+def side_triangles(loops, z_lower, z_upper):
+    '''
+    the walls of a list of oriented loops, as an (n,3,3) array. z_lower and
+    z_upper are either single values or one value for each loop.
+    '''
+    if not loops:
+        return numpy.zeros((0, 3, 3))
+    lengths = [len(loop) for loop in loops]
+    z_lower = numpy.repeat(numpy.broadcast_to(z_lower, len(loops)), lengths)
+    z_upper = numpy.repeat(numpy.broadcast_to(z_upper, len(loops)), lengths)
+    a = numpy.concatenate(loops)
+    b = numpy.concatenate([numpy.roll(loop, -1, 0) for loop in loops])
+    a0, b0, a1, b1 = with_z(a, z_lower), with_z(b, z_lower), with_z(a, z_upper), with_z(b, z_upper)
+    first = numpy.stack([a0, b0, b1], 1)
+    second = numpy.stack([a0, b1, a1], 1)
+    return numpy.concatenate([first, second])
+
+
+def cap_triangles(triangles, z_lower, z_upper):
+    '''
+    bottom and top faces of extruded counter-clockwise triangles, as an
+    (n,3,3) array. z_lower and z_upper are either single values or one value
+    for each triangle.
+    '''
+    triangles = numpy.array(triangles, dtype=float).reshape(-1, 3, 2)
+    bottom = with_z(triangles[:, ::-1], z_lower)
+    top = with_z(triangles, z_upper)
+    return numpy.concatenate([bottom, top])
+
+
+def extrude(triangles, loops, z_lower, z_upper):
+    '''the closed surface of one polygon extruded between z_lower and z_upper'''
+    return numpy.concatenate([cap_triangles(triangles, z_lower, z_upper), side_triangles(oriented_loops(loops), z_lower, z_upper)])
+
+
+def extruded_triangles(generic):
+    '''
+    the surface of every extruded polygon in a generic laminate, as a single
+    (n,3,3) array along with the index of the layer each triangle belongs to.
+    polygons of all layers are triangulated together, and the faces and walls
+    of all of them are built at once.
+    '''
+    zvalues = generic.layerdef.z_values2
+    polygons = []
+    owners = []
+    for ii, layer in enumerate(generic.layers()):
+        for geom in generic.geoms[layer]:
+            if hasattr(geom, 'triangulation_loops'):
+                polygons.append(geom.triangulation_loops())
+                owners.append((ii, layer))
+    all_triangles = popupcad.algorithms.triangulation_engine.triangulate_many(polygons, arrays=True)
+
+    triangles = [numpy.zeros((0, 3, 2))]
+    triangle_z = []
+    triangle_owners = []
+    loops = []
+    loop_z = []
+    loop_owners = []
+    for (ii, layer), polygon, triangles1 in zip(owners, polygons, all_triangles):
+        z = zvalues[layer]['lower'], zvalues[layer]['upper']
+        triangles.append(triangles1)
+        triangle_z.extend([z] * len(triangles1))
+        triangle_owners.extend([ii] * len(triangles1))
+        loops1 = oriented_loops(polygon)
+        loops.extend(loops1)
+        loop_z.extend([z] * len(loops1))
+        loop_owners.extend([ii] * len(loops1))
+    triangle_z = numpy.array(triangle_z, dtype=float).reshape(-1, 2)
+    loop_z = numpy.array(loop_z, dtype=float).reshape(-1, 2)
+    caps = cap_triangles(numpy.concatenate(triangles), triangle_z[:, 0], triangle_z[:, 1])
+    sides = side_triangles(loops, loop_z[:, 0], loop_z[:, 1])
+    side_owners = numpy.repeat(numpy.array(loop_owners, dtype=int), [len(loop) for loop in loops])
+    layer_indices = numpy.concatenate([triangle_owners, triangle_owners, side_owners, side_owners]).astype(int)
+    return numpy.concatenate([caps, sides]), layer_indices
+
+
+def laminate_triangles(generic, scaling=1):
+    '''the surface of every extruded polygon in a generic laminate, as a single (n,3,3) array'''
+    return extruded_triangles(generic)[0] * scaling
+
+
+def layer_triangles(generic, scaling=1):
+    '''the extruded surface of each layer of a generic laminate, as a list of (n,3,3) arrays'''
+    triangles, layer_indices = extruded_triangles(generic)
+    triangles = triangles * scaling
+    return [triangles[layer_indices == ii] for ii in range(len(generic.layers()))]
+
+
+def cross(triangles):
+    return numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+
+
+def normals(triangles, remove_empty=False):
+    '''unit normals of an (n,3,3) array of triangles. with remove_empty
+    set, triangles with no area are dropped and the remaining triangles
+    are returned along with their normals.'''
+    normals = cross(triangles)
+    lengths = numpy.sqrt((normals ** 2).sum(1))
+    if remove_empty:
+        keep = lengths > 0
+        return triangles[keep], normals[keep] / lengths[keep, None]
+    lengths[lengths == 0] = 1
+    return normals / lengths[:, None]
+
+
+def write_stl(filename, triangles, binary=True, name='popupcad', remove_empty=True):
+    '''writes an (n,3,3) array of triangles as a binary or ascii stl file'''
+    triangles = numpy.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+    if remove_empty:
+        triangles, normals1 = normals(triangles, True)
+    else:
+        normals1 = normals(triangles)
+    if binary:
+        data = numpy.zeros(len(triangles), dtype=stl_dtype)
+        data['normal'] = normals1
+        data['vertices'] = triangles
+        header = name.encode('ascii', 'replace')[:80].ljust(80, b' ')
+        with open(filename, 'wb') as f:
+            f.write(header)
+            f.write(numpy.uint32(len(data)).tobytes())
+            f.write(data.tobytes())
+    else:
+        rows = numpy.concatenate([normals1[:, None], triangles], 1).reshape(-1, 12)
+        facet = 'facet normal {0:e} {1:e} {2:e}\n outer loop\n  vertex {3:e} {4:e} {5:e}\n  vertex {6:e} {7:e} {8:e}\n  vertex {9:e} {10:e} {11:e}\n endloop\nendfacet\n'
+        with open(filename, 'w') as f:
+            f.write('solid ' + name + '\n')
+            f.write(''.join([facet.format(*row) for row in rows.tolist()]))
+            f.write('endsolid ' + name + '\n')
+    return filename
+
+
+def laminate_stl(generic, filename=None, binary=True):
+    '''writes a generic laminate as an stl file in meters, returning its name'''
+    if filename is None:
+        filename = os.path.join(popupcad.exportdir, str(generic.id) + '.stl')
+    return write_stl(filename, laminate_triangles(generic, 1 / popupcad.SI_length_scaling), binary)
+
+
+def write_dae(filename, layers, name='popupcad'):
+    '''
+    writes a list of (color, triangles) pairs as a collada file. each pair
+    becomes one geometry with a single indexed triangle set, and pairs of the
+    same color share one material. the file is written in full before it
+    replaces filename, so an interrupted export never leaves a partial mesh
+    behind for laminate_dae to reuse.
+    '''
+    import collada
+    dae = collada.Collada()
+    materials = {}
+    nodes = []
+    for ii, (color, triangles) in enumerate(layers):
+        triangles = numpy.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+        triangles, normals1 = normals(triangles, True)
+        if len(triangles) == 0:
+            continue
+        color = tuple([float(item) for item in color])
+        if color not in materials:
+            jj = len(materials)
+            effect = collada.material.Effect('effect{0:d}'.format(jj), [], 'phong', diffuse=color)
+            material = collada.material.Material('material{0:d}'.format(jj), 'material{0:d}'.format(jj), effect)
+            dae.effects.append(effect)
+            dae.materials.append(material)
+            materials[color] = material
+
+        vertices, inverse = numpy.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+        vertex_name = 'layer{0:d}-vertices'.format(ii)
+        normal_name = 'layer{0:d}-normals'.format(ii)
+        vertex_source = collada.source.FloatSource(vertex_name, vertices.flatten(), ('X', 'Y', 'Z'))
+        normal_source = collada.source.FloatSource(normal_name, normals1.flatten(), ('X', 'Y', 'Z'))
+        geometry = collada.geometry.Geometry(dae, 'geometry{0:d}'.format(ii), name + '-layer{0:d}'.format(ii), [vertex_source, normal_source])
+        input_list = collada.source.InputList()
+        input_list.addInput(0, 'VERTEX', '#' + vertex_name)
+        input_list.addInput(1, 'NORMAL', '#' + normal_name)
+        indices = numpy.c_[inverse.reshape(-1), numpy.arange(len(triangles)).repeat(3)].flatten()
+        geometry.primitives.append(geometry.createTriangleSet(indices, input_list, 'materialref'))
+        dae.geometries.append(geometry)
+        material_node = collada.scene.MaterialNode('materialref', materials[color], inputs=[])
+        geometry_node = collada.scene.GeometryNode(geometry, [material_node])
+        nodes.append(collada.scene.Node('node{0:d}'.format(ii), children=[geometry_node]))
+    scene = collada.scene.Scene('scene', nodes)
+    dae.scenes.append(scene)
+    dae.scene = scene
+    from dev_tools.genericfile import atomic_write
+    with atomic_write(filename, 'wb') as f:
+        dae.write(f)
+    return filename
+
+
+def outlines(generic):
+    '''the color, z range and polygon loops of each layer of a generic laminate, in meters'''
+    zvalues = generic.layerdef.z_values2
+    scaling = 1 / popupcad.SI_length_scaling
+    layers = []
+    for layer in generic.layers():
+        loops = []
+        for geom in generic.geoms[layer]:
+            if hasattr(geom, 'triangulation_loops'):
+                exterior, interiors = geom.triangulation_loops()
+                loops.append([numpy.array(loop, dtype=float).reshape(-1, 2) * scaling for loop in [exterior] + interiors])
+        z = zvalues[layer]['lower'] * scaling, zvalues[layer]['upper'] * scaling
+        layers.append((layer.color, z, loops))
+    return layers
+
+
+def digest(layers, offset):
+    '''
+    hashes the outlines of a laminate relative to offset. the mesh is built
+    from the outlines, so laminates with the same digest have the same mesh
+    even where the triangulation of each came out differently.
+    '''
+    h = hashlib.sha1()
+    for color, z, loops in layers:
+        h.update(numpy.array(color, dtype=float).tobytes())
+        h.update((numpy.array(z) - offset[2]).round(popupcad.mesh_round_value).tobytes())
+        polygons = []
+        for polygon in loops:
+            h2 = hashlib.sha1()
+            for loop in polygon:
+                h2.update(numpy.int64(len(loop)).tobytes())
+                h2.update(((loop - offset[:2]).round(popupcad.mesh_round_value) + 0.).tobytes())
+            polygons.append(h2.digest())
+        for item in sorted(polygons):
+            h.update(item)
+    return h.hexdigest()
+
+
+def laminate_dae(generic, filename=None, directory=None, centered=False):
+    '''
+    writes a generic laminate as a collada file in meters. without a
+    filename, the file is named after the laminate's outlines, so identical
+    meshes share one file which is only built and written once. with
+    centered set the mesh is moved to start at the origin, so that identical
+    links in different places also share a file. returns the filename and
+    the offset removed.
+    '''
+    layers = outlines(generic)
+    offset = numpy.zeros(3)
+    if centered:
+        points = [loop for color, z, loops in layers for polygon in loops for loop in polygon]
+        if points:
+            offset[:2] = numpy.concatenate(points).min(0)
+            offset[2] = min([z[0] for color, z, loops in layers if loops])
+            offset = offset.round(popupcad.mesh_round_value)
+    if filename is None:
+        if directory is None:
+            directory = popupcad.exportdir
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        filename = os.path.join(directory, 'mesh_' + digest(layers, offset) + '.dae')
+        if os.path.exists(filename):
+            return filename, offset
+    triangles = layer_triangles(generic, 1 / popupcad.SI_length_scaling)
+    write_dae(filename, [(color, item - offset) for (color, z, loops), item in zip(layers, triangles)], str(generic.id))
+    return filename, offset
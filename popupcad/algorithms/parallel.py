@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import multiprocessing
+import popupcad
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+_executor = None
+
+def num_processes():
+    if popupcad.parallel_processes is None:
+        return os.cpu_count() or 1
+    return popupcad.parallel_processes
+
+def start_method():
+    '''the configured start method. forking a running Qt application is
+    unsafe, so spawn is used instead of the platform's default once one
+    exists. Qt is only looked for if it has already been imported.'''
+    if popupcad.parallel_start_method is not None:
+        return popupcad.parallel_start_method
+    qtcore = sys.modules.get('qt.QtCore')
+    if qtcore is not None and qtcore.QCoreApplication.instance() is not None:
+        return 'spawn'
+    return None
+
+def executor():
+    '''returns the shared worker pool, creating it on first use'''
+    global _executor
+    if _executor is None:
+        context = multiprocessing.get_context(start_method())
+        _executor = concurrent.futures.ProcessPoolExecutor(num_processes(), mp_context=context)
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+def map_parallel(function, items, threshold=2, chunksize=1, callback=None):
+    '''maps a module-level function over items in worker processes.
+    runs serially when there are fewer than threshold items, when parallel
+    processing is turned off, or when the pool cannot be started.
+    callback, if given, is called with the number of items done and the
+    total each time an item finishes, in the calling process.'''
+    items = list(items)
+    if num_processes() <= 1 or len(items) < threshold:
+        return map_serial(function, items, callback)
+    try:
+        if callback is None:
+            return list(executor().map(function, items, chunksize=chunksize))
+        futures = [executor().submit(function, item) for item in items]
+        for ii, future in enumerate(concurrent.futures.as_completed(futures)):
+            callback(ii + 1, len(items))
+        return [future.result() for future in futures]
+    except (BrokenProcessPool, OSError):
+        shutdown()
+        return map_serial(function, items, callback)
+
+def map_serial(function, items, callback=None):
+    results = []
+    for item in items:
+        results.append(function(item))
+        if callback is not None:
+            callback(len(results), len(items))
+    return results
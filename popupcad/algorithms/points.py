@@ -20,8 +20,52 @@ def identical(pt1,pt2):
     return all(numpy.array(pt1) == numpy.array(pt2))
 
 def pointinpoints(pt1, pts, tolerance):
-    tests = [twopointsthesame(pt1, pt2, tolerance) for pt2 in pts]
-    return True in tests
+    return bool(pointsinpoints([pt1], pts, tolerance)[0])
+
+def pointsthesame(pts1, pts2, tolerance):
+    '''elementwise version of twopointsthesame. pts1 and pts2 are (n,2) arrays, or broadcast against each other.'''
+    v = numpy.asarray(pts2, dtype=float) - numpy.asarray(pts1, dtype=float)
+    l = (v**2).sum(-1)**.5
+    return l < tolerance
+
+def distinct_points(pts, tolerance, loop_test=True):
+    '''returns a boolean array which is true for each point of the sequence pts
+    lying at least tolerance from the last point kept before it, and, with
+    loop_test, for a last point also that far from the first. pairs of
+    neighbours are compared all at once, and only the points following a
+    close pair are compared one at a time, against the last point kept.'''
+    pts = numpy.asarray(pts, dtype=float).reshape(-1, 2)
+    keep = numpy.ones(len(pts), dtype=bool)
+    if len(pts) < 2:
+        return keep
+    close = numpy.flatnonzero(pointsthesame(pts[1:], pts[:-1], tolerance)) + 1
+    last = 0
+    ii = close[0] if len(close) else len(pts)
+    while ii < len(pts):
+        if keep[ii - 1]:
+            last = ii - 1
+        if twopointsthesame(pts[last], pts[ii], tolerance):
+            keep[ii] = False
+            ii += 1
+        else:
+            kk = numpy.searchsorted(close, ii, side='right')
+            ii = close[kk] if kk < len(close) else len(pts)
+    if loop_test and keep[-1]:
+        keep[-1] = not twopointsthesame(pts[0], pts[-1], tolerance)
+    return keep
+
+def pointsinpoints(pts1, pts2, tolerance):
+    '''returns a boolean array which is true for each point in pts1 found in pts2.
+    pts2 may also be a prebuilt VertexIndex. small inputs are compared directly,
+    since building a tree for them costs more than it saves.'''
+    from popupcad.algorithms.vertex_index import VertexIndex
+    if isinstance(pts2, VertexIndex):
+        return pts2.contains(pts1, tolerance)
+    pts1 = numpy.asarray(pts1, dtype=float).reshape(-1, 2)
+    pts2 = numpy.asarray(pts2, dtype=float).reshape(-1, 2)
+    if len(pts1) <= 32 or len(pts1) * len(pts2) <= 100000:
+        return pointsthesame(pts1[:, None, :], pts2[None, :, :], tolerance).any(1)
+    return VertexIndex(pts2).contains(pts1, tolerance)
 
 def point_on_line(point, line, tolerance):
     point = numpy.array(point)
@@ -58,23 +102,50 @@ def point_within_line(point, line, tolerance):
     return same_direction and same_orientation and within
 
 
+def points_on_lines(points, lines, tolerance):
+    '''elementwise version of point_on_line for (n,2) points and (n,2,2) lines'''
+    points = numpy.asarray(points, dtype=float)
+    lines = numpy.asarray(lines, dtype=float)
+    p1 = lines[..., 0, :]
+    v = lines[..., 1, :] - p1
+    v2 = points - p1
+    lv = (v * v).sum(-1)
+    lv2 = (v2 * v2).sum(-1)
+    vpoint = (v * v2).sum(-1)**2 - lv * lv2
+    vpoint = abs(vpoint)**(.5)
+    return vpoint < abs(tolerance)
+
+
+def points_within_lines(points, lines, tolerance):
+    '''elementwise version of point_within_line for (n,2) points and (n,2,2) lines'''
+    points = numpy.asarray(points, dtype=float)
+    lines = numpy.asarray(lines, dtype=float)
+    p1 = lines[..., 0, :]
+    v = lines[..., 1, :] - p1
+    v2 = points - p1
+    lv = (v * v).sum(-1)**.5
+    lv2 = (v2 * v2).sum(-1)**.5
+    v_dot_v2 = (v * v2).sum(-1)
+    same_orientation = v_dot_v2 > 0
+    within = lv2 < lv
+    same_direction = abs(abs(v_dot_v2) - (lv * lv2)) < tolerance
+    return same_direction & same_orientation & within
+
+
 def order_vertices(vertices, segment_seed, tolerance):
-    vertices = list(set(vertices))
-    ordering = list(segment_seed)
-    while vertices:
-        c = vertices.pop()
-        a = ordering[0]
-        b = ordering[-1]
-        if point_within_line(a, [c, b], tolerance):
-            ordering.insert(0, c)
-        elif point_within_line(b, [a, c], tolerance):
-            ordering.append(c)
-        else:
-            for ii, b in enumerate(ordering[1:]):
-                if point_within_line(c, [a, b], tolerance):
-                    ordering.insert(ii + 1, c)
-                    break
-    return ordering
+    '''orders the vertices lying on the line through segment_seed by their position along it'''
+    seed = numpy.asarray(segment_seed, dtype=float)
+    candidates = list(set(vertices))
+    if not candidates:
+        return list(segment_seed)
+    candidates_a = numpy.array(candidates, dtype=float)
+    on_line = points_on_lines(candidates_a, seed[None, :, :], tolerance)
+    on_seed = pointsinpoints(candidates_a, seed, tolerance)
+    keep = on_line & ~on_seed
+    candidates = [item for item, test in zip(candidates, keep) if test]
+    ordering = list(segment_seed) + candidates
+    t = (numpy.array(ordering, dtype=float) - seed[0]).dot(seed[1] - seed[0])
+    return [ordering[ii] for ii in t.argsort(kind='stable')]
 
 
 def segment_midpoints(segments):
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import numpy
+import popupcad
+import popupcad.algorithms.parallel
+from popupcad.algorithms.batch_export import layer_name
+
+band_rows = 256
+
+
+def layer_loops(generic):
+    '''
+    the color, every polygon loop, exterior or interior, and every open
+    shape of each layer. lines, polylines and points are drawn as strokes
+    one pixel wide rather than filled.
+    '''
+    layers = []
+    for layer in generic.layers():
+        loops = []
+        strokes = []
+        for geom in generic.geoms[layer]:
+            if hasattr(geom, 'triangulation_loops'):
+                exterior, interiors = geom.triangulation_loops()
+                polygon_loops = [exterior] + interiors
+            else:
+                shape = geom.to_shapely()
+                if shape.geom_type == 'Polygon':
+                    polygon_loops = [list(shape.exterior.coords)] + [list(item.coords) for item in shape.interiors]
+                else:
+                    strokes.append(numpy.array(geom.exteriorpoints(), dtype=float).reshape(-1, 2))
+                    continue
+            loops.extend([numpy.array(loop, dtype=float).reshape(-1, 2) for loop in polygon_loops])
+        layers.append((tuple(layer.color), loops, strokes))
+    return layers
+
+
+def bounds(layers):
+    points = [loop for color, loops, strokes in layers for loop in loops + strokes if len(loop)]
+    if not points:
+        return numpy.zeros(2), numpy.zeros(2)
+    points = numpy.concatenate(points)
+    return points.min(0), points.max(0)
+
+
+def frame(layers, dpi=None, size=(400, 300)):
+    '''
+    the image size in pixels and the pixels per unit length. dpi is in pixels
+    per inch of the real part. without it, the laminate is fit to size.
+    '''
+    lower, upper = bounds(layers)
+    extent = numpy.maximum(upper - lower, 1e-9)
+    if dpi is None:
+        scale = min(size[0] / extent[0], size[1] / extent[1])
+    else:
+        scale = dpi / 25.4 * popupcad.SI_length_scaling / 1000
+    width, height = numpy.maximum(numpy.ceil(extent * scale), 1).astype(int).tolist()
+    return (width, height), lower, upper, scale
+
+
+def pixel_coordinates(loop, lower, upper, scale):
+    x = (loop[:, 0] - lower[0]) * scale
+    if popupcad.flip_y:
+        y = (upper[1] - loop[:, 1]) * scale
+    else:
+        y = (loop[:, 1] - lower[1]) * scale
+    return x, y
+
+
+def crossings(loops, height):
+    '''
+    where each loop's edges cross the center of each pixel row, sorted by row
+    and then by x. an edge counts the rows from its lower end up to but not
+    including its upper one, so every row is crossed an even number of times.
+    '''
+    x0 = numpy.concatenate([x for x, y in loops])
+    y0 = numpy.concatenate([y for x, y in loops])
+    x1 = numpy.concatenate([numpy.roll(x, -1) for x, y in loops])
+    y1 = numpy.concatenate([numpy.roll(y, -1) for x, y in loops])
+    y_min = numpy.minimum(y0, y1)
+    y_max = numpy.maximum(y0, y1)
+    first = numpy.clip(numpy.ceil(y_min - .5), 0, height).astype(int)
+    last = numpy.clip(numpy.ceil(y_max - .5), 0, height).astype(int)
+    counts = last - first
+    edges = numpy.repeat(numpy.arange(len(counts)), counts)
+    offsets = numpy.arange(len(edges)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    rows = first[edges] + offsets
+    t = (rows + .5 - y0[edges]) / (y1[edges] - y0[edges])
+    x = x0[edges] + t * (x1[edges] - x0[edges])
+    order = numpy.lexsort((x, rows))
+    return rows[order], x[order]
+
+
+def coverage(loops, shape, lower, upper, scale, samples=2):
+    '''
+    fills the loops with the even-odd rule, so holes and islands inside holes
+    need no special treatment. each pixel is sampled samples x samples times,
+    and the fraction of samples inside is returned for every pixel.
+    '''
+    width, height = shape
+    result = numpy.zeros((height, width), dtype=numpy.float32)
+    if not loops:
+        return result
+    sub_width, sub_height = width * samples, height * samples
+    loops = [pixel_coordinates(loop, lower, upper, scale * samples) for loop in loops if len(loop) > 2]
+    if not loops:
+        return result
+    rows, x = crossings(loops, sub_height)
+    starts = numpy.clip(numpy.ceil(x[0::2] - .5), 0, sub_width).astype(int)
+    ends = numpy.clip(numpy.ceil(x[1::2] - .5), 0, sub_width).astype(int)
+    rows = rows[0::2]
+
+    band = band_rows * samples
+    for top in range(0, sub_height, band):
+        bottom = min(top + band, sub_height)
+        a, b = numpy.searchsorted(rows, [top, bottom])
+        if a == b:
+            continue
+        index = (rows[a:b] - top) * (sub_width + 1)
+        size = (bottom - top) * (sub_width + 1)
+        steps = numpy.bincount(index + starts[a:b], minlength=size) - numpy.bincount(index + ends[a:b], minlength=size)
+        inside = numpy.cumsum(steps.reshape(bottom - top, sub_width + 1)[:, :sub_width], axis=1) > 0
+        inside = inside.reshape((bottom - top) // samples, samples, width, samples)
+        result[top // samples:bottom // samples] = inside.mean(axis=(1, 3))
+    return result
+
+
+def stroke_coverage(strokes, shape, lower, upper, scale):
+    '''the pixels each open shape passes through, found by sampling its segments every quarter pixel'''
+    width, height = shape
+    result = numpy.zeros((height, width), dtype=numpy.float32)
+    points = []
+    for stroke in strokes:
+        x, y = pixel_coordinates(stroke, lower, upper, scale)
+        points.append(numpy.c_[x, y])
+        if len(stroke) > 1:
+            start = numpy.c_[x[:-1], y[:-1]]
+            step = numpy.c_[x[1:], y[1:]] - start
+            counts = numpy.ceil((step ** 2).sum(1) ** .5 * 4).astype(int) + 1
+            segments = numpy.repeat(numpy.arange(len(counts)), counts)
+            t = (numpy.arange(len(segments)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)) / numpy.repeat(counts, counts)
+            points.append(start[segments] + t[:, None] * step[segments])
+    if points:
+        points = numpy.floor(numpy.concatenate(points)).astype(int)
+        points[:, 0] = numpy.clip(points[:, 0], 0, width - 1)
+        points[:, 1] = numpy.clip(points[:, 1], 0, height - 1)
+        result[points[:, 1], points[:, 0]] = 1
+    return result
+
+
+def layer_coverage(loops, strokes, shape, lower, upper, scale, samples=2):
+    mask = coverage(loops, shape, lower, upper, scale, samples)
+    if strokes:
+        mask = numpy.maximum(mask, stroke_coverage(strokes, shape, lower, upper, scale))
+    return mask
+
+
+def composite(masks, shape, background=None):
+    '''lays each (color, coverage) over the ones before it, on an opaque
+    background of the given color, or a transparent one without it'''
+    width, height = shape
+    image = numpy.zeros((height, width, 4), dtype=numpy.float32)
+    if background is not None:
+        image[:, :, :3] = background[:3]
+        image[:, :, 3] = 1
+    for color, mask in masks:
+        color = numpy.array(color, dtype=numpy.float32)
+        if len(color) == 3:
+            color = numpy.r_[color, 1]
+        alpha = mask * color[3]
+        image *= (1 - alpha)[:, :, None]
+        image[:, :, :3] += alpha[:, :, None] * color[:3]
+        image[:, :, 3] += alpha
+    opaque = image[:, :, 3] > 0
+    image[opaque, :3] /= image[opaque, 3:]
+    return numpy.round(numpy.clip(image, 0, 1) * 255).astype(numpy.uint8)
+
+
+def write_image(filename, image, filetype='PNG'):
+    from PIL import Image
+    picture = Image.fromarray(image, 'RGBA')
+    try:
+        picture.save(filename, filetype.upper())
+    except OSError:
+        background = Image.new('RGBA', picture.size, (255, 255, 255, 255))
+        Image.alpha_composite(background, picture).convert('RGB').save(filename, filetype.upper())
+    return filename
+
+
+def svg_color(color):
+    return 'rgb({0:.0f},{1:.0f},{2:.0f})'.format(*[item * 255 for item in color[:3]])
+
+
+def write_svg(filename, layers, shape, lower, upper, scale, background=None):
+    '''writes the layers as an svg in the same frame as the raster images'''
+    width, height = shape
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{0:d}" height="{1:d}" viewBox="0 0 {0:d} {1:d}">'.format(width, height)]
+    if background is not None:
+        lines.append('<rect width="100%" height="100%" fill="{0}"/>'.format(svg_color(background)))
+    for color, loops, strokes in layers:
+        color = tuple(color) + (1,) * (4 - len(color))
+        rgb = svg_color(color)
+        path = []
+        for loop in loops:
+            if len(loop) > 2:
+                x, y = pixel_coordinates(loop, lower, upper, scale)
+                path.append('M' + ' L'.join(['{0:.3f},{1:.3f}'.format(*point) for point in zip(x, y)]) + ' Z')
+        if path:
+            lines.append('<path fill="{0}" fill-opacity="{1!r}" fill-rule="evenodd" d="{2}"/>'.format(rgb, float(color[3]), ' '.join(path)))
+        path = []
+        for stroke in strokes:
+            x, y = pixel_coordinates(stroke, lower, upper, scale)
+            if len(stroke) == 1:
+                x, y = numpy.r_[x, x], numpy.r_[y, y]
+            path.append('M' + ' L'.join(['{0:.3f},{1:.3f}'.format(*point) for point in zip(x, y)]))
+        if path:
+            lines.append('<path fill="none" stroke="{0}" stroke-opacity="{1!r}" stroke-width="1" stroke-linecap="square" d="{2}"/>'.format(rgb, float(color[3]), ' '.join(path)))
+    lines.append('</svg>')
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return filename
+
+
+def laminate_tasks(basename, generic, directory, filetype='PNG', dpi=None, size=(400, 300), separate_layers=False, samples=2):
+    '''
+    the images needed for a generic laminate: all of its layers together, and
+    optionally each layer on its own. every image of a laminate shares the same
+    frame, so the layer images line up with each other and with the whole. as
+    when drawn with Qt, they have the scene's background color.
+    '''
+    layers = layer_loops(generic)
+    shape, lower, upper, scale = frame(layers, dpi, size)
+    extension = '.' + filetype.lower()
+    setup = shape, lower, upper, scale, samples, filetype, popupcad.graphics_scene_background_color
+    tasks = [(os.path.normpath(os.path.join(directory, basename + extension)), setup, layers)]
+    if separate_layers:
+        for ii, (layer, item) in enumerate(zip(generic.layers(), layers)):
+            filename = os.path.normpath(os.path.join(directory, basename + '_' + layer_name(ii, layer) + extension))
+            tasks.append((filename, setup, [item]))
+    return tasks
+
+
+def render_task(task):
+    '''renders and writes one image, or an svg of the same. module level, so that it can run in a worker process.'''
+    filename, (shape, lower, upper, scale, samples, filetype, background), layers = task
+    if filetype.upper() == 'SVG':
+        return write_svg(filename, layers, shape, lower, upper, scale, background)
+    masks = [(color, layer_coverage(loops, strokes, shape, lower, upper, scale, samples)) for color, loops, strokes in layers]
+    return write_image(filename, composite(masks, shape, background), filetype)
+
+
+def raster_laminates(items, directory=None, filetype='PNG', dpi=None, size=(400, 300), separate_layers=False, samples=2):
+    '''
+    renders a list of (basename, generic laminate) pairs without Qt, writing
+    the images in parallel. returns the files written.
+    '''
+    if directory is None:
+        directory = popupcad.exportdir
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tasks = []
+    for basename, generic in items:
+        tasks.extend(laminate_tasks(basename, generic, directory, filetype, dpi, size, separate_layers, samples))
+    return popupcad.algorithms.parallel.map_parallel(render_task, tasks)
+
+
+def raster_laminate(generic, basename, directory=None, filetype='PNG', dpi=None, size=(400, 300), separate_layers=False, samples=2):
+    '''renders one generic laminate, returning the filename of the image of all its layers'''
+    return raster_laminates([(basename, generic)], directory, filetype, dpi, size, separate_layers, samples)[0]
+
+
+def raster_outputs(design, directory=None, filetype='PNG', dpi=None, size=(400, 300), separate_layers=False, samples=2):
+    '''renders every output of every operation of a processed design'''
+    items = []
+    for ii, operation in enumerate(design.operations):
+        for jj, output in enumerate(operation.output):
+            items.append(('{0:02.0f}_{1:02.0f}'.format(ii, jj), output.generic_laminate()))
+    return raster_laminates(items, directory, filetype, dpi, size, separate_layers, samples)
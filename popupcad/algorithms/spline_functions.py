@@ -68,18 +68,99 @@ def calc_spline(knots,n,w,domain):
     return calculated_spline
 
 def interpolated_points(points,knots,w,domain):
+    points = numpy.array(points,dtype=float)
     n = len(points)-1
-    y = calc_spline(knots,n,w,domain)
-    points = numpy.array(points)
-    weights = y.sum(1)
-    interpolated_points = y.dot(points)
-    interpolated_points = (interpolated_points.T/weights).T
-    return interpolated_points
+    if len(w)!=n+1:
+        w = [1]*(n+1)
+    return evaluate_batch(points[None],numpy.array(knots,dtype=float)[None],numpy.array(w,dtype=float)[None],numpy.array(domain,dtype=float)[None])[0]
     
 def make_domain(knots,num_segments):
     domain = numpy.r_[min(knots):max(knots):(num_segments+1)*1j]    
     return domain
 
+def valid_domain(knots,n,num_segments):
+    '''samples the parameter range over which a spline with n+1 control points is defined'''
+    p = len(knots)-n-2
+    domain = numpy.r_[knots[p]:knots[n+1]:(num_segments+1)*1j]
+    return domain
+
+def find_spans(knots,p,n,domain):
+    '''
+    index of the knot span each parameter falls in, for a batch of splines.
+    knots is (splines, m+1) and domain is (splines, samples).
+    '''
+    spans = (domain[:,:,None]>=knots[:,None,:]).sum(2)-1
+    return spans.clip(p,n)
+
+def basis_functions(knots,p,spans,domain):
+    '''
+    the p+1 nonzero basis functions at each parameter, by the triangular
+    de Boor scheme, for a whole batch of splines at once
+    '''
+    rows = numpy.arange(len(knots))[:,None]
+    N = numpy.zeros(domain.shape+(p+1,))
+    N[:,:,0] = 1
+    left = numpy.zeros(domain.shape+(p+1,))
+    right = numpy.zeros(domain.shape+(p+1,))
+    for j in range(1,p+1):
+        left[:,:,j] = domain-knots[rows,spans+1-j]
+        right[:,:,j] = knots[rows,spans+j]-domain
+        saved = numpy.zeros(domain.shape)
+        for r in range(j):
+            denominator = right[:,:,r+1]+left[:,:,j-r]
+            denominator[denominator==0] = 1
+            temp = N[:,:,r]/denominator
+            N[:,:,r] = saved+right[:,:,r+1]*temp
+            saved = left[:,:,j-r]*temp
+        N[:,:,j] = saved
+    return N
+
+def evaluate_batch(points,knots,w,domain):
+    '''
+    evaluates a batch of rational b-splines sharing a degree and number of
+    control points. points is (splines, n+1, dimensions), knots is
+    (splines, m+1), w is (splines, n+1) and domain is (splines, samples).
+    '''
+    n = points.shape[1]-1
+    p = knots.shape[1]-n-2
+    spans = find_spans(knots,p,n,domain)
+    N = basis_functions(knots,p,spans,domain)
+    homogeneous = numpy.concatenate([points*w[:,:,None],w[:,:,None]],2)
+    rows = numpy.arange(len(points))[:,None,None]
+    indices = spans[:,:,None]-p+numpy.arange(p+1)
+    result = (N[:,:,:,None]*homogeneous[rows,indices]).sum(2)
+    return result[:,:,:-1]/result[:,:,-1:]
+
+def evaluate_splines(splines,segments_per_point = 5,batch_size = 256):
+    '''
+    evaluates many splines at once. splines is a list of
+    (control_points, knots, weights) and each is sampled at
+    segments_per_point*n+1 points over the range it is defined on.
+    splines of the same degree and size are evaluated together.
+    '''
+    groups = {}
+    for ii,(points,knots,w) in enumerate(splines):
+        points = numpy.array(points,dtype=float)
+        knots = numpy.array(knots,dtype=float)
+        n = len(points)-1
+        if len(w)!=n+1:
+            w = [1]*(n+1)
+        key = points.shape+knots.shape
+        groups.setdefault(key,[]).append((ii,points,knots,numpy.array(w,dtype=float)))
+
+    results = [None]*len(splines)
+    for items in groups.values():
+        for start in range(0,len(items),batch_size):
+            batch = items[start:start+batch_size]
+            n = len(batch[0][1])-1
+            knots = numpy.array([item[2] for item in batch])
+            domain = numpy.array([valid_domain(item,n,n*segments_per_point) for item in knots])
+            points = numpy.array([item[1] for item in batch])
+            w = numpy.array([item[3] for item in batch])
+            for (ii,_,_,_),result in zip(batch,evaluate_batch(points,knots,w,domain)):
+                results[ii] = result
+    return results
+
 def plot_labeled_points(cp):
     labels = ['cp{0}'.format(i) for i in range(len(cp))]
     plt.plot(*cp.T,marker = 'o', linestyle = '')
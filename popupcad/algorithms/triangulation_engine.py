@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import collections
+import hashlib
+import numpy
+import popupcad
+
+def triangulate_triangle(exterior, interiors):
+    '''compiled constrained delaunay triangulation from the triangle package'''
+    import triangle
+    import shapely.geometry as sg
+    loops = [exterior] + interiors
+    vertices = numpy.concatenate([numpy.array(loop, dtype=float) for loop in loops])
+    segments = []
+    start = 0
+    for loop in loops:
+        ii = numpy.arange(start, start + len(loop))
+        segments.append(numpy.c_[ii, numpy.roll(ii, -1)])
+        start += len(loop)
+    data = {'vertices': vertices, 'segments': numpy.concatenate(segments)}
+    if interiors:
+        data['holes'] = [sg.Polygon(interior).representative_point().coords[0] for interior in interiors]
+    result = triangle.triangulate(data, 'p')
+    return result['vertices'][result['triangles']]
+
+def triangulate_earcut(exterior, interiors):
+    '''compiled ear clipping from the mapbox_earcut package'''
+    import mapbox_earcut
+    loops = [exterior] + interiors
+    vertices = numpy.concatenate([numpy.array(loop, dtype=float) for loop in loops])
+    rings = numpy.cumsum([len(loop) for loop in loops]).astype(numpy.uint32)
+    indices = mapbox_earcut.triangulate_float64(vertices, rings)
+    return vertices[indices].reshape(-1, 3, 2)
+
+def triangulate_pypoly2tri(exterior, interiors):
+    '''pure python constrained delaunay triangulation'''
+    from pypoly2tri.shapes import Point
+    from pypoly2tri.cdt import CDT
+    cdt = CDT([Point(*point) for point in exterior])
+    [cdt.AddHole([Point(*point) for point in interior]) for interior in interiors]
+    cdt.Triangulate()
+    return numpy.array([tri.toList() for tri in cdt.GetTriangles()], dtype=float).reshape(-1, 3, 2)
+
+backends = collections.OrderedDict()
+backends['triangle'] = ('triangle', triangulate_triangle)
+backends['earcut'] = ('mapbox_earcut', triangulate_earcut)
+backends['pypoly2tri'] = ('pypoly2tri', triangulate_pypoly2tri)
+
+def available_backends():
+    import importlib.util
+    return [name for name, (module, function) in backends.items() if importlib.util.find_spec(module) is not None]
+
+def select_backend(name=None):
+    '''returns the name of the backend to use. 'auto' picks the first available backend, in order of speed.'''
+    if name is None:
+        name = popupcad.triangulation_backend
+    if name == 'auto':
+        available = available_backends()
+        if not available:
+            raise Exception('no triangulation backend is installed')
+        return available[0]
+    if name not in backends:
+        raise Exception('unknown triangulation backend: ' + str(name))
+    return name
+
+def geometry_key(exterior, interiors, backend):
+    h = hashlib.sha1(backend.encode())
+    for loop in [exterior] + interiors:
+        loop = numpy.array(loop, dtype=float).reshape(-1, 2)
+        h.update(numpy.int64(len(loop)).tobytes())
+        h.update(loop.tobytes())
+    return h.hexdigest()
+
+def _triangulate(args):
+    exterior, interiors, backend = args
+    scaling = popupcad.triangulation_scaling
+    exterior = (numpy.array(exterior, dtype=float) * scaling).tolist()
+    interiors = [(numpy.array(interior, dtype=float) * scaling).tolist() for interior in interiors]
+    function = backends[backend][1]
+    tris = numpy.array(function(exterior, interiors), dtype=float).reshape(-1, 3, 2) / scaling
+    v1 = tris[:, 1] - tris[:, 0]
+    v2 = tris[:, 2] - tris[:, 0]
+    clockwise = (v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]) < 0
+    tris[clockwise] = tris[clockwise][:, ::-1]
+    return tris
+
+_cache = collections.OrderedDict()
+
+def clear_cache():
+    _cache.clear()
+
+def _cache_store(key, tris):
+    tris.flags.writeable = False
+    _cache[key] = tris
+    while len(_cache) > popupcad.triangulation_cache_size:
+        _cache.popitem(last=False)
+
+def triangulate(exterior, interiors, backend=None):
+    '''triangulates a polygon with holes, returning a list of counter-clockwise triangles'''
+    return triangulate_many([(exterior, interiors)], backend)[0]
+
+def triangulate_many(polygons, backend=None, threshold=32, arrays=False):
+    '''triangulates a list of (exterior,interiors) pairs.
+    results are cached by geometry, and uncached polygons are triangulated in
+    worker processes when there are at least threshold of them. with arrays
+    set, each result is returned as a read-only (n,3,2) array instead of lists.'''
+    backend = select_backend(backend)
+    keys = [geometry_key(exterior, interiors, backend) for exterior, interiors in polygons]
+    results = [None] * len(polygons)
+    missing = collections.OrderedDict()
+    for ii, key in enumerate(keys):
+        if key in _cache:
+            _cache.move_to_end(key)
+            results[ii] = _cache[key]
+        else:
+            missing.setdefault(key, []).append(ii)
+
+    if missing:
+        args = [(polygons[iis[0]][0], polygons[iis[0]][1], backend) for iis in missing.values()]
+        new = popupcad.algorithms.parallel.map_parallel(_triangulate, args, threshold=threshold)
+        for (key, iis), tris in zip(missing.items(), new):
+            _cache_store(key, tris)
+            for ii in iis:
+                results[ii] = tris
+    if arrays:
+        return results
+    return [tris.tolist() for tris in results]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+from scipy.spatial import cKDTree
+
+class VertexIndex(object):
+    '''spatial index over a set of 2d points, for radius queries, snapping and welding'''
+
+    def __init__(self, points):
+        self.points = numpy.array(points, dtype=float).reshape(-1, 2)
+        self.vertices = None
+        if len(self.points) > 0:
+            self.tree = cKDTree(self.points)
+        else:
+            self.tree = None
+
+    @classmethod
+    def from_vertices(cls, vertices, scaling=1):
+        new = cls([vertex.getpos(scaling) for vertex in vertices])
+        new.vertices = list(vertices)
+        return new
+
+    def __len__(self):
+        return len(self.points)
+
+    def query_radius(self, point, radius):
+        '''returns the indices of all points within radius of point'''
+        if self.tree is None:
+            return []
+        return sorted(self.tree.query_ball_point(point, radius))
+
+    def nearest(self, point, radius=numpy.inf):
+        '''returns the index of the closest point within radius, or None'''
+        if self.tree is None:
+            return None
+        distance, ii = self.tree.query(point, distance_upper_bound=radius)
+        if distance < radius:
+            return int(ii)
+        return None
+
+    def nearest_vertex(self, point, radius=numpy.inf):
+        ii = self.nearest(point, radius)
+        if ii is None:
+            return None
+        return self.vertices[ii]
+
+    def lookup(self, points):
+        '''returns the index of the closest indexed point to each of points'''
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        if self.tree is None or len(points) == 0:
+            return numpy.zeros(len(points), dtype=int)
+        return self.tree.query(points)[1]
+
+    def contains(self, points, tolerance):
+        '''returns a boolean array which is true for each of points lying within tolerance of an indexed point'''
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        if self.tree is None or len(points) == 0:
+            return numpy.zeros(len(points), dtype=bool)
+        distance = self.tree.query(points, distance_upper_bound=tolerance)[0]
+        return distance < tolerance
+
+    def weld(self, tolerance):
+        '''merges points closer than tolerance, transitively.
+        returns the indices of the representative (first) point of each group and
+        an array mapping every point to its group'''
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        n = len(self.points)
+        if n == 0:
+            return numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int)
+        pairs = self.tree.query_pairs(tolerance, output_type='ndarray')
+        graph = coo_matrix((numpy.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        labels = connected_components(graph, directed=False)[1]
+        first = numpy.full(labels.max() + 1, n)
+        numpy.minimum.at(first, labels, numpy.arange(n))
+        order = first.argsort()
+        group = numpy.empty_like(order)
+        group[order] = numpy.arange(len(order))
+        return first[order], group[labels]
+
@@ -38,10 +38,8 @@ def find_outer(ls, minpoint):
         outergeoms = []
         innergeoms = []
         for geom in layer_geometry.geoms:
-            if points.pointinpoints(
-                    minpoint,
-                    popupcad.algorithms.csg_shapely.to_generic(geom).exteriorpoints(scaling = popupcad.csg_processing_scaling),
-                    popupcad.distinguishable_number_difference):
+            exterior = popupcad.algorithms.csg_shapely.to_generic(geom).exteriorpoints(scaling = popupcad.csg_processing_scaling)
+            if points.pointsinpoints([minpoint], exterior, popupcad.distinguishable_number_difference)[0]:
                 outergeoms.append(geom)
             else:
                 innergeoms.append(geom)
@@ -8,4 +8,7 @@ Please see LICENSE for full license.
 from . import constraint
 from . import constraints
 from . import constraint_support
+from . import constraint_cache
+from . import constraint_kernels
+from . import constraint_diagnostics
 from . import constraint_system
\ No newline at end of file
@@ -28,6 +28,9 @@ class Constraint(object):
         self.segment_ids = segment_ids
         self.id = id(self)
 
+    def __getstate__(self):
+        return dict([(key, value) for key, value in self.__dict__.items() if not key.startswith('_')])
+
     def copy(self, identical=True):
         new = type(self)(self.vertex_ids[:], self.segment_ids[:])
         if identical:
@@ -68,17 +71,83 @@ class Constraint(object):
         except AttributeError:
             pass
 
+        for key in ['_f_jacobian','_compiled','_variables','_terms']:
+            try:
+                delattr(self,key)
+            except AttributeError:
+                pass
+
+    @property
+    def compiled(self):
+        '''the numeric functions shared by every constraint with the same signature'''
         try:
-            del self._f_J
+            return self._compiled
         except AttributeError:
-            pass
-    
+            from popupcad.constraints import constraint_cache
+            self._compiled = constraint_cache.compiled(self)
+            return self._compiled
+
+    def kernel_terms(self):
+        '''
+        the constraint's equations as terms of the batched kernels in
+        constraint_kernels, each given as (kernel name, variables, parameters),
+        in the order of symbolic_equations. constraints which return None are
+        evaluated with their compiled functions instead.
+        '''
+        return None
+
+    @property
+    def terms(self):
+        try:
+            return self._terms
+        except AttributeError:
+            self._terms = self.kernel_terms() if popupcad.constraint_kernels else None
+            return self._terms
+
+    def structure(self):
+        '''anything besides the constraint's vertices which changes the form of
+        its equations. by default, all of its other attributes.'''
+        state = self.__getstate__()
+        return tuple(sorted([(key,repr(value)) for key,value in state.items() if key not in ['id','vertex_ids','segment_ids']]))
+
+    def parameter_values(self):
+        '''numbers the compiled functions take as arguments rather than build in'''
+        return []
+
+    def set_parameters(self,parameters):
+        pass
+
+    def canonical_copy(self,vertex_ids,segment_ids,parameters):
+        '''a copy referring to the given vertices, with symbols in place of its parameters'''
+        new = type(self).__new__(type(self))
+        new.__dict__.update(self.__getstate__())
+        new.vertex_ids = vertex_ids
+        new.segment_ids = segment_ids
+        new.set_parameters(parameters)
+        return new
+
+    def num_equations(self):
+        if self.terms is not None:
+            from popupcad.constraints.constraint_kernels import num_equations
+            return num_equations(self.terms)
+        return self.compiled.num_equations
+
+    def bind(self,function):
+        parameters = [float(item) for item in self.parameter_values()]
+        def bound(*args):
+            return function(*(list(args)+parameters))
+        return bound
+
     @property
     def f_jacobian(self):
         try:
             return self._f_jacobian
         except AttributeError:
-            self._f_jacobian = sympy.utilities.lambdify(self.variables,self.jacobian().tolist())
+            if self.terms is not None:
+                from popupcad.constraints.constraint_kernels import functions
+                self._f_jacobian = functions(self.terms,self.variables)[1]
+            else:
+                self._f_jacobian = self.bind(self.compiled.f_jacobian)
             return self._f_jacobian
             
     @property
@@ -86,52 +155,52 @@ class Constraint(object):
         try:
             return self._f_constraints
         except AttributeError:
-            self._f_constraints = sympy.utilities.lambdify(self.variables,self.generated_equations)
+            if self.terms is not None:
+                from popupcad.constraints.constraint_kernels import functions
+                self._f_constraints = functions(self.terms,self.variables)[0]
+            else:
+                self._f_constraints = self.bind(self.compiled.f_constraints)
             return self._f_constraints
             
     def mapped_f_constraints(self,*args):
-        args = (self._B.dot(args))     
-        y = self._A.dot(self.f_constraints(*args))
+        args = numpy.array(args,dtype=float)
+        y = numpy.zeros(self._num_eq)
+        y[self._eq_indices] = self.f_constraints(*args[self._var_indices])
         return y
 
     def mapped_f_jacobian(self,*args):
-        args = (self._B.dot(args))
-        y = self._A.dot(self.f_jacobian(*args)).dot(self._B)
+        args = numpy.array(args,dtype=float)
+        y = numpy.zeros((self._num_eq,len(args)))
+        y[self._eq_indices[:,None],self._var_indices[None,:]] = self.f_jacobian(*args[self._var_indices])
         return y
 
     @property
     def variables(self):
-        variables = []
-        for equation in self.generated_equations:
-            variables.extend(equation.atoms(Variable))
-        variables = set(variables)
-        variables = sorted(variables,key=lambda var:str(var))
-        return variables
+        '''the system variables the constraint's functions take, in the order they take them'''
+        try:
+            return self._variables
+        except AttributeError:
+            if self.terms is not None:
+                self._variables = sorted(set([item for name,variables,parameters in self.terms for item in variables]),key=lambda item:str(item))
+                return self._variables
+            from popupcad.constraints.constraint_cache import canonical_ids
+            ids = canonical_ids(self)
+            self._variables = [SymbolicVertex(ids[ii]).variables()[axis] for ii,axis in self.compiled.variables]
+            return self._variables
         
     def jacobian(self):
         eq = sympy.Matrix(self.generated_equations)        
         J = eq.jacobian(self.variables)
         return J
 
-    def build_system_mapping(self,sys_vars,num_eq,eq_indeces):
-        m = num_eq
-        n = len(self.generated_equations)
-        o = len(self.variables)
-        p = len(sys_vars)
-
-        A = numpy.zeros((m,n))
-        for ii,jj in zip(eq_indeces,range(len(self.generated_equations))):
-            A[ii,jj] = 1
+    def build_system_mapping(self,var_index,num_eq,eq_indeces):
+        '''records which rows of the system this constraint's equations fill,
+        and the position in the system's variables of each of its own.
+        var_index maps each system variable to its position.'''
+        self._num_eq = num_eq
+        self._eq_indices = numpy.array(list(eq_indeces),dtype=int)
+        self._var_indices = numpy.array([var_index[item] for item in self.variables],dtype=int)
 
-        B = numpy.zeros((o,p))
-        for ii,item in enumerate(self.variables):
-            jj = sys_vars.index(item)
-            B[ii,jj] = 1
-
-        self._A = A
-        self._B = B
-#        return A,B
-    
     def edit(self):
         pass
 
@@ -287,6 +356,16 @@ class ValueConstraint(Constraint):
             new.id = self.id
         return new
 
+    def structure(self):
+        return (self.value == 0,)
+
+    def parameter_values(self):
+        return [self.value]
+
+    def set_parameters(self,parameters):
+        if self.value != 0:
+            self.value = parameters[0]
+
     @classmethod
     def getValue(cls):
         return qg.QInputDialog.getDouble(None, 'Edit Value', 'Value', 0, popupcad.gui_negative_infinity, popupcad.gui_positive_infinity, popupcad.gui_default_decimals)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import json
+import hashlib
+import inspect
+import sympy
+import popupcad
+from popupcad.constraints.constraint_support import SymbolicVertex, Variable
+from popupcad.constraints.constraint_diagnostics import timer
+
+format_version = 2
+
+_memory = {}
+_class_versions = {}
+
+#the only classes given strings, which they read as a name or a number rather than an expression
+literal_classes = ('Symbol', 'Dummy', 'Integer', 'Rational', 'Float')
+
+
+class CompiledConstraint(object):
+    '''
+    numeric functions for the equations and jacobian of one kind of
+    constraint, built with sympy.lambdify from the expressions they compute.
+    the expressions are what is stored on disk, written with sympy.srepr.
+    variables lists the canonical vertex and axis of each argument, which
+    are followed by the constraint's parameters.
+    '''
+
+    def __init__(self, variables, num_equations, arguments, equations, jacobian):
+        self.variables = [tuple(item) for item in variables]
+        self.num_equations = num_equations
+        self.arguments = list(arguments)
+        self.equations = list(equations)
+        self.jacobian = [list(row) for row in jacobian]
+        self.f_constraints = numeric_function(self.arguments, self.equations)
+        self.f_jacobian = numeric_function(self.arguments, self.jacobian)
+
+    def to_dict(self):
+        return {'variables': self.variables,
+                'num_equations': self.num_equations,
+                'arguments': [sympy.srepr(item) for item in self.arguments],
+                'f': [sympy.srepr(item) for item in self.equations],
+                'jacobian': [[sympy.srepr(item) for item in row] for row in self.jacobian]}
+
+    @classmethod
+    def from_dict(cls, data):
+        arguments = [parse_srepr(item) for item in data['arguments']]
+        if not all([isinstance(item, sympy.Symbol) for item in arguments]):
+            raise ValueError('arguments must be symbols')
+        equations = [parse_srepr(item) for item in data['f']]
+        jacobian = [[parse_srepr(item) for item in row] for row in data['jacobian']]
+        return cls(data['variables'], data['num_equations'], arguments, equations, jacobian)
+
+
+def numeric_function(arguments, expressions):
+    '''f(*arguments), returning the expressions as a list, or as nested lists
+    when given a list of rows. common subexpressions are computed once.'''
+    return sympy.lambdify(arguments, expressions, modules='numpy', cse=True)
+
+
+def sympy_name(name, call):
+    '''the sympy class called, or the constant such as pi used, by name in a srepr'''
+    item = getattr(sympy, name, None) if not name.startswith('_') else None
+    if call and isinstance(item, type) and issubclass(item, sympy.Basic):
+        return item
+    if not call and isinstance(item, sympy.Basic):
+        return item
+    raise ValueError('not a sympy name: ' + name)
+
+
+def parse_srepr(text):
+    '''
+    the expression written by sympy.srepr. unlike sympy.sympify, only sympy's
+    constants and calls to its classes with literal arguments are accepted,
+    and strings only where they name a symbol or spell a number, so that a
+    cache file cannot run any other code.
+    '''
+    import ast
+    def check(node, strings=False):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name):
+                raise ValueError('unexpected call in ' + text)
+            sympy_name(node.func.id, True)
+            for item in node.args:
+                check(item, node.func.id in literal_classes)
+            for item in node.keywords:
+                if item.arg is None:
+                    raise ValueError('unexpected argument in ' + text)
+                check(item.value)
+        elif isinstance(node, ast.Name):
+            sympy_name(node.id, False)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            check(node.operand)
+        elif isinstance(node, (ast.Tuple, ast.List)):
+            for item in node.elts:
+                check(item)
+        elif isinstance(node, ast.Constant) and (strings or not isinstance(node.value, str)):
+            pass
+        else:
+            raise ValueError('unexpected expression in ' + text)
+    tree = ast.parse(text, mode='eval')
+    check(tree.body)
+    names = dict([(node.id, getattr(sympy, node.id)) for node in ast.walk(tree) if isinstance(node, ast.Name)])
+    return eval(compile(tree, '<srepr>', 'eval'), {'__builtins__': {}}, names)
+
+
+def canonical_ids(constraint):
+    '''the vertex ids a constraint refers to, in the order first used'''
+    ids = []
+    for item in constraint.vertex_ids + constraint.vertices_in_lines():
+        if item not in ids:
+            ids.append(item)
+    return ids
+
+
+def class_version(cls):
+    '''a hash of the source defining a constraint's equations, so that stored
+    functions are not reused once the equations change. None if the source
+    cannot be found, in which case nothing is stored on disk.'''
+    try:
+        return _class_versions[cls]
+    except KeyError:
+        pass
+    version = None
+    for base in cls.__mro__:
+        if 'symbolic_equations' in base.__dict__:
+            try:
+                version = hashlib.sha1(inspect.getsource(base.symbolic_equations).encode('utf-8')).hexdigest()
+            except (TypeError, OSError):
+                pass
+            break
+    _class_versions[cls] = version
+    return version
+
+
+def signature(constraint):
+    '''
+    everything a constraint's compiled functions depend on: its type, which of
+    its points and line ends are the same vertex, and any structure its
+    parameters give its equations. instances with the same signature share functions.
+    '''
+    cls = type(constraint)
+    ids = canonical_ids(constraint)
+    canonical = dict([(item, ii) for ii, item in enumerate(ids)])
+    vertices = tuple([canonical[item] for item in constraint.vertex_ids])
+    segments = tuple([(canonical[id1], canonical[id2]) for id1, id2 in constraint.segment_ids])
+    return (cls.__module__ + '.' + cls.__name__, class_version(cls), vertices, segments, constraint.structure())
+
+
+def build(constraint, key):
+    '''derives the functions for a signature from a canonical copy of constraint'''
+    name, version, vertices, segments, structure = key
+    parameters = [sympy.Symbol('parameter{0:d}'.format(ii)) for ii in range(len(constraint.parameter_values()))]
+    canonical = constraint.canonical_copy(list(vertices), [tuple(item) for item in segments], parameters)
+    equations = [sympy.sympify(item) for item in canonical.symbolic_equations()]
+
+    axes = {}
+    for ii in range(len(canonical_ids(canonical))):
+        for axis, variable in enumerate(SymbolicVertex(ii).variables()):
+            axes[variable] = (ii, axis)
+    variables = sorted(set([item for equation in equations for item in equation.atoms(Variable)]), key=lambda item: str(item))
+    symbols = [sympy.Symbol(str(item)) for item in variables]
+    replacements = dict(zip(variables, symbols))
+    equations = [item.xreplace(replacements) for item in equations]
+    jacobian = sympy.Matrix(equations).jacobian(symbols) if symbols else sympy.zeros(len(equations), 0)
+
+    rows = [[jacobian[ii, jj] for jj in range(len(symbols))] for ii in range(len(equations))]
+    return CompiledConstraint([axes[item] for item in variables], len(equations), symbols + parameters, equations, rows)
+
+
+def cache_filename(key, directory=None):
+    if directory is None:
+        directory = popupcad.constraint_cache_dir
+    text = repr((format_version, sympy.__version__, key))
+    return os.path.join(directory, hashlib.sha1(text.encode('utf-8')).hexdigest() + '.json')
+
+
+def load(key):
+    '''the stored functions for key, or None. a file which cannot be read
+    back, damaged or written some other way, is removed so it is replaced.'''
+    filename = cache_filename(key)
+    try:
+        with open(filename, 'r') as f:
+            return CompiledConstraint.from_dict(json.load(f))
+    except (IOError, OSError):
+        return None
+    except (KeyError, TypeError, ValueError, SyntaxError, sympy.SympifyError):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        return None
+
+
+def save(key, compiled):
+    from dev_tools.genericfile import atomic_write
+    filename = cache_filename(key)
+    try:
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with atomic_write(filename, 'w') as f:
+            json.dump(compiled.to_dict(), f)
+    except (IOError, OSError):
+        pass
+
+
+def compiled(constraint):
+    '''
+    the shared functions for a constraint. they are looked for in memory,
+    then on disk, and only derived with sympy when neither has them.
+    '''
+    key = signature(constraint)
+    try:
+        return _memory[key]
+    except KeyError:
+        pass
+    with timer.phase('compile'):
+        persistent = popupcad.constraint_cache_dir is not None and key[1] is not None
+        result = load(key) if persistent else None
+        if result is None:
+            result = build(constraint, key)
+            if persistent:
+                save(key, result)
+    _memory[key] = result
+    return result
+
+
+def clear(disk=False):
+    _memory.clear()
+    if disk and popupcad.constraint_cache_dir is not None and os.path.isdir(popupcad.constraint_cache_dir):
+        for filename in os.listdir(popupcad.constraint_cache_dir):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(popupcad.constraint_cache_dir, filename))
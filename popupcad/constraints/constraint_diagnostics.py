@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import time
+import contextlib
+import numpy
+import scipy.linalg
+
+phases = ('generation', 'compile', 'evaluation', 'solve')
+
+
+class Timer(object):
+    '''
+    adds up the time spent in each phase of building and solving constraints.
+    phases may nest, in which case time spent in the inner phase is not
+    counted again in the outer one.
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = {}
+        self.counts = {}
+        self._stack = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.time()
+        self._stack.append(0.)
+        try:
+            yield
+        finally:
+            elapsed = time.time() - t0
+            inner = self._stack.pop()
+            self.totals[name] = self.totals.get(name, 0) + elapsed - inner
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def snapshot(self):
+        return dict(self.totals), dict(self.counts)
+
+timer = Timer()
+
+
+def dependencies(jacobian, rtol=1e-9):
+    '''
+    the rank of a jacobian and the equations which depend on others, found by
+    a qr factorization of its transpose with column pivoting. returns the rank
+    and, for each dependent equation, the equations it is a combination of
+    and the coefficient of each.
+    '''
+    n_eq, n_vars = jacobian.shape
+    if n_eq == 0 or n_vars == 0:
+        return 0, [(ii, [], []) for ii in range(n_eq)]
+    r, pivots = scipy.linalg.qr(jacobian.T, mode='r', pivoting=True)
+    diagonal = abs(numpy.diag(r))
+    if diagonal[0] == 0:
+        return 0, [(ii, [], []) for ii in range(n_eq)]
+    rank = int((diagonal > rtol * max(n_eq, n_vars) * diagonal[0]).sum())
+    independent = pivots[:rank]
+    dependent = []
+    if rank < n_eq:
+        coefficients = scipy.linalg.solve_triangular(r[:rank, :rank], r[:rank, rank:n_eq])
+        for kk, ii in enumerate(pivots[rank:n_eq]):
+            c = coefficients[:, kk]
+            used = abs(c) > 1e-8 * max(abs(c).max(), 1) if len(c) else numpy.zeros(0, dtype=bool)
+            dependent.append((int(ii), [int(item) for item in independent[used]], c[used]))
+    return rank, dependent
+
+
+class ComponentReport(object):
+    '''the rank, degrees of freedom, and last solve of one independent group of constraints'''
+
+    def __init__(self, component, q, residual_tolerance):
+        self.component = component
+        self.constraints = component.constraints
+        self.n_vars = component.n_vars
+        self.n_eq = component.n_eq
+        x = q[component.variables]
+        residual = component.residual(x)
+        jacobian = component.sparse_jacobian(x).toarray()
+        self.residual = abs(residual).max() if len(residual) else 0.
+        self.rank, dependent = dependencies(jacobian)
+        self.dof = self.n_vars - self.rank
+        self.info = getattr(component, 'info', None)
+
+        owner = numpy.zeros(self.n_eq, dtype=int)
+        ii = 0
+        for jj, constraint in enumerate(self.constraints):
+            n = constraint.num_equations()
+            owner[ii:ii + n] = jj
+            ii += n
+
+        # an equation which is a combination of others is redundant if its
+        # residual is the same combination of theirs, and conflicts otherwise
+        self.redundant = []
+        self.conflicting = []
+        for equation, used, coefficients in dependent:
+            group = sorted(set([owner[equation]] + [owner[item] for item in used]))
+            group = [self.constraints[item] for item in group]
+            if abs(residual[equation] - numpy.dot(coefficients, residual[used])) > residual_tolerance:
+                target = self.conflicting
+            else:
+                target = self.redundant
+            if not any([[id(item) for item in group] == [id(item) for item in other] for other in target]):
+                target.append(group)
+
+    def time(self):
+        return self.info['time'] if self.info else 0.
+
+
+class Diagnostics(object):
+    '''
+    what is known about a constraint system after it has been rebuilt and
+    solved: its rank and remaining degrees of freedom, which constraints are
+    redundant or conflict with each other, how each independent group of
+    constraints solved, and the time spent in each phase
+    '''
+    residual_tolerance = 1e-8
+    max_components = 10
+
+    def __init__(self, system, generator, q, timings):
+        self.system = system
+        self.totals, self.counts = timings
+        self.n_constraints = len(system.constraints)
+        self.n_vertex_variables = len(system.vertex_dict())
+        if generator.empty:
+            self.components = []
+        else:
+            self.components = [ComponentReport(component, q, self.residual_tolerance) for component in generator.components()]
+        self.n_vars = sum([item.n_vars for item in self.components])
+        self.n_eq = sum([item.n_eq for item in self.components])
+        self.rank = sum([item.rank for item in self.components])
+        self.dof = self.n_vertex_variables - self.rank
+        self.redundant = [group for item in self.components for group in item.redundant]
+        self.conflicting = [group for item in self.components for group in item.conflicting]
+        self.evaluations = sum([item.info['evaluations'] or 0 for item in self.components if item.info])
+
+    def describe(self, constraint):
+        try:
+            index = self.system.constraints.index(constraint)
+        except ValueError:
+            index = -1
+        return '#{0:d} {1}'.format(index, str(constraint))
+
+    def constraint_types(self):
+        '''the number of constraints of each type, and how they are evaluated'''
+        counts = {}
+        for constraint in self.system.constraints:
+            key = type(constraint).__name__, 'compiled' if constraint.terms is None else 'kernel'
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def report(self):
+        lines = []
+        lines.append('{0:<20}{1:>8}'.format('constraints', self.n_constraints))
+        lines.append('{0:<20}{1:>8}'.format('variables', self.n_vertex_variables))
+        lines.append('{0:<20}{1:>8}'.format('constrained', self.n_vars))
+        lines.append('{0:<20}{1:>8}'.format('equations', self.n_eq))
+        lines.append('{0:<20}{1:>8}'.format('jacobian rank', self.rank))
+        lines.append('{0:<20}{1:>8}'.format('degrees of freedom', self.dof))
+        lines.append('{0:<20}{1:>8}'.format('groups', len(self.components)))
+        lines.append('{0:<20}{1:>8}'.format('evaluations', self.evaluations))
+        lines.append('')
+        lines.append('time')
+        for key in phases:
+            lines.append('  {0:<18}{1:>8} {2:.3f}s'.format(key, self.counts.get(key, 0), self.totals.get(key, 0)))
+        lines.append('')
+        lines.append('constraint types')
+        for (name, path), count in sorted(self.constraint_types().items()):
+            lines.append('  {0:<30}{1:>8} {2}'.format(name, count, path))
+        if self.conflicting:
+            lines.append('')
+            lines.append('conflicting')
+            for group in self.conflicting:
+                lines.append('  ' + ', '.join([self.describe(item) for item in group]))
+        if self.redundant:
+            lines.append('')
+            lines.append('redundant')
+            for group in self.redundant:
+                lines.append('  ' + ', '.join([self.describe(item) for item in group]))
+        lines.append('')
+        lines.append('groups, slowest first')
+        lines.append('  {0:>8}{1:>8}{2:>8}{3:>8}{4:>12}{5:>9}{6:>10}  {7}'.format('vars', 'eqs', 'rank', 'dof', 'evaluations', 'time', 'residual', 'status'))
+        for item in sorted(self.components, key=lambda item: -item.time())[:self.max_components]:
+            info = item.info or {}
+            status = info.get('message', 'not solved') if not info.get('success', True) else ''
+            lines.append('  {0:>8}{1:>8}{2:>8}{3:>8}{4:>12}{5:>8.3f}s{6:>10.1e}  {7}'.format(item.n_vars, item.n_eq, item.rank, item.dof, str(info.get('evaluations', '-')), item.time(), item.residual, status))
+        return '\n'.join(lines)
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+
+
+def stack(rows, count):
+    '''a (count, equations, variables) array from nested lists of columns or constants'''
+    out = numpy.empty((count, len(rows), len(rows[0])))
+    for ii, row in enumerate(rows):
+        for jj, item in enumerate(row):
+            out[:, ii, jj] = item
+    return out
+
+
+def columns(items, count):
+    '''a (count, equations) array from a list of columns or constants'''
+    return stack([items], count)[:, 0]
+
+
+def vector(x, start):
+    '''the vector along the line whose end points' coordinates start at column start'''
+    return x[:, start + 2] - x[:, start], x[:, start + 3] - x[:, start + 1]
+
+
+def line_derivatives(dx, dy):
+    '''derivatives with respect to a line's end points, from those with respect to its vector'''
+    return [-dx, -dy, dx, dy]
+
+
+class Kernel(object):
+    '''
+    one form of equation, evaluated for many terms at once. subclasses define
+    f(x, p) and jacobian(x, p). x is a (terms, num_variables) array holding a
+    row of variable values for each term, and p a (terms, num_parameters)
+    array of parameters. f returns a (terms, num_equations) array of
+    residuals, and jacobian a (terms, num_equations, num_variables) array.
+    '''
+    name = 'kernel'
+    num_variables = 0
+    num_equations = 1
+    num_parameters = 0
+
+
+class Difference(Kernel):
+    '''a - b'''
+    name = 'difference'
+    num_variables = 2
+
+    def f(self, x, p):
+        return columns([x[:, 0] - x[:, 1]], len(x))
+
+    def jacobian(self, x, p):
+        return stack([[1., -1.]], len(x))
+
+
+class Offset(Kernel):
+    '''a - value'''
+    name = 'offset'
+    num_variables = 1
+    num_parameters = 1
+
+    def f(self, x, p):
+        return columns([x[:, 0] - p[:, 0]], len(x))
+
+    def jacobian(self, x, p):
+        return stack([[1.]], len(x))
+
+
+class Midpoint(Kernel):
+    '''a - (b + c) / 2'''
+    name = 'midpoint'
+    num_variables = 3
+
+    def f(self, x, p):
+        return columns([x[:, 0] - (x[:, 1] + x[:, 2]) / 2], len(x))
+
+    def jacobian(self, x, p):
+        return stack([[1., -.5, -.5]], len(x))
+
+
+class AbsoluteDifference(Kernel):
+    '''|b - a| - |value|'''
+    name = 'absolute_difference'
+    num_variables = 2
+    num_parameters = 1
+
+    def f(self, x, p):
+        return columns([abs(x[:, 1] - x[:, 0]) - abs(p[:, 0])], len(x))
+
+    def jacobian(self, x, p):
+        s = numpy.sign(x[:, 1] - x[:, 0])
+        return stack([[-s, s]], len(x))
+
+
+class Length(Kernel):
+    '''the length of a line, less value'''
+    name = 'length'
+    num_variables = 4
+    num_parameters = 1
+
+    def f(self, x, p):
+        vx, vy = vector(x, 0)
+        return columns([numpy.hypot(vx, vy) - p[:, 0]], len(x))
+
+    def jacobian(self, x, p):
+        vx, vy = vector(x, 0)
+        l = numpy.hypot(vx, vy)
+        return stack([line_derivatives(vx / l, vy / l)], len(x))
+
+
+class LengthDifference(Kernel):
+    '''the length of one line less that of another'''
+    name = 'length_difference'
+    num_variables = 8
+
+    def f(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        return columns([numpy.hypot(v1x, v1y) - numpy.hypot(v2x, v2y)], len(x))
+
+    def jacobian(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        l1 = numpy.hypot(v1x, v1y)
+        l2 = numpy.hypot(v2x, v2y)
+        return stack([line_derivatives(v1x / l1, v1y / l1) + line_derivatives(-v2x / l2, -v2y / l2)], len(x))
+
+
+class Cross(Kernel):
+    '''the cross product of two lines' vectors, second by first'''
+    name = 'cross'
+    num_variables = 8
+
+    def f(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        return columns([v2x * v1y - v2y * v1x], len(x))
+
+    def jacobian(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        return stack([line_derivatives(-v2y, v2x) + line_derivatives(v1y, -v1x)], len(x))
+
+
+class Dot(Kernel):
+    '''the dot product of two lines' vectors'''
+    name = 'dot'
+    num_variables = 8
+
+    def f(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        return columns([v2y * v1y + v2x * v1x], len(x))
+
+    def jacobian(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        return stack([line_derivatives(v2x, v2y) + line_derivatives(v1x, v1y)], len(x))
+
+
+class Angle(Kernel):
+    '''|v1 x v2| - sin(value) |v1| |v2|, with value in degrees'''
+    name = 'angle'
+    num_variables = 8
+    num_parameters = 1
+
+    def f(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        s = numpy.sin(p[:, 0] * numpy.pi / 180)
+        return columns([abs(v1x * v2y - v1y * v2x) - s * numpy.hypot(v1x, v1y) * numpy.hypot(v2x, v2y)], len(x))
+
+    def jacobian(self, x, p):
+        v1x, v1y = vector(x, 0)
+        v2x, v2y = vector(x, 4)
+        s = numpy.sin(p[:, 0] * numpy.pi / 180)
+        sign = numpy.sign(v1x * v2y - v1y * v2x)
+        l1 = numpy.hypot(v1x, v1y)
+        l2 = numpy.hypot(v2x, v2y)
+        d1 = line_derivatives(sign * v2y - s * l2 * v1x / l1, -sign * v2x - s * l2 * v1y / l1)
+        d2 = line_derivatives(-sign * v1y - s * l1 * v2x / l2, sign * v1x - s * l1 * v2y / l2)
+        return stack([d1 + d2], len(x))
+
+
+class LineAngle(Kernel):
+    '''the angle kernel, with the second line along the x axis'''
+    name = 'line_angle'
+    num_variables = 4
+    num_parameters = 1
+
+    def f(self, x, p):
+        vx, vy = vector(x, 0)
+        s = numpy.sin(p[:, 0] * numpy.pi / 180)
+        return columns([abs(vy) - s * numpy.hypot(vx, vy)], len(x))
+
+    def jacobian(self, x, p):
+        vx, vy = vector(x, 0)
+        s = numpy.sin(p[:, 0] * numpy.pi / 180)
+        l = numpy.hypot(vx, vy)
+        return stack([line_derivatives(-s * vx / l, numpy.sign(vy) - s * vy / l)], len(x))
+
+
+def projection(x):
+    '''
+    the offset e of a point from its projection onto a line, and its
+    derivatives with respect to the point and to the line's end points, for
+    variables ordered point, then line start, then line end
+    '''
+    px, py, ax, ay, bx, by = x.T
+    vx, vy = bx - ax, by - ay
+    wx, wy = px - ax, py - ay
+    vv = vx * vx + vy * vy
+    t = (vx * wx + vy * wy) / vv
+    ex, ey = wx - t * vx, wy - t * vy
+    dt_b = (wx - 2 * t * vx) / vv, (wy - 2 * t * vy) / vv
+    dt_a = (-wx - vx + 2 * t * vx) / vv, (-wy - vy + 2 * t * vy) / vv
+    de = [[1 - vx * vx / vv, -vx * vy / vv, (t - 1) - vx * dt_a[0], -vx * dt_a[1], -t - vx * dt_b[0], -vx * dt_b[1]],
+          [-vy * vx / vv, 1 - vy * vy / vv, -vy * dt_a[0], (t - 1) - vy * dt_a[1], -vy * dt_b[0], -t - vy * dt_b[1]]]
+    return ex, ey, de
+
+
+class PointOnLine(Kernel):
+    '''the offset of a point from its projection onto a line'''
+    name = 'point_on_line'
+    num_variables = 6
+    num_equations = 2
+
+    def f(self, x, p):
+        ex, ey, de = projection(x)
+        return columns([ex, ey], len(x))
+
+    def jacobian(self, x, p):
+        ex, ey, de = projection(x)
+        return stack(de, len(x))
+
+
+class PointLineDistance(Kernel):
+    '''the distance of a point from its projection onto a line, less value'''
+    name = 'point_line_distance'
+    num_variables = 6
+    num_parameters = 1
+
+    def f(self, x, p):
+        ex, ey, de = projection(x)
+        return columns([numpy.hypot(ex, ey) - p[:, 0]], len(x))
+
+    def jacobian(self, x, p):
+        ex, ey, de = projection(x)
+        l = numpy.hypot(ex, ey)
+        return stack([[(ex * dx + ey * dy) / l for dx, dy in zip(*de)]], len(x))
+
+
+kernels = dict([(kernel.name, kernel) for kernel in [Difference(), Offset(), Midpoint(), AbsoluteDifference(), Length(), LengthDifference(), Cross(), Dot(), Angle(), LineAngle(), PointOnLine(), PointLineDistance()]])
+
+
+def num_equations(terms):
+    return sum([kernels[name].num_equations for name, variables, parameters in terms])
+
+
+def place(terms, position, first=0):
+    '''
+    the terms of one constraint, given as (kernel name, variables, parameters),
+    with each variable replaced by position[variable] and with the rows their
+    equations fill, starting from first
+    '''
+    placed = []
+    for name, variables, parameters in terms:
+        m = kernels[name].num_equations
+        placed.append((name, [position[item] for item in variables], parameters, list(range(first, first + m))))
+        first += m
+    return placed
+
+
+class Batch(object):
+    '''
+    placed terms grouped by kernel, so that each kernel is evaluated once for
+    all of its terms. rows and cols give where each entry of the jacobian
+    returned by jacobian belongs.
+    '''
+
+    def __init__(self, terms):
+        groups = {}
+        for name, positions, parameters, equations in terms:
+            groups.setdefault(name, ([], [], []))
+            groups[name][0].append(positions)
+            groups[name][1].append(parameters)
+            groups[name][2].append(equations)
+        self.groups = []
+        rows = []
+        cols = []
+        for name in sorted(groups.keys()):
+            kernel = kernels[name]
+            positions, parameters, equations = groups[name]
+            count = len(positions)
+            positions = numpy.array(positions, dtype=int).reshape(count, kernel.num_variables)
+            parameters = numpy.array(parameters, dtype=float).reshape(count, kernel.num_parameters)
+            equations = numpy.array(equations, dtype=int).reshape(count, kernel.num_equations)
+            self.groups.append((kernel, positions, parameters, equations))
+            shape = count, kernel.num_equations, kernel.num_variables
+            rows.append(numpy.broadcast_to(equations[:, :, None], shape).flatten())
+            cols.append(numpy.broadcast_to(positions[:, None, :], shape).flatten())
+        self.rows = numpy.concatenate(rows + [numpy.zeros(0, dtype=int)])
+        self.cols = numpy.concatenate(cols + [numpy.zeros(0, dtype=int)])
+        self.num_equations = sum([equations.size for kernel, positions, parameters, equations in self.groups])
+
+    def residual(self, q, out):
+        '''writes the residual of every term into out'''
+        for kernel, positions, parameters, equations in self.groups:
+            out[equations] = kernel.f(q[positions], parameters)
+
+    def jacobian(self, q):
+        data = [kernel.jacobian(q[positions], parameters).flatten() for kernel, positions, parameters, equations in self.groups]
+        return numpy.concatenate(data + [numpy.zeros(0)])
+
+
+def functions(terms, variables):
+    '''residual and jacobian functions of one constraint's terms, taking the values of variables as arguments like its compiled functions'''
+    batch = Batch(place(terms, dict([(item, ii) for ii, item in enumerate(variables)])))
+
+    def f(*args):
+        out = numpy.zeros(batch.num_equations)
+        batch.residual(numpy.array(args, dtype=float), out)
+        return out
+
+    def jacobian(*args):
+        out = numpy.zeros((batch.num_equations, len(variables)))
+        numpy.add.at(out, (batch.rows, batch.cols), batch.jacobian(numpy.array(args, dtype=float)))
+        return out
+    return f, jacobian
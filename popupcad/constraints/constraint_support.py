@@ -21,9 +21,11 @@ class SymbolicVertex(object):
     def __init__(self, id):
         self.id = id
 
+    def variables(self):
+        return Variable(str(self) + '_x'), Variable(str(self) + '_y')
+
     def p(self):
-        p_x = Variable(str(self) + '_x')
-        p_y = Variable(str(self) + '_y')
+        p_x, p_y = self.variables()
         return sympy.Matrix([p_x, p_y, 0])
 
     def __hash__(self):
@@ -56,6 +58,9 @@ class SymbolicLine(object):
     def v(self):
         return self.p2() - self.p1()
 
+    def variables(self):
+        return self.vertex1.variables() + self.vertex2.variables()
+
     def lv(self):
         v = self.v()
         return (v.dot(v))**.5
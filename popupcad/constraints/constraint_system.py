@@ -8,27 +8,280 @@ Please see LICENSE for full license.
 import qt.QtCore as qc
 import qt.QtGui as qg
 
+import time
+import json
 import numpy
 import scipy.optimize
+import scipy.sparse
+import scipy.sparse.linalg
 import numpy.linalg
+import popupcad
 from popupcad.constraints.constraint_support import *     
 from popupcad.constraints.constraint import Constraint
+from popupcad.constraints.constraint_diagnostics import timer
+
+class Component(object):
+    '''
+    a set of equations and the variables they use, assembled sparsely. the
+    terms of built-in constraints are evaluated together in batch, by kernel.
+    each item holds another constraint's residual and jacobian functions, the
+    positions of its variables among the component's, and the rows its
+    equations fill.
+    '''
+    def __init__(self,items,variables,batch=None):
+        from popupcad.constraints.constraint_kernels import Batch
+        if batch is None:
+            batch = Batch([])
+        self.items = items
+        self.batch = batch
+        self.variables = variables
+        rows = [batch.rows]
+        cols = [batch.cols]
+        n_eq = batch.num_equations
+        for f_constraints,f_jacobian,var_indices,eq_indices in items:
+            rows.append(numpy.repeat(eq_indices,len(var_indices)))
+            cols.append(numpy.tile(var_indices,len(eq_indices)))
+            n_eq+=len(eq_indices)
+        self.rows = numpy.concatenate(rows).astype(int)
+        self.cols = numpy.concatenate(cols).astype(int)
+        self.n_eq = n_eq
+        self.n_vars = len(variables)
+
+    @classmethod
+    def from_constraints(cls,constraints,variables):
+        '''a component of constraints already mapped to a system, using the given system variables'''
+        from popupcad.constraints.constraint_kernels import Batch, place
+        items = []
+        terms = []
+        fallbacks = []
+        ii = 0
+        for constraint in constraints:
+            num_equations = constraint.num_equations()
+            var_indices = numpy.searchsorted(variables,constraint._var_indices)
+            if constraint.terms is None:
+                items.append((constraint.f_constraints,constraint.f_jacobian,var_indices,numpy.arange(ii,ii+num_equations)))
+                fallbacks.append(constraint)
+            else:
+                terms.extend(place(constraint.terms,dict(zip(constraint.variables,var_indices)),ii))
+            ii+=num_equations
+        new = cls(items,variables,Batch(terms))
+        new.constraints = constraints
+        new.fallbacks = fallbacks
+        return new
+
+    def residual(self,q):
+        '''the value of every equation, in order'''
+        with timer.phase('evaluation'):
+            q = numpy.asarray(q,dtype=float).flatten()
+            out = numpy.zeros(self.n_eq)
+            self.batch.residual(q,out)
+            for f_constraints,f_jacobian,var_indices,eq_indices in self.items:
+                out[eq_indices] = numpy.asarray(f_constraints(*q[var_indices]),dtype=float).flatten()
+            return out
+
+    def sparse_jacobian(self,q):
+        '''the jacobian of the equations, assembled from each constraint's block without forming any dense matrix'''
+        with timer.phase('evaluation'):
+            q = numpy.asarray(q,dtype=float).flatten()
+            data = [numpy.asarray(f_jacobian(*q[var_indices]),dtype=float).flatten() for f_constraints,f_jacobian,var_indices,eq_indices in self.items]
+            data = numpy.concatenate([self.batch.jacobian(q)]+data)
+            return scipy.sparse.csr_matrix((data,(self.rows,self.cols)),shape=(self.n_eq,self.n_vars))
+
+    def sparse(self):
+        return self.n_vars >= popupcad.sparse_constraint_threshold
+
+    def dq(self,q):
+        '''the residual, padded with zeros to one equation per variable for root()'''
+        zero = self.residual(q)
+        if self.n_vars > self.n_eq:
+            zero = numpy.r_[zero, [0] * (self.n_vars - self.n_eq)]
+        return zero
+
+    def j(self,q):
+        jnum = self.sparse_jacobian(q).toarray()
+        if self.n_vars > self.n_eq:
+            jnum = numpy.r_[jnum, numpy.zeros((self.n_vars - self.n_eq, self.n_vars))]
+        return jnum
+
+    def solve(self,q0,atol):
+        '''solves from q0, keeping the number of residual evaluations, the outcome and the time taken in info'''
+        t0 = time.time()
+        with timer.phase('solve'):
+            if self.sparse():
+                qout = scipy.optimize.least_squares(self.residual,q0,jac=self.sparse_jacobian,method='trf',
+                                                    tr_solver='lsmr',tr_options={'atol':atol,'btol':atol},
+                                                    ftol=atol,xtol=atol,gtol=atol)
+            else:
+                qout = scipy.optimize.root(self.dq,q0,jac=self.j,tol=atol,method='lm')
+        self.info = {'evaluations':getattr(qout,'nfev',None),'success':bool(qout.success),'message':str(qout.message),'time':time.time()-t0}
+        return qout.x
+
+    def task(self,q0,atol):
+        '''what a worker process needs to solve this component'''
+        items = [(constraint.compiled.to_dict(),constraint.parameter_values(),item[2],item[3]) for constraint,item in zip(self.fallbacks,self.items)]
+        return items,self.batch,self.variables,q0,atol
+
+_worker_functions = {}
+
+def worker_functions(data):
+    '''the functions for a compiled constraint sent to a worker process, built once per process'''
+    from popupcad.constraints.constraint_cache import CompiledConstraint
+    key = json.dumps(data,sort_keys=True)
+    try:
+        return _worker_functions[key]
+    except KeyError:
+        compiled = CompiledConstraint.from_dict(data)
+        _worker_functions[key] = compiled.f_constraints,compiled.f_jacobian
+        return _worker_functions[key]
+
+def bind(function,parameters):
+    parameters = [float(item) for item in parameters]
+    def bound(*args):
+        return function(*(list(args)+parameters))
+    return bound
+
+def solve_task(task):
+    '''solves a component in a worker process, building its functions from their expressions'''
+    items,batch,variables,q0,atol = task
+    items = [tuple([bind(function,parameters) for function in worker_functions(data)])+(var_indices,eq_indices) for data,parameters,var_indices,eq_indices in items]
+    component = Component(items,variables,batch)
+    return component.solve(q0,atol),component.info
+
+def dense_factor(jnum):
+    '''
+    the projection onto the motions a jacobian allows, and the smallest step
+    removing a residual, from its singular value decomposition. singular
+    values below a hundredth of the largest are treated as zero.
+    '''
+    u,s,vt = numpy.linalg.svd(jnum,full_matrices=False)
+    m = (abs(s) > (abs(s[0]) / 100)).sum() if len(s) else 0
+    u,s,vt = u[:,:m],s[:m],vt[:m]
+    def project(v):
+        return v - vt.T.dot(vt.dot(v))
+    def correct(r):
+        return vt.T.dot(u.T.dot(r)/s)
+    return project,correct
+
+def sparse_factor(jnum):
+    '''the same as dense_factor, from a sparse lu factorization of J*J.T,
+    regularized slightly so that redundant constraints do not make it singular'''
+    jnum = scipy.sparse.csr_matrix(jnum)
+    m = jnum.dot(jnum.T).tocsc()
+    scale = max(abs(m.diagonal()).max() if m.shape[0] else 0,1)
+    solve = scipy.sparse.linalg.splu((m + scipy.sparse.identity(m.shape[0],format='csc') * (1e-8 * scale)).tocsc()).solve
+    def project(v):
+        return v - jnum.T.dot(solve(jnum.dot(v)))
+    def correct(r):
+        return jnum.T.dot(solve(r))
+    return project,correct
+
+class Drag(object):
+    '''
+    what is kept between the mouse moves of one drag: the components being
+    moved and a factorization of each one's jacobian. each move starts from
+    where the last one ended and reuses the factorization, which is only
+    refreshed once the corrections made with it stop converging quickly.
+    '''
+    max_corrections = 10
+    contraction = .5
+
+    def __init__(self,generator,key,components,vertexdict):
+        self.generator = generator
+        self.key = key
+        self.components = components
+        self.variables = numpy.concatenate([component.variables for component in components]+[numpy.zeros(0,dtype=int)])
+        self.vertices = []
+        for ii in self.variables:
+            vertex = vertexdict[generator.variables[ii]]
+            if not any([item is vertex for item in self.vertices]):
+                self.vertices.append(vertex)
+        self.indices = numpy.array([[generator.var_index.get(variable,-1) for variable in vertex.constraints_ref().variables()] for vertex in self.vertices],dtype=int).reshape(-1,2)
+        self.factors = [None]*len(components)
+        self.moves = 0
+        self.factorizations = 0
+
+    def positions(self):
+        '''the system variables, with those of the dragged components filled in from their vertices'''
+        q = numpy.zeros(self.generator.n_vars())
+        if self.vertices:
+            known = self.indices >= 0
+            q[self.indices[known]] = numpy.array([vertex.getpos()[:2] for vertex in self.vertices],dtype=float)[known]
+        return q
+
+    def set_positions(self,q):
+        if self.vertices:
+            known = self.indices >= 0
+            positions = numpy.array([vertex.getpos()[:2] for vertex in self.vertices],dtype=float)
+            positions[known] = q[self.indices[known]]
+            for vertex,position in zip(self.vertices,positions.tolist()):
+                vertex.setpos(tuple(position))
+
+    def factor(self,component,x):
+        self.factorizations+=1
+        if component.sparse():
+            return sparse_factor(component.sparse_jacobian(x))
+        return dense_factor(component.sparse_jacobian(x).toarray())
+
+    @staticmethod
+    def error(r):
+        return abs(r).max() if len(r) else 0.
+
+    def move(self,q,dx,budget,atol):
+        '''
+        moves q by the part of dx its constraints allow, then steps each
+        component back onto its constraints. corrections and refactorizations
+        stop once the budget, in seconds, has been spent; whatever error
+        remains is left for the full solve when the drag ends. the first move
+        of a drag is exempt, as it cannot move without factoring each component.
+        '''
+        t_end = time.time()+budget
+        q = q.copy()
+        self.moves+=1
+        for ii,component in enumerate(self.components):
+            x = q[component.variables]
+            if self.factors[ii] is None:
+                self.factors[ii] = self.factor(component,x)
+            project,correct = self.factors[ii]
+            x = x + project(dx[component.variables])
+            r = component.residual(x)
+            error = self.error(r)
+            refactored = False
+            for jj in range(self.max_corrections):
+                if error <= atol or time.time() > t_end:
+                    break
+                x_new = x - correct(r)
+                r_new = component.residual(x_new)
+                error_new = self.error(r_new)
+                slow = error_new > self.contraction*error
+                if error_new < error:
+                    x,r,error = x_new,r_new,error_new
+                elif refactored:
+                    break
+                if slow and not refactored and time.time() <= t_end:
+                    self.factors[ii] = project,correct = self.factor(component,x)
+                    refactored = True
+            q[component.variables] = x
+        return q
 
 class Generator(object):
     def __init__(self,constraints,vertex_dict,objects):
         self.constraints = constraints
         self.vertex_dict = vertex_dict
-        self.equations = self.get_equations()
-        self.variables = self.get_variables()
-#        self.build_constraint_mappings(self.constraints,self.variables,self.n_eq())
-        self.regenerate_inner(objects,self.constraints,self.variables,self.n_eq())
+        with timer.phase('generation'):
+            self.variables = self.get_variables()
+#            self.build_constraint_mappings(self.constraints,self.variables,self.n_eq())
+            self.regenerate_inner(objects,self.constraints,self.variables,self.n_eq())
         
+    @property
+    def equations(self):
+        return self.get_equations()
+
     def get_equations(self):
         equations = [eq for con in self.constraints for eq in con.generated_equations]
         return equations
         
     def get_variables(self):
-        variables = [item for equation in self.equations for item in list(equation.atoms(Variable))]
+        variables = [item for constraint in self.constraints for item in constraint.variables]
         variables = sorted(set(variables),key=lambda item:str(item))
         return variables
 
@@ -36,59 +289,82 @@ class Generator(object):
         return len(self.constraints)
         
     def n_eq(self):
-        return len(self.equations)
+        return sum([constraint.num_equations() for constraint in self.constraints])
         
     def n_vars(self):
         return len(self.variables)    
 
     @staticmethod
     def build_constraint_mappings(constraints,variables,n_eq):
+        var_index = dict([(item,ii) for ii,item in enumerate(variables)])
         ii = 0
         for constraint in constraints:
-            l=len(constraint.generated_equations)
-            constraint.build_system_mapping(variables,n_eq,range(ii,ii+l))
+            l=constraint.num_equations()
+            constraint.build_system_mapping(var_index,n_eq,range(ii,ii+l))
             ii+=l
+        return var_index
 
     def regenerate_inner(self,objects,constraints,variables,n_eq):
         n_constraints = self.n_constraints()
-        n_eq = self.n_eq()
-        n_vars = self.n_vars()
         
         if n_constraints > 0:
             if len(objects) > 0:
                 
-                self.build_constraint_mappings(constraints,variables,n_eq)
-                 
-                def dq(q):
-                    qlist = q.flatten().tolist()
-
-                    zero = numpy.zeros(n_eq,dtype=float)
-                    for constraint in self.constraints:
-                        result = constraint.mapped_f_constraints(*qlist[:])
-                        zero+=result
-
-                    if n_vars > n_eq:
-                        zero = numpy.r_[zero.flatten(), [0] * (n_vars - n_eq)]
-                    return zero
-
-                def j(q):
-                    qlist = q.flatten().tolist()
-
-                    jnum = numpy.zeros((n_eq,n_vars))
-                    for constraint in self.constraints:
-                        jnum+=constraint.mapped_f_jacobian(*qlist[:])
-                    
-                    if n_vars > n_eq:
-                        jnum = numpy.r_[jnum, numpy.zeros((n_vars - n_eq, n_vars))]
-                    return jnum
-                
-                self.dq = dq
-                self.j = j
+                self.var_index = self.build_constraint_mappings(constraints,variables,n_eq)
+                self.system = Component.from_constraints(constraints,numpy.arange(len(variables)))
+                self.dq = self.system.dq
+                self.j = self.system.j
                 self.empty = False
                 return
 
         self.empty = True
 
+    def residual(self,q):
+        return self.system.residual(q)
+
+    def sparse_jacobian(self,q):
+        return self.system.sparse_jacobian(q)
+
+    def sparse(self):
+        return self.system.sparse()
+
+    def components(self):
+        '''
+        the constraints split into groups which share no variables, found as
+        the connected components of the graph joining each constraint's
+        variables. each group can be solved on its own.
+        '''
+        try:
+            return self._components
+        except AttributeError:
+            pass
+        import scipy.sparse.csgraph
+        n_vars = self.n_vars()
+        a = [numpy.repeat(constraint._var_indices[:1],len(constraint._var_indices)) for constraint in self.constraints]
+        b = [constraint._var_indices for constraint in self.constraints]
+        a = numpy.concatenate(a+[numpy.zeros(0,dtype=int)])
+        b = numpy.concatenate(b+[numpy.zeros(0,dtype=int)])
+        graph = scipy.sparse.coo_matrix((numpy.ones(len(a)),(a,b)),shape=(n_vars,n_vars))
+        count,labels = scipy.sparse.csgraph.connected_components(graph,directed=False)
+        groups = [[] for ii in range(count)]
+        for constraint in self.constraints:
+            if len(constraint._var_indices):
+                groups[labels[constraint._var_indices[0]]].append(constraint)
+        order = numpy.argsort(labels,kind='stable')
+        splits = numpy.cumsum(numpy.bincount(labels,minlength=count))[:-1]
+        variables = numpy.split(order,splits)
+        self._components = [Component.from_constraints(group,item) for group,item in zip(groups,variables)]
+        return self._components
+
+    def variable_indices(self,vertices):
+        '''the positions among the system variables of the given vertices' coordinates'''
+        indices = []
+        for vertex in vertices:
+            for variable in vertex.constraints_ref().variables():
+                if variable in self.var_index:
+                    indices.append(self.var_index[variable])
+        return numpy.array(indices,dtype=int)
+
 #        return None,None
         
 class ConstraintSystem(object):
@@ -98,6 +374,13 @@ class ConstraintSystem(object):
     def __init__(self):
         self.constraints = []
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_get_vertices', None)
+        state.pop('_generator', None)
+        state.pop('_drag', None)
+        return state
+
     @property
     def get_vertices(self):
         try:
@@ -132,7 +415,7 @@ class ConstraintSystem(object):
         objects = self.get_vertices
         vertex_dict = {}
         for vertex in objects:
-            p = vertex.p()[0:2]
+            p = vertex.constraints_ref().variables()
             vertex_dict[p[0]] = vertex
             vertex_dict[p[1]] = vertex
         return vertex_dict
@@ -141,7 +424,7 @@ class ConstraintSystem(object):
         objects = self.get_vertices
         ini = {}
         for vertex in objects:
-            p = vertex.p()[0:2]
+            p = vertex.constraints_ref().variables()
             pos = vertex.getpos()
             for key, value in zip(p, pos):
                 ini[key] = value
@@ -161,74 +444,124 @@ class ConstraintSystem(object):
             del self._generator
         except AttributeError:
             pass
+        self.end_drag()
+
+    def drag(self,vertices):
+        '''the drag moving the given vertices, continuing the current one if it moves the same vertices'''
+        generator = self.generator
+        key = frozenset([vertex.id for vertex in vertices])
+        try:
+            if self._drag.generator is generator and self._drag.key == key:
+                return self._drag
+        except AttributeError:
+            pass
+        touched = numpy.zeros(generator.n_vars(),dtype=bool)
+        touched[generator.variable_indices(vertices)] = True
+        components = [component for component in generator.components() if touched[component.variables].any()]
+        self._drag = Drag(generator,key,components,self.vertex_dict())
+        return self._drag
+
+    def end_drag(self):
+        try:
+            del self._drag
+        except AttributeError:
+            pass
         
-    def update(self):
+    def update(self,vertices=None):
+        '''solves the constraints one independent group at a time. with
+        vertices given, only the groups acting on them are solved. this
+        ends any drag, starting from where its last move left the vertices.'''
+        self.end_drag()
         if not self.generator.empty:
-            dq = self.generator.dq
-            variables = self.generator.variables
-            j = self.generator.j
-            vertexdict = self.generator.vertex_dict
-    
+            generator = self.generator
+            variables = generator.variables
             vertexdict = self.vertex_dict()
             ini = self.ini(vertexdict)
             q0 = self.inilist(variables,ini)
-            qout = scipy.optimize.root(dq,q0,jac=j,tol=self.atol,method='lm')
-            qout = qout.x.tolist()
-    
-    #            qout = opt.newton_krylov(dq2,numpy.array(self.inilist(variables,ini)),f_tol = self.atol,f_rtol = self.rtol)
-    #            qout = opt.anderson(dq2,numpy.array(self.inilist(variables,ini)),f_tol = self.atol,f_rtol = self.rtol)
-    #            qout = qout.tolist()
-    #            qout = opt.root(dq2,numpy.array(self.inilist(variables,ini)),tol = self.atol,method = 'hybr')
-    #            qout = opt.root(dq2,numpy.array(self.inilist(variables,ini)),tol = self.atol,method = 'linearmixing')
-    #            qout = opt.root(dq2,numpy.array(self.inilist(variables,ini)),tol = self.atol,method = 'excitingmixing')
-    #            qout = opt.root(dq2,numpy.array(self.inilist(variables,ini)),tol = self.atol,method = 'lm')
-    #            qout = qout.x.tolist()
-    
-            for ii, variable in enumerate(variables):
-                vertexdict[variable].setsymbol(variable, qout[ii])
+
+            components = generator.components()
+            if vertices is not None:
+                touched = numpy.zeros(len(variables),dtype=bool)
+                touched[generator.variable_indices(vertices)] = True
+                components = [component for component in components if touched[component.variables].any()]
+
+            qout = q0.copy()
+            for component,x in zip(components,self.solve_components(components,q0)):
+                qout[component.variables] = x
+            solved = numpy.concatenate([component.variables for component in components]+[numpy.zeros(0,dtype=int)])
+            self.set_variables([variables[ii] for ii in solved],qout[solved],vertexdict)
+
+    def solve_components(self,components,q0):
+        '''solves each component starting from q0. when several are large
+        enough, those are solved together in worker processes.'''
+        import popupcad.algorithms.parallel
+        large = [component for component in components if component.n_vars >= popupcad.parallel_constraint_threshold]
+        results = {}
+        if len(large) > 1:
+            tasks = [component.task(q0[component.variables],self.atol) for component in large]
+            for component,(x,info) in zip(large,popupcad.algorithms.parallel.map_parallel(solve_task,tasks)):
+                component.info = info
+                results[id(component)] = x
+        return [results[id(component)] if id(component) in results else component.solve(q0[component.variables],self.atol) for component in components]
+
+    def diagnostics(self):
+        '''
+        rebuilds and solves the system from scratch, timing each phase, and
+        returns a Diagnostics describing it. it is solved on copies of the
+        vertices, so the sketch is left as it was. the compiled functions
+        held in memory are dropped first, so that compiling is timed too.
+        its report() is a readable summary.
+        '''
+        from popupcad.constraints import constraint_cache
+        from popupcad.constraints.constraint_diagnostics import Diagnostics
+        vertices = [vertex.copy(identical=True) for vertex in self.get_vertices]
+        trial = ConstraintSystem()
+        trial.constraints = self.constraints
+        trial.get_vertices = lambda: vertices
+        timer.reset()
+        constraint_cache.clear()
+        for constraint in self.constraints:
+            del constraint.generated_equations
+        del self.generator
+        trial.update()
+        generator = trial.generator
+        q = trial.inilist(generator.variables,trial.ini(None)) if not generator.empty else numpy.zeros(0)
+        return Diagnostics(trial,generator,q,timer.snapshot())
+
+    def set_variables(self,variables,values,vertexdict=None):
+        if vertexdict is None:
+            vertexdict = self.vertex_dict()
+        for variable,value in zip(variables,values):
+            vertexdict[variable].setsymbol(variable,value)
 
     def update_selective(self,vertices):
-        self.update()
+        self.update(vertices)
         
     def constrained_shift(self, items):
-        vertexdict = self.vertex_dict()
-        ini = self.ini(vertexdict)
+        '''
+        moves the given (vertex, offset) pairs, carrying along whatever their
+        constraints require. consecutive calls for the same vertices are one
+        drag, which keeps its factorizations between moves and limits each
+        move to popupcad.drag_time_budget. the drag ends when update is called.
+        '''
         if self.generator.empty:
             for vertex, dxdy in items:
                 vertex.shift(dxdy)
         else:
-            variables = self.generator.variables
-            j = self.generator.j
-            vertexdict = self.generator.vertex_dict
-    
-            dx_dict = {}
+            generator = self.generator
+            dx = numpy.zeros(generator.n_vars())
             for vertex, dxdy in items:
-                key_x, key_y = vertex.constraints_ref().p()[:2]
-                dx_dict[key_x] = dxdy[0]
-                dx_dict[key_y] = dxdy[1]
-    
-            dx = numpy.zeros(len(variables))
-            for key in dx_dict:
-                if key in variables:
-                    dx[variables.index(key)] = dx_dict[key]
-                else:
-                    vertexdict[key].setsymbol(key, ini[key] + dx_dict[key])
-    
-            x0 = numpy.array(self.inilist(variables, ini))
-            Jnum = j(x0)
-            L, S, R = numpy.linalg.svd(Jnum)
-            aS = abs(S)
-            m = (aS > (aS[0] / 100)).sum()
-    
-            rnull = R[m:]
-            lnull = ((rnull**2).sum(1))**.5
-            comp = ((rnull * dx).sum(1)) / lnull
-            x_motion = (comp * rnull.T).sum(1)
-    
-            x = x0 + x_motion
-    
-            for ii, variable in enumerate(variables):
-                vertexdict[variable].setsymbol(variable, x[ii])
+                position = list(vertex.getpos())
+                for axis, key in enumerate(vertex.constraints_ref().variables()):
+                    if key in generator.var_index:
+                        dx[generator.var_index[key]] = dxdy[axis]
+                    else:
+                        position[axis] += dxdy[axis]
+                vertex.setpos(tuple(position))
+
+            drag = self.drag([vertex for vertex, dxdy in items])
+            x = drag.move(drag.positions(), dx, popupcad.drag_time_budget, self.atol)
+            drag.set_positions(x)
 #
     def cleanup(self):
         sketch_objects = self.get_vertices
@@ -49,6 +49,15 @@ class FixedConstraint(Constraint):
             new.id = self.id
         return new
 
+    def structure(self):
+        return ()
+
+    def parameter_values(self):
+        return [coordinate for value in self.values for coordinate in value]
+
+    def set_parameters(self,parameters):
+        self.values = list(zip(parameters[0::2],parameters[1::2]))
+
     def symbolic_equations(self):
         eqs = []
         for vertex, val in zip(self.getvertices(), self.values):
@@ -56,6 +65,14 @@ class FixedConstraint(Constraint):
             eqs.append(vertex.p()[1] - val[1])
         return eqs
 
+    def kernel_terms(self):
+        terms = []
+        for vertex, val in zip(self.getvertices(), self.values):
+            x, y = vertex.variables()
+            terms.append(('offset', [x], [val[0]]))
+            terms.append(('offset', [y], [val[1]]))
+        return terms
+
 
 class HorizontalConstraint(Constraint):
     name = 'Horizontal'
@@ -70,6 +87,11 @@ class HorizontalConstraint(Constraint):
             eqs.append(vertex.p()[1] - p0[1])
         return eqs
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        y0 = vertices.pop(0).variables()[1]
+        return [('difference', [vertex.variables()[1], y0], []) for vertex in vertices]
+
 
 class VerticalConstraint(Constraint):
     name = 'Vertical'
@@ -84,6 +106,11 @@ class VerticalConstraint(Constraint):
             eqs.append(vertex.p()[0] - p0[0])
         return eqs
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        x0 = vertices.pop(0).variables()[0]
+        return [('difference', [vertex.variables()[0], x0], []) for vertex in vertices]
+
 
 class DistanceConstraint(ValueConstraint):
     name = 'distance'
@@ -104,6 +131,15 @@ class DistanceConstraint(ValueConstraint):
             eq = l1 - self.value
             return [eq]
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        p0 = vertices[0].variables()
+        p1 = vertices[1].variables()
+        if self.value == 0.:
+            return [('difference', [p1[0], p0[0]], []), ('difference', [p1[1], p0[1]], [])]
+        else:
+            return [('length', list(p0 + p1), [self.value])]
+
 
 class CoincidentConstraint(Constraint):
     name = 'Coincident Points'
@@ -119,6 +155,16 @@ class CoincidentConstraint(Constraint):
             eq.append(p[1] - p0[1])
         return eq
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        p0 = vertices.pop().variables()
+        terms = []
+        for vertex in vertices:
+            p = vertex.variables()
+            terms.append(('difference', [p[0], p0[0]], []))
+            terms.append(('difference', [p[1], p0[1]], []))
+        return terms
+
 
 class XDistanceConstraint(ValueConstraint):
     name = 'X Distance'
@@ -133,11 +179,21 @@ class XDistanceConstraint(ValueConstraint):
                 ((self.value)**2)**.5
         return [eq]
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        if len(vertices) == 1:
+            return [('offset', [vertices[0].variables()[0]], [self.value])]
+        else:
+            return [('absolute_difference', [vertices[0].variables()[0], vertices[1].variables()[0]], [self.value])]
+
 
 class YDistanceConstraint(ValueConstraint):
     name = 'Y Distance'
     validity_tests = [Constraint.at_least_one_point]
 
+    def structure(self):
+        return (self.value == 0, popupcad.flip_y)
+
     def symbolic_equations(self):
         vertices = self.getallvertices()
         if popupcad.flip_y:
@@ -151,6 +207,17 @@ class YDistanceConstraint(ValueConstraint):
                 ((self.value)**2)**.5
         return [eq]
 
+    def kernel_terms(self):
+        vertices = self.getallvertices()
+        if popupcad.flip_y:
+            temp = 1.
+        else:
+            temp = -1.
+        if len(vertices) == 1:
+            return [('offset', [vertices[0].variables()[1]], [self.value * temp])]
+        else:
+            return [('absolute_difference', [vertices[0].variables()[1], vertices[1].variables()[1]], [self.value])]
+
 
 class AngleConstraint(ValueConstraint):
     name = 'Angle'
@@ -180,13 +247,26 @@ class AngleConstraint(ValueConstraint):
                 eq = v2[0] * v1[1] - v2[1] * v1[0]
         return [eq]
 
+    def kernel_terms(self):
+        lines = self.getlines()[0:2]
+        if self.value != 0:
+            if len(lines) == 1:
+                return [('line_angle', list(lines[0].variables()), [self.value])]
+            else:
+                return [('angle', list(lines[0].variables() + lines[1].variables()), [self.value])]
+        else:
+            if len(lines) == 1:
+                return [('difference', [lines[0].vertex2.variables()[1], lines[0].vertex1.variables()[1]], [])]
+            else:
+                return [('cross', list(lines[0].variables() + lines[1].variables()), [])]
+
 
 class ParallelLinesConstraint(Constraint):
     name = 'Parallel Lines'
     validity_tests = [Constraint.at_least_two_lines]
 
     def symbolic_equations(self):
-        lines = self.getlines()
+        lines = self.getlines()[:]
         v1 = lines.pop(0).v()
         eq = []
         for line in lines:
@@ -194,6 +274,11 @@ class ParallelLinesConstraint(Constraint):
             eq.append(v2[0] * v1[1] - v2[1] * v1[0])
         return eq
 
+    def kernel_terms(self):
+        lines = self.getlines()[:]
+        v1 = lines.pop(0).variables()
+        return [('cross', list(v1 + line.variables()), []) for line in lines]
+
 
 class EqualLengthLinesConstraint(Constraint):
     name = 'Equal Length Lines'
@@ -209,6 +294,11 @@ class EqualLengthLinesConstraint(Constraint):
             eqs.append(length0 - length)
         return eqs
 
+    def kernel_terms(self):
+        lines = self.getlines()[:]
+        v1 = lines.pop(0).variables()
+        return [('length_difference', list(v1 + line.variables()), []) for line in lines]
+
 
 class PerpendicularLinesConstraint(Constraint):
     name = 'Perpendicular Lines'
@@ -220,6 +310,10 @@ class PerpendicularLinesConstraint(Constraint):
         v2 = lines[1].v()
         return [v2[1] * v1[1] + v2[0] * v1[0]]
 
+    def kernel_terms(self):
+        lines = self.getlines()[0:2]
+        return [('dot', list(lines[0].variables() + lines[1].variables()), [])]
+
 
 class PointLineDistanceConstraint(ValueConstraint):
     name = 'Point-Line Distance'
@@ -245,6 +339,13 @@ class PointLineDistanceConstraint(ValueConstraint):
             eq = l1 - self.value
             return [eq]
 
+    def kernel_terms(self):
+        variables = list(self.getvertices()[0].variables() + self.getlines()[0].variables())
+        if self.value == 0.:
+            return [('point_on_line', variables, [])]
+        else:
+            return [('point_line_distance', variables, [self.value])]
+
 
 class LineMidpointConstraint(Constraint):
     name = 'Point on Line Midpoint'
@@ -260,6 +361,13 @@ class LineMidpointConstraint(Constraint):
         eq.append(p1[1] - p0[1])
         return eq
 
+    def kernel_terms(self):
+        line = self.getlines()[0]
+        p1 = self.getvertices()[0].variables()
+        a = line.vertex1.variables()
+        b = line.vertex2.variables()
+        return [('midpoint', [p1[0], a[0], b[0]], []), ('midpoint', [p1[1], a[1], b[1]], [])]
+
 if __name__ == '__main__':
 #    a = SymbolicVertex(1)
 #    b = SymbolicVertex(2)
@@ -5,14 +5,19 @@ Email: danaukes<at>asu.edu.
 Please see LICENSE for full license.
 """
 
+from . import backup_store
+from . import binary_format
 from . import classtools
 from . import design
+from . import dxfimport
 from . import popupcad_file
 from . import genericlaminate
 from . import genericshapebase
 from . import genericshapes
 from . import laminate
+from . import lazydict
 from . import layer
+from . import journal
 from . import layerdef
 from . import listwidgetitem
 from . import material2
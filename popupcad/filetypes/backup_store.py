@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import glob
+import json
+import functools
+import hashlib
+import popupcad
+import popupcad.filetypes.binary_format as binary_format
+from popupcad.filetypes.lazydict import LazyDict, LazyValue
+from dev_tools.genericfile import atomic_write
+
+format_name = 'popupcad-backup'
+format_version = 1
+
+
+class BackupStore(object):
+    '''
+    content-addressed store of backups.
+
+    each operation, sketch and subdesign named in a class's chunked_attributes
+    is encoded on its own and stored once under the hash of its content, along
+    with whatever is left of the object. a backup is then a small manifest of
+    hashes, and anything unchanged since an earlier backup costs nothing to keep.
+    an attribute whose entries share objects with the rest of the object, as
+    operations referring to layers do, is kept with the rest instead.
+    '''
+    extension = 'manifest'
+    objects_dirname = 'backup_objects'
+
+    def __init__(self, folder=None):
+        if folder is None:
+            folder = popupcad.backupdir
+        self.folder = folder
+        self.objects_folder = os.path.normpath(os.path.join(folder, self.objects_dirname))
+
+    def object_filename(self, key, extension='npz'):
+        return os.path.join(self.objects_folder, key[:2], key + '.' + extension)
+
+    def write_object(self, filename, write):
+        if os.path.exists(filename):
+            #marks it as in use, so collect_garbage leaves it for the manifest about to refer to it
+            os.utime(filename, None)
+            return
+        directory = os.path.dirname(filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with atomic_write(filename, 'wb') as f:
+            write(f)
+
+    def put(self, obj):
+        '''stores obj unless identical content is already there, and returns its hash'''
+        arrays = binary_format.encode(obj)
+        key = binary_format.digest(arrays)
+        self.write_object(self.object_filename(key), lambda f: binary_format.write_arrays(arrays, f, True))
+        return key
+
+    def put_bytes(self, data):
+        key = hashlib.sha1(data).hexdigest()
+        self.write_object(self.object_filename(key, 'raw'), lambda f: f.write(data))
+        return key
+
+    def get(self, key):
+        return binary_format.load(self.object_filename(key))
+
+    def get_bytes(self, key):
+        with open(self.object_filename(key, 'raw'), 'rb') as f:
+            return f.read()
+
+    def manifest_prefix(self, obj, backupstring):
+        basename = os.path.splitext(obj.get_basename())[0]
+        return os.path.normpath(os.path.join(self.folder, basename + backupstring))
+
+    def backup(self, obj, backupstring='_backup_'):
+        '''writes a backup of obj and returns the name of its manifest'''
+        encoder = binary_format.Encoder()
+        encoder.count(obj)
+        state = dict(encoder.get_state(obj))
+        chunks = {}
+        for name in getattr(type(obj), 'chunked_attributes', ()):
+            value = state[name]
+            items = list(value.values()) if isinstance(value, dict) else value
+            if not all([encoder.separable_counts(item) is not None for item in items]):
+                #stored whole with the rest of the state, so that objects it
+                #shares with other attributes stay shared when restored
+                continue
+            state.pop(name)
+            if isinstance(value, dict):
+                chunks[name] = {'dict': [[key, self.put(item)] for key, item in value.items()]}
+            else:
+                chunks[name] = {'list': [self.put(item) for item in value]}
+        manifest = {'format': format_name,
+                    'version': format_version,
+                    'class': binary_format.class_name(type(obj)),
+                    'state': self.put(state),
+                    'chunks': chunks}
+
+        return self.write_manifest(obj, manifest, backupstring)
+
+    def backup_source(self, obj, source, backupstring='_backup_'):
+        '''backs up the file obj was loaded from, byte for byte. a file backed
+        up before, such as one opened repeatedly, is only stored once.'''
+        with open(source, 'rb') as f:
+            data = f.read()
+        manifest = {'format': format_name,
+                    'version': format_version,
+                    'source': self.put_bytes(data)}
+        return self.write_manifest(obj, manifest, backupstring)
+
+    def write_manifest(self, obj, manifest, backupstring):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        prefix = self.manifest_prefix(obj, backupstring)
+        time = popupcad.basic_functions.return_formatted_time(specificity='minute')
+        filename = prefix + time + '.' + self.extension
+        with atomic_write(filename, 'w') as f:
+            json.dump(manifest, f)
+        self.trim(prefix)
+        return filename
+
+    @staticmethod
+    def read_manifest(filename):
+        with open(filename, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != format_name:
+            raise ValueError('not a backup manifest: ' + filename)
+        return manifest
+
+    def restore(self, filename, lazy=False):
+        '''rebuilds the object a manifest was written from. with lazy set,
+        chunked dictionaries are only read from the store as they are used.'''
+        manifest = self.read_manifest(filename)
+        if 'source' in manifest:
+            return self.restore_source(manifest['source'])
+        state = self.get(manifest['state'])
+        for name, chunk in manifest['chunks'].items():
+            if 'dict' in chunk:
+                if lazy:
+                    value = LazyDict()
+                    for key, item in chunk['dict']:
+                        dict.__setitem__(value, key, LazyValue(functools.partial(self.get, item)))
+                else:
+                    value = dict([(key, self.get(item)) for key, item in chunk['dict']])
+            else:
+                value = [self.get(item) for item in chunk['list']]
+            state[name] = value
+        cls = binary_format.find_class(manifest['class'])
+        obj = cls.__new__(cls)
+        binary_format.set_state(obj, state)
+        return obj
+
+    def restore_source(self, key):
+        import io
+        import yaml
+        data = self.get_bytes(key)
+        if data[:len(binary_format.magic)] == binary_format.magic:
+            return binary_format.loads(data)
+        return yaml.load(io.StringIO(data.decode('utf-8')), Loader=yaml.FullLoader)
+
+    def export(self, filename, destination):
+        '''writes a backup out as a regular file'''
+        manifest = self.read_manifest(filename)
+        if 'source' in manifest:
+            with atomic_write(destination, 'wb') as f:
+                f.write(self.get_bytes(manifest['source']))
+            return
+        obj = self.restore(filename)
+        obj.save_yaml(destination, update_filename=False)
+        return obj
+
+    def manifests(self, pattern='*'):
+        return sorted(glob.glob(os.path.join(self.folder, pattern + '.' + self.extension)))
+
+    def trim(self, prefix, limit=None):
+        '''keeps only the newest backups starting with prefix, then removes
+        stored objects no longer referred to by any manifest'''
+        if limit is None:
+            limit = popupcad.backup_store_limit
+        existing = glob.glob(prefix + '*.' + self.extension)
+        existing.sort(reverse=True)
+        if len(existing) <= limit:
+            return
+        for item in existing[limit:]:
+            os.remove(item)
+        self.collect_garbage()
+
+    def referenced(self):
+        keys = set()
+        for filename in self.manifests():
+            try:
+                manifest = self.read_manifest(filename)
+            except ValueError:
+                continue
+            if 'source' in manifest:
+                keys.add(manifest['source'])
+                continue
+            keys.add(manifest['state'])
+            for chunk in manifest['chunks'].values():
+                if 'dict' in chunk:
+                    keys.update([item for key, item in chunk['dict']])
+                else:
+                    keys.update(chunk['list'])
+        return keys
+
+    def collect_garbage(self):
+        '''removes stored objects no manifest refers to. objects written after
+        the newest manifest are kept, since they may belong to a backup still
+        being written.'''
+        manifests = self.manifests()
+        if not manifests:
+            return
+        newest = max([os.path.getmtime(item) for item in manifests])
+        keys = self.referenced()
+        for filename in glob.glob(os.path.join(self.objects_folder, '*', '*.*')):
+            if os.path.splitext(os.path.basename(filename))[0] in keys:
+                continue
+            if os.path.getmtime(filename) > newest:
+                continue
+            os.remove(filename)
+
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) == 3:
+        BackupStore(os.path.dirname(os.path.abspath(sys.argv[1]))).export(sys.argv[1], sys.argv[2])
+    else:
+        for filename in BackupStore(sys.argv[1] if len(sys.argv) > 1 else None).manifests():
+            print(filename)
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import io
+import functools
+import hashlib
+import json
+import sys
+import types
+import zipfile
+import numpy
+
+format_name = 'popupcad-binary'
+format_version = 2
+magic = b'PK\x03\x04'
+
+scalar_types = (type(None), bool, int, float, str)
+reference_types = (type, types.FunctionType, types.BuiltinFunctionType)
+vertex_dtype = numpy.dtype([('id', '<i8'), ('xy', '<f8', (2,)), ('class', '<i4')])
+
+
+def class_name(cls):
+    return cls.__module__ + ':' + cls.__qualname__
+
+
+def find_class(name):
+    '''the class or function a file names. as with yaml.FullLoader, only modules
+    already imported are looked in, so that opening a file cannot import one.'''
+    module, qualname = name.split(':')
+    try:
+        obj = sys.modules[module]
+    except KeyError:
+        raise Exception('module {0} named in binary file is not imported'.format(module))
+    for part in qualname.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def get_state(obj):
+    '''same state pyyaml would dump for a python/object'''
+    getstate = getattr(type(obj), '__getstate__', None)
+    if getstate is not None and getstate is not getattr(object, '__getstate__', None):
+        return obj.__getstate__()
+    return getattr(obj, '__dict__', None)
+
+
+def set_state(obj, state):
+    if hasattr(obj, '__setstate__'):
+        obj.__setstate__(state)
+    else:
+        obj.__dict__.update(state)
+
+
+def is_packed_vertex(obj):
+    '''vertices which pyyaml writes as a compact [id,x,y,...] sequence'''
+    return hasattr(type(obj), 'yaml_node_name_1') and hasattr(obj, 'listify')
+
+
+def document_prefix(index):
+    if index == 0:
+        return ''
+    return 'doc{0}_'.format(index)
+
+
+class Encoder(object):
+    '''flattens an object graph into a json tree, with all vertex coordinates
+    and numpy arrays moved into packed arrays. objects referenced more than
+    once are written once and referred to by index afterwards.
+
+    the values of dictionaries named in a class's lazy_attributes are written
+    as separate documents where they share nothing with the rest of the file,
+    so that they can be decoded on demand.'''
+
+    def __init__(self, documents=None, counts=None, states=None):
+        if documents is None:
+            documents = []
+        self.documents = documents
+        self.counts = counts or {}
+        if states is None:
+            states = {}
+        self.states = states
+        self.keep = []
+        self.refs = {}
+        self.classes = []
+        self.class_indices = {}
+        self.arrays = []
+        self.vertex_ids = []
+        self.vertex_xy = []
+        self.vertex_classes = []
+
+    def class_index(self, cls):
+        name = class_name(cls)
+        try:
+            return self.class_indices[name]
+        except KeyError:
+            self.class_indices[name] = len(self.classes)
+            self.classes.append(name)
+            return self.class_indices[name]
+
+    def children(self, obj):
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return obj
+        if isinstance(obj, dict):
+            return list(obj.keys()) + list(obj.values())
+        if isinstance(obj, (numpy.ndarray, numpy.generic, bytes) + reference_types):
+            return []
+        if is_packed_vertex(obj):
+            return obj.listify()[3:]
+        state = self.get_state(obj)
+        if state is None:
+            return []
+        return [state]
+
+    def get_state(self, obj):
+        '''__getstate__ may build a new dictionary on every call, so the state
+        of each object is taken once and kept for the whole encoding'''
+        try:
+            return self.states[id(obj)]
+        except KeyError:
+            self.states[id(obj)] = get_state(obj)
+            return self.states[id(obj)]
+
+    def count(self, obj, counts=None):
+        if counts is None:
+            counts = self.counts
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, scalar_types):
+                continue
+            key = id(item)
+            if key in counts:
+                counts[key] += 1
+                continue
+            counts[key] = 1
+            self.keep.append(item)
+            stack.extend(self.children(item))
+        return counts
+
+    def encode_document(self, obj):
+        '''encodes obj as a new document and returns its index'''
+        index = len(self.documents)
+        self.documents.append(None)
+        if not self.counts:
+            self.count(obj)
+        root = self.encode(obj)
+        header = {'format': format_name, 'version': format_version, 'classes': self.classes, 'root': root}
+        tree = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+        prefix = document_prefix(index)
+        arrays = {}
+        arrays[prefix + 'tree'] = numpy.frombuffer(tree, dtype=numpy.uint8)
+        if self.vertex_ids:
+            vertices = numpy.zeros(len(self.vertex_ids), dtype=vertex_dtype)
+            vertices['id'] = self.vertex_ids
+            vertices['xy'] = self.vertex_xy
+            vertices['class'] = self.vertex_classes
+            arrays[prefix + 'vertices'] = vertices
+        for ii, array in enumerate(self.arrays):
+            arrays[prefix + 'array_' + str(ii)] = array
+        self.documents[index] = arrays
+        return index
+
+    def separable_counts(self, obj):
+        '''returns the reference counts of obj's subgraph if nothing in it is
+        referenced from outside, otherwise None'''
+        if isinstance(obj, scalar_types) or self.counts[id(obj)] > 1:
+            return None
+        counts = self.count(obj, {})
+        for key, value in counts.items():
+            if self.counts[key] != value:
+                return None
+        return counts
+
+    def encode_lazy_dict(self, dict1):
+        items = []
+        for key, value in dict1.items():
+            counts = self.separable_counts(value)
+            if counts is None:
+                items.append([self.encode(key), self.encode(value)])
+            else:
+                items.append([self.encode(key), {'z': Encoder(self.documents, counts, self.states).encode_document(value)}])
+        return {'L': items}
+
+    def encode_state(self, obj, state):
+        lazy_attributes = getattr(type(obj), 'lazy_attributes', ())
+        if not lazy_attributes or not isinstance(state, dict) or self.counts[id(state)] > 1:
+            return self.encode(state)
+        output = {}
+        for key, value in state.items():
+            if key in lazy_attributes and isinstance(value, dict) and self.counts[id(value)] == 1:
+                output[key] = self.encode_lazy_dict(value)
+            else:
+                output[key] = self.encode(value)
+        return {'d': output}
+
+    def add_array(self, array):
+        self.arrays.append(array)
+        return len(self.arrays) - 1
+
+    def add_vertex(self, vertex):
+        output = vertex.listify()
+        self.vertex_ids.append(output[0])
+        self.vertex_xy.append(output[1:3])
+        self.vertex_classes.append(self.class_index(type(vertex)))
+        return len(self.vertex_ids) - 1, output[3:]
+
+    def packable(self, items):
+        return len(items) > 1 and all(is_packed_vertex(item) and self.counts[id(item)] == 1 and len(item.listify()) == 3 for item in items)
+
+    def encode(self, obj):
+        if isinstance(obj, scalar_types):
+            return obj
+
+        key = id(obj)
+        if key in self.refs:
+            return {'@': self.refs[key]}
+        shared = self.counts[key] > 1
+        if shared:
+            self.refs[key] = len(self.refs)
+
+        if isinstance(obj, list):
+            if self.packable(obj):
+                start = len(self.vertex_ids)
+                [self.add_vertex(item) for item in obj]
+                node = {'V': [start, len(obj)]}
+            elif shared:
+                node = {'l': [self.encode(item) for item in obj]}
+            else:
+                return [self.encode(item) for item in obj]
+        elif isinstance(obj, tuple):
+            node = {'t': [self.encode(item) for item in obj]}
+        elif isinstance(obj, frozenset):
+            node = {'f': [self.encode(item) for item in obj]}
+        elif isinstance(obj, set):
+            node = {'e': [self.encode(item) for item in obj]}
+        elif isinstance(obj, dict):
+            if all(isinstance(item, str) for item in obj.keys()):
+                node = {'d': dict((k, self.encode(v)) for k, v in obj.items())}
+            else:
+                node = {'m': [[self.encode(k), self.encode(v)] for k, v in obj.items()]}
+        elif isinstance(obj, numpy.ndarray):
+            node = {'a': self.add_array(obj)}
+        elif isinstance(obj, numpy.generic):
+            node = {'g': self.add_array(numpy.array(obj))}
+        elif isinstance(obj, bytes):
+            node = {'b': self.add_array(numpy.frombuffer(obj, dtype=numpy.uint8))}
+        elif isinstance(obj, reference_types):
+            node = {'k': class_name(obj)}
+        elif is_packed_vertex(obj):
+            ii, extra = self.add_vertex(obj)
+            node = {'v': ii}
+            if extra:
+                node['x'] = [self.encode(item) for item in extra]
+        else:
+            node = {'o': self.class_index(type(obj))}
+            state = self.get_state(obj)
+            if state is not None:
+                node['s'] = self.encode_state(obj, state)
+
+        if shared:
+            node['#'] = self.refs[key]
+        return node
+
+
+class Decoder(object):
+    '''decodes one document of a file. with lazy set, separately stored
+    documents are left undecoded until they are first accessed.'''
+
+    def __init__(self, npz, index=0, lazy=False):
+        self.npz = npz
+        self.index = index
+        self.lazy = lazy
+        self.prefix = document_prefix(index)
+        self.header = json.loads(npz[self.prefix + 'tree'].tobytes().decode('utf-8'))
+        if self.header.get('format') != format_name:
+            raise Exception('not a popupcad binary file')
+        if self.header['version'] > format_version:
+            raise Exception('binary file version {0} is newer than this program supports'.format(self.header['version']))
+        self.classes = [find_class(name) for name in self.header['classes']]
+        if self.prefix + 'vertices' in npz.files:
+            vertices = npz[self.prefix + 'vertices']
+            self.vertex_ids = vertices['id'].tolist()
+            self.vertex_xy = vertices['xy'].tolist()
+            self.vertex_classes = vertices['class'].tolist()
+        elif self.prefix + 'vertex_ids' in npz.files:
+            self.vertex_ids = npz[self.prefix + 'vertex_ids'].tolist()
+            self.vertex_xy = npz[self.prefix + 'vertex_xy'].tolist()
+            self.vertex_classes = npz[self.prefix + 'vertex_classes'].tolist()
+        else:
+            self.vertex_ids, self.vertex_xy, self.vertex_classes = [], [], []
+        self.refs = {}
+
+    def decode_root(self):
+        return self.decode(self.header['root'])
+
+    def decode_document(self, index):
+        return Decoder(self.npz, index, self.lazy).decode_root()
+
+    def array(self, ii):
+        return self.npz[self.prefix + 'array_' + str(ii)]
+
+    def vertex(self, ii, extra=()):
+        cls = self.classes[self.vertex_classes[ii]]
+        x, y = self.vertex_xy[ii]
+        return cls.delistify_1(self.vertex_ids[ii], x, y, *extra)
+
+    def register(self, node, obj):
+        if '#' in node:
+            self.refs[node['#']] = obj
+        return obj
+
+    def decode(self, node):
+        if isinstance(node, list):
+            return [self.decode(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        if '@' in node:
+            return self.refs[node['@']]
+        if 'V' in node:
+            start, count = node['V']
+            return self.register(node, [self.vertex(ii) for ii in range(start, start + count)])
+        if 'l' in node:
+            new = self.register(node, [])
+            new.extend(self.decode(item) for item in node['l'])
+            return new
+        if 't' in node:
+            return self.register(node, tuple(self.decode(item) for item in node['t']))
+        if 'f' in node:
+            return self.register(node, frozenset(self.decode(item) for item in node['f']))
+        if 'e' in node:
+            new = self.register(node, set())
+            new.update(self.decode(item) for item in node['e'])
+            return new
+        if 'd' in node:
+            new = self.register(node, {})
+            for k, v in node['d'].items():
+                new[k] = self.decode(v)
+            return new
+        if 'm' in node:
+            new = self.register(node, {})
+            for k, v in node['m']:
+                new[self.decode(k)] = self.decode(v)
+            return new
+        if 'L' in node:
+            return self.decode_lazy_dict(node)
+        if 'a' in node:
+            return self.register(node, self.array(node['a']).copy())
+        if 'g' in node:
+            return self.register(node, self.array(node['g'])[()])
+        if 'b' in node:
+            return self.register(node, self.array(node['b']).tobytes())
+        if 'k' in node:
+            return self.register(node, find_class(node['k']))
+        if 'v' in node:
+            extra = [self.decode(item) for item in node.get('x', [])]
+            return self.register(node, self.vertex(node['v'], extra))
+        if 'o' in node:
+            cls = self.classes[node['o']]
+            new = self.register(node, cls.__new__(cls))
+            if 's' in node:
+                set_state(new, self.decode(node['s']))
+            return new
+        raise Exception('unknown node in binary file')
+
+    def decode_lazy_dict(self, node):
+        from popupcad.filetypes.lazydict import LazyDict, LazyValue
+        if self.lazy:
+            new = LazyDict()
+        else:
+            new = {}
+        for key, value in node['L']:
+            key = self.decode(key)
+            if isinstance(value, dict) and 'z' in value:
+                if self.lazy:
+                    dict.__setitem__(new, key, LazyValue(functools.partial(self.decode_document, value['z'])))
+                else:
+                    new[key] = self.decode_document(value['z'])
+            else:
+                new[key] = self.decode(value)
+        return new
+
+
+def encode(obj):
+    '''encodes obj into the named arrays a file is made of'''
+    encoder = Encoder()
+    encoder.encode_document(obj)
+    arrays = {}
+    for document in encoder.documents:
+        arrays.update(document)
+    return arrays
+
+
+def digest(arrays):
+    '''hash of encoded content. unlike the bytes of a file, it does not depend
+    on when the file was written.'''
+    h = hashlib.sha1()
+    for name in sorted(arrays.keys()):
+        array = numpy.ascontiguousarray(arrays[name])
+        h.update('{0}:{1}:{2}:'.format(name, array.dtype.str, array.shape).encode('utf-8'))
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def write(obj, f, compress=False):
+    '''serializes obj to an open binary file'''
+    write_arrays(encode(obj), f, compress)
+
+
+def write_arrays(arrays, f, compress=False):
+    if compress:
+        numpy.savez_compressed(f, **arrays)
+    else:
+        numpy.savez(f, **arrays)
+
+
+def dumps(obj, compress=False):
+    '''serializes obj to bytes'''
+    f = io.BytesIO()
+    write(obj, f, compress)
+    return f.getvalue()
+
+
+def loads(data, lazy=False):
+    '''deserializes an object from bytes written by dumps. with lazy set, the
+    data is kept and separately stored documents are decoded on first access.'''
+    npz = numpy.load(io.BytesIO(data), allow_pickle=False)
+    if lazy:
+        return Decoder(npz, 0, True).decode_root()
+    with npz:
+        return Decoder(npz).decode_root()
+
+
+def dump(obj, filename, compress=False):
+    with open(filename, 'wb') as f:
+        write(obj, f, compress)
+
+
+def load(filename, lazy=False):
+    with open(filename, 'rb') as f:
+        return loads(f.read(), lazy)
+
+
+def is_binary(filename):
+    '''checks for the binary container by content, not extension'''
+    with open(filename, 'rb') as f:
+        if f.read(4) != magic:
+            return False
+    try:
+        with zipfile.ZipFile(filename) as z:
+            return 'tree.npy' in z.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+def yaml_to_binary(source, destination, compress=False):
+    import yaml
+    with open(source, 'r') as f:
+        obj = yaml.load(f, Loader=yaml.FullLoader)
+    dump(obj, destination, compress)
+
+
+def binary_to_yaml(source, destination):
+    import yaml
+    obj = load(source)
+    with open(destination, 'w') as f:
+        yaml.dump(obj, f)
+
+
+def convert(source, destination, compress=False):
+    '''converts a file between yaml and binary, in whichever direction applies'''
+    if is_binary(source):
+        binary_to_yaml(source, destination)
+    else:
+        yaml_to_binary(source, destination, compress)
+
+
+if __name__ == '__main__':
+    import sys
+    import popupcad
+    convert(sys.argv[1], sys.argv[2])
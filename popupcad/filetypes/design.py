@@ -6,9 +6,11 @@ Please see LICENSE for full license.
 """
 import popupcad
 from popupcad.filetypes.popupcad_file import popupCADFile
+from popupcad.filetypes.lazydict import map_values
 from dev_tools.acyclicdirectedgraph import AcyclicDirectedGraph
 import yaml
 import os
+import zlib
 
 class UpgradeError(Exception):
     pass
@@ -22,9 +24,11 @@ class RegenFailure(Exception):
         Exception.__init__(self, 'Regen Failure',[str(item) for item in other_exceptions])
 
 class Design(popupCADFile):
-    file_filter = 'CAD Design(*.cad)'
+    file_filter = 'CAD Design(*.cad);;Binary CAD Design(*.cadb)'
     selected_filter = 'CAD Design(*.cad)'
     defaultfiletype = 'cad'
+    lazy_attributes = ('sketches','subdesigns')
+    chunked_attributes = ('operations','sketches','subdesigns')
     
     @classmethod
     def lastdir(cls):
@@ -50,6 +54,15 @@ class Design(popupCADFile):
         self = cls(operations,layerdef,sketches,subdesigns)
         return self
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_subdesigns_are_reprocessed', None)
+        state.pop('_embed_outputs', None)
+        embedded_outputs = state.pop('_embedded_outputs', None)
+        if embedded_outputs is not None:
+            state['embedded_outputs'] = embedded_outputs
+        return state
+
     def define_layers(self, layerdef):
         self._layerdef = layerdef
 
@@ -153,13 +166,8 @@ class Design(popupCADFile):
     def copy(self, identical=True):
         operations = [operation.copy_wrapper()
                           for operation in self.operations]
-        sketches = {}
-        for key, value in self.sketches.items():
-            sketches[key] = value.copy(identical=True)
-            
-        subdesigns = {}
-        for key, value in self.subdesigns.items():
-            subdesigns[key] = value.copy(identical=True)
+        sketches = map_values(self.sketches,lambda value:value.copy(identical=True))
+        subdesigns = map_values(self.subdesigns,lambda value:value.copy(identical=True))
 
         new = type(self)(operations,self.return_layer_definition().copy(),sketches,subdesigns)
         if identical:
@@ -176,13 +184,8 @@ class Design(popupCADFile):
             operations_old = operations_new
         old_layer_def = self.return_layer_definition()
         new_layer_def = old_layer_def.upgrade()
-        sketches = {}
-        for key, value in self.sketches.items():
-            sketches[key] = value.upgrade(identical=True)
-
-        subdesigns = {}
-        for key, value in self.subdesigns.items():
-            subdesigns[key] = value.upgrade(identical=True)
+        sketches = map_values(self.sketches,lambda value:value.upgrade(identical=True))
+        subdesigns = map_values(self.subdesigns,lambda value:value.upgrade(identical=True))
         
         new = type(self)(operations_new,new_layer_def,sketches,subdesigns)
         self.copy_file_params(new, identical)
@@ -268,7 +271,7 @@ class Design(popupCADFile):
         self.update_operation_design()
             
         if not self.subdesigns_are_reprocessed:
-            for subdesign in self.subdesigns.values():
+            for subdesign in self.referenced_subdesigns():
                 subdesign.reprocessoperations()
             self.subdesigns_are_reprocessed=True
 
@@ -285,6 +288,9 @@ class Design(popupCADFile):
         for op in operations:
             op.generate_outer1()
 
+        if popupcad.embed_outputs:
+            self.stamp_outputs(operations)
+
     def append_operation(self,item):
         item.set_design(self)
         return self.operations.append(item)
@@ -308,6 +314,12 @@ class Design(popupCADFile):
         tree = AcyclicDirectedGraph(self.operations[:], connections)
         return tree
 
+    def referenced_subdesigns(self):
+        subdesignrefs = []
+        for op in self.operations:
+            subdesignrefs.extend(op.subdesignrefs())
+        return [self.subdesigns[key] for key in sorted(set(subdesignrefs)) if key in self.subdesigns]
+
     def cleanup_subdesigns(self):
         subdesignrefs = []
         for op in self.operations:
@@ -332,16 +344,15 @@ class Design(popupCADFile):
             except AttributeError:
                 pass
 
-    def raster(self,filetype='PNG',destination=None,gv=None,size=(400,300)):
-        if gv is None:
-            from popupcad.widgets.render_widget import RenderWidget
-            widget = RenderWidget(size)
-            gv = widget.gv
-
+    def raster(self,filetype='PNG',destination=None,gv=None,size=(400,300),dpi=None,separate_layers=False):
         if destination is None:
             destination = self.dirname
         self.reprocessoperations()
 
+        if gv is None:
+            from popupcad.algorithms.raster import raster_outputs
+            return raster_outputs(self,destination,filetype,dpi,size,separate_layers)
+
         for ii, op in enumerate(self.operations):
             for jj, out in enumerate(op.output):
                 filename = '{0:02.0f}_{1:02.0f}'.format(ii, jj)
@@ -358,11 +369,13 @@ class Design(popupCADFile):
             subdir = os.path.normpath(os.path.join(parent_dir, base))
             if not os.path.exists(subdir):
                 os.mkdir(subdir)
-                self.save_yaml(os.path.join(self.dirname,subdir,slugified_name),update_filename=False)
+            previous = design_doc.load_manifest(subdir)
             new = design_doc.process_design(self, subdir,slugified_name)
+            cad_file = os.path.join(self.dirname,subdir,slugified_name)
+            if design_doc.load_manifest(subdir)!=previous or not os.path.exists(cad_file):
+                self.save_yaml(cad_file,update_filename=False)
             file = os.path.normpath(os.path.join(subdir, base + '.md'))
-            with open(file, 'w') as f:
-                f.writelines(design_doc.format_template(new))
+            design_doc.write_if_changed(file,design_doc.format_template(new))
 
     @property
     def main_operation(self):
@@ -372,11 +385,100 @@ class Design(popupCADFile):
         for op in self.operations:
             op.set_design(self)
 
+    def operation_fingerprints(self):
+        '''hash of everything each operation's output is generated from: its
+        own settings, the layer definition, the sketches and subdesigns it
+        uses, the fingerprints of its parents, and popupcad.output_version,
+        which changes when the algorithms generating outputs do'''
+        from popupcad.algorithms.fingerprint import Fingerprinter
+        fingerprinter = Fingerprinter()
+        layerdef = fingerprinter.digest(self.return_layer_definition())
+        fingerprints = {}
+        for op in self.operations:
+            parents = [fingerprints.get(ref) for ref in op.parentrefs()]
+            sketches = [self.sketches.get(ref) for ref in op.sketchrefs()]
+            subdesigns = [self.subdesigns.get(ref) for ref in op.subdesignrefs()]
+            fingerprints[op.id] = fingerprinter.hexdigest([popupcad.output_version,popupcad.file_format_version,op,layerdef,parents,sketches,subdesigns])
+        return fingerprints
+
+    def stamp_outputs(self, operations, fingerprints=None):
+        '''records which fingerprint each operation's current output was generated from'''
+        if fingerprints is None:
+            fingerprints = self.operation_fingerprints()
+        for op in operations:
+            for output in getattr(op,'output',[]):
+                output.fingerprint = fingerprints[op.id]
+
+    def pack_outputs(self):
+        '''packs the output of each embeddable operation. only outputs stamped
+        by reprocessoperations with the operation's current fingerprint are
+        packed. others may be out of date, and are left to be generated again
+        on load.'''
+        fingerprints = self.operation_fingerprints()
+        embeddable = [op for op in self.operations if op.output_is_embeddable and hasattr(op,'output')]
+        embedded = {}
+        for op in embeddable:
+            if all([getattr(output,'fingerprint',None)==fingerprints[op.id] for output in op.output]):
+                outputs = [[output.name,map_values(output.csg.pack(),lambda value:zlib.compress(value,1))] for output in op.output]
+                embedded[op.id] = {'fingerprint':fingerprints[op.id],'outputs':outputs}
+        return embedded
+
+    def restore_outputs(self):
+        '''uses the outputs embedded in a file for every operation whose fingerprint still matches'''
+        from popupcad.filetypes.laminate import Laminate
+        from popupcad.filetypes.operationoutput import OperationOutput
+        embedded = self.__dict__.pop('embedded_outputs',None)
+        if not embedded:
+            return
+        fingerprints = self.operation_fingerprints()
+        layerdef = self.return_layer_definition()
+        for op in self.operations:
+            try:
+                item = embedded[op.id]
+            except KeyError:
+                continue
+            if item['fingerprint'] == fingerprints[op.id]:
+                op.output = [OperationOutput(Laminate.unpack(layerdef,map_values(packed,zlib.decompress)),name,op) for name,packed in item['outputs']]
+                self.stamp_outputs([op],fingerprints)
+
+    def save_state(self, identical=True):
+        new = super(Design, self).save_state(identical)
+        if getattr(self,'_embed_outputs',False):
+            new._embedded_outputs = self.pack_outputs()
+        return new
+
+    def save_yaml(self, filename, identical=True, update_filename=True, embed_outputs=None):
+        '''with embed_outputs set, the output of each processed operation is
+        saved along with the design, so that it need not be regenerated on load'''
+        if embed_outputs is None:
+            embed_outputs = popupcad.embed_outputs
+        self._embed_outputs = embed_outputs
+        try:
+            return super(Design, self).save_yaml(filename, identical, update_filename)
+        finally:
+            self.__dict__.pop('_embed_outputs',None)
+            self.__dict__.pop('_embedded_outputs',None)
+
+    @classmethod
+    def load_yaml(cls, filename,upgrade = True,lazy = None):
+        if lazy is None:
+            lazy = popupcad.lazy_loading
+        self = popupCADFile.load_yaml(filename,lazy)
+        if upgrade and not self.is_current():
+            self.backup_source(filename,popupcad.backupdir,'_pre-upgrade_')
+            self = self.upgrade()
+        self.update_operation_design()
+        self.restore_outputs()
+        return self
+
     @classmethod
-    def load_yaml(cls, filename,upgrade = True):
-        self = popupCADFile.load_yaml(filename)
-        if upgrade:
-            self.backup(popupcad.backupdir,'_pre-upgrade_')
+    def load_backup(cls, filename, upgrade=True):
+        '''rebuilds a design from a backup manifest written by BackupStore'''
+        import os
+        from popupcad.filetypes.backup_store import BackupStore
+        self = BackupStore(os.path.dirname(filename)).restore(filename)
+        if upgrade and not self.is_current():
             self = self.upgrade()
         self.update_operation_design()
+        self.restore_outputs()
         return self
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import time
+import numpy
+from popupcad.algorithms import spline_functions
+from popupcad.filetypes.genericshapes import GenericLine, GenericPoly, GenericPolyline
+from popupcad.geometry.vertex import DrawnPoint
+
+
+class DXFImport(object):
+    '''
+    imports the modelspace of a dxf file without any user interface.
+
+    entities are streamed from the file rather than read into a document
+    first where ezdxf supports it. splines are collected while streaming
+    and evaluated together, and lines and points are converted in bulk once
+    the file has been read. the time spent on each type of entity is kept in
+    timings, and the number found in counts.
+
+    splines given only by their fit points are counted as FIT SPLINE and drawn
+    as polylines through those points. ones with neither enough control
+    points nor fit points are counted as BAD SPLINE and skipped.
+    '''
+    supported = ('LINE', 'LWPOLYLINE', 'POINT', 'SPLINE', 'FIT SPLINE')
+
+    def __init__(self, filename, layers=None, segments_per_point=5):
+        self.filename = filename
+        self.layers = layers
+        self.segments_per_point = segments_per_point
+        self.timings = {}
+        self.counts = {}
+        self.generics = {}
+
+    def entities(self):
+        '''yields the entities in the modelspace, one at a time'''
+        try:
+            from ezdxf.addons import iterdxf
+            dxf = iterdxf.opendxf(self.filename)
+        except Exception:
+            import ezdxf
+            for entity in ezdxf.readfile(self.filename).modelspace():
+                yield entity
+            return
+        try:
+            for entity in dxf.modelspace():
+                yield entity
+        finally:
+            dxf.close()
+
+    def layer_names(self):
+        '''the layers in the file's LAYER table. only the sections before the
+        blocks and entities are read, so this stays quick for large files.'''
+        from ezdxf.lldxf.validator import is_binary_dxf_file
+        if is_binary_dxf_file(self.filename):
+            import ezdxf
+            return [layer.dxf.name for layer in ezdxf.readfile(self.filename).layers]
+        from ezdxf.filemanagement import dxf_file_info
+        from ezdxf.lldxf.tagger import ascii_tags_loader
+        names = []
+        with open(self.filename, 'rt', encoding=dxf_file_info(self.filename).encoding, errors='surrogateescape') as f:
+            kind = None
+            for tag in ascii_tags_loader(f):
+                if tag.code == 0:
+                    kind = tag.value
+                elif tag.code == 2 and kind == 'LAYER':
+                    names.append(tag.value)
+                    kind = None
+                elif tag.code == 2 and kind == 'SECTION' and tag.value in ('BLOCKS', 'ENTITIES'):
+                    break
+        return names
+
+    def time(self, key, t0):
+        t1 = time.time()
+        self.timings[key] = self.timings.get(key, 0) + t1 - t0
+        return t1
+
+    @staticmethod
+    def spline_data(entity):
+        if hasattr(entity, 'get_knot_values'):
+            return entity.get_control_points(), entity.get_knot_values(), entity.get_weights()
+        return list(entity.control_points), list(entity.knots), list(entity.weights)
+
+    @staticmethod
+    def fit_points(entity):
+        if hasattr(entity, 'get_fit_points'):
+            points = entity.get_fit_points()
+        else:
+            points = entity.fit_points
+        return [tuple(item)[:2] for item in points]
+
+    @staticmethod
+    def evaluable(data):
+        '''whether a spline has the control points and knots to be evaluated, with a degree of at least one'''
+        control_points, knots, weights = data
+        return len(control_points) > 1 and len(knots) > len(control_points) + 1
+
+    @staticmethod
+    def polyline_points(entity):
+        return [item[:2] for item in entity.get_points()]
+
+    def read(self):
+        '''reads the file, returning the converted geometry for each layer'''
+        self.timings = {}
+        self.counts = {}
+        slots = []
+        lines = []
+        polylines = []
+        points = []
+        splines = []
+        t0 = time.time()
+        t_start = t0
+        for entity in self.entities():
+            t0 = self.time('read', t0)
+            kind = entity.dxftype()
+            if kind == 'SPLINE':
+                data = self.spline_data(entity)
+                if not self.evaluable(data):
+                    data = self.fit_points(entity)
+                    kind = 'FIT SPLINE' if len(data) > 1 else 'BAD SPLINE'
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            layer = entity.dxf.layer
+            if self.layers is not None and layer not in self.layers:
+                continue
+            if kind == 'LINE':
+                lines.append((len(slots), tuple(entity.dxf.start)[:2] + tuple(entity.dxf.end)[:2]))
+            elif kind == 'LWPOLYLINE':
+                polylines.append((len(slots), self.polyline_points(entity), entity.closed))
+            elif kind == 'POINT':
+                points.append((len(slots), tuple(entity.dxf.location)[:2]))
+            elif kind == 'SPLINE':
+                splines.append((len(slots), data, entity.closed))
+            elif kind == 'FIT SPLINE':
+                polylines.append((len(slots), data, entity.closed))
+            else:
+                continue
+            slots.append((layer, None))
+            t0 = self.time(kind, t0)
+        self.time('read', t0)
+
+        t0 = time.time()
+        if lines:
+            indices, coords = zip(*lines)
+            for ii, row in zip(indices, numpy.array(coords, dtype=float).reshape(-1, 2, 2).tolist()):
+                slots[ii] = slots[ii][0], GenericLine.gen_from_point_lists(row, [])
+        t0 = self.time('LINE', t0)
+
+        for ii, row, closed in polylines:
+            slots[ii] = slots[ii][0], self.shape(row, closed)
+        t0 = self.time('LWPOLYLINE', t0)
+
+        if points:
+            indices, coords = zip(*points)
+            for ii, row in zip(indices, numpy.array(coords, dtype=float)):
+                slots[ii] = slots[ii][0], DrawnPoint(row)
+        t0 = self.time('POINT', t0)
+
+        if splines:
+            indices, data, closed = zip(*splines)
+            curves = spline_functions.evaluate_splines(data, self.segments_per_point)
+            for ii, curve, closed1 in zip(indices, curves, closed):
+                slots[ii] = slots[ii][0], self.shape(curve[:, :2].tolist(), closed1)
+        t0 = self.time('SPLINE', t0)
+        self.timings['total'] = t0 - t_start
+
+        self.generics = {}
+        for layer, generic in slots:
+            self.generics.setdefault(layer, []).append(generic)
+        return self.generics
+
+    @staticmethod
+    def shape(points, closed):
+        if closed:
+            return GenericPoly.gen_from_point_lists(points, [])
+        return GenericPolyline.gen_from_point_lists(points, [])
+
+    def new_sketch(self, generics, name):
+        from popupcad.filetypes.sketch import Sketch
+        new = Sketch.new()
+        new.addoperationgeometries(generics)
+        new.updatefilename(os.path.join(os.path.dirname(self.filename), name + '.sketch'))
+        return new
+
+    def sketch(self):
+        '''one sketch holding everything imported'''
+        generics = []
+        for items in self.generics.values():
+            generics.extend(items)
+        return self.new_sketch(generics, os.path.splitext(os.path.basename(self.filename))[0])
+
+    def sketches(self):
+        '''a sketch for each layer imported'''
+        return dict([(layer, self.new_sketch(items, layer)) for layer, items in self.generics.items()])
+
+    def report(self):
+        lines = []
+        for key in sorted(self.counts.keys()):
+            status = '' if key in self.supported else ' (skipped)'
+            lines.append('{0:<12}{1:>8} {2:.3f}s{3}'.format(key, self.counts[key], self.timings.get(key, 0), status))
+        for key in ['read', 'total']:
+            lines.append('{0:<12}{1:>8} {2:.3f}s'.format(key, '', self.timings.get(key, 0)))
+        return '\n'.join(lines)
+
+
+def load_dxf(filename, layers=None, segments_per_point=5):
+    '''imports the given layers of a dxf file, or all of them, as a single sketch'''
+    importer = DXFImport(filename, layers, segments_per_point)
+    importer.read()
+    return importer.sketch()
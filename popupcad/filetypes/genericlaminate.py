@@ -7,6 +7,7 @@ Please see LICENSE for full license.
 """
 import popupcad
 import os
+import numpy
 
 class GenericLaminate(object):
     def __init__(self, layerdef, geoms):
@@ -41,15 +42,23 @@ class GenericLaminate(object):
         return display_geometry_2d
 
     def to_triangles(self):
+        polygons = []
+        owners = []
         triangles_by_layer = {}
         for layer, geoms in self.geoms.items():
-            triangles = []
+            triangles_by_layer[layer] = []
             for geom in geoms:
-                try:
-                    triangles.extend(geom.triangles3())
-                except AttributeError:
-                    pass
-            triangles_by_layer[layer] = triangles
+                if hasattr(geom, 'triangulation_loops'):
+                    polygons.append(geom.triangulation_loops())
+                    owners.append(layer)
+                else:
+                    try:
+                        triangles_by_layer[layer].extend(geom.triangles3())
+                    except AttributeError:
+                        pass
+        all_triangles = popupcad.algorithms.triangulation_engine.triangulate_many(polygons)
+        for layer, triangles in zip(owners, all_triangles):
+            triangles_by_layer[layer].extend(triangles)
         return triangles_by_layer
 
     def layers(self):
@@ -71,11 +80,11 @@ class GenericLaminate(object):
         gv=None,
         size=(
             400,
-            300)):
+            300),
+        dpi=None):
         if gv is None:
-            from popupcad.widgets.render_widget import RenderWidget
-            widget = RenderWidget(size)
-            gv = widget.gv
+            from popupcad.algorithms.raster import raster_laminate
+            return raster_laminate(self, filename, destination, filetype, dpi, size)
 
         gv.scene().clear()
         [gv.scene().addItem(item) for item in self.to_static_sorted()]
@@ -98,32 +107,12 @@ class GenericLaminate(object):
         return filename_out
 
     def save_dxf(self,basename,separate_files=False,directory = None):
-        import ezdxf
-        ezdxf.options.template_dir = popupcad.supportfiledir        
-        
-        if directory is None:
-            directory = popupcad.exportdir
-        
-        if not separate_files:
-            filename = os.path.normpath(os.path.join(directory,basename+'.dxf'))
-            dwg = ezdxf.new('AC1015')
-            msp = dwg.modelspace()
-
-        for ii,layer in enumerate(self.layerdef.layers):
-            layername = '{:03.0f}_'.format(ii)+layer.name
-            if separate_files:
-                filename = os.path.normpath(os.path.join(directory,basename+'_'+layername+'.dxf'))
-                dwg = ezdxf.new('AC1015')
-                msp = dwg.modelspace()
-            dwg.layers.new(name=layername)
-            for item in self.geoms[layer]:
-                if not item.is_construction():
-                    item.output_dxf(msp,layername)
-            if separate_files:
-                dwg.saveas(filename)     
-        
-        if not separate_files:
-            dwg.saveas(filename)     
+        from popupcad.algorithms.batch_export import export_laminates
+        return export_laminates([(basename,self)],['dxf'],directory,separate_files)
+    
+    def save_svg(self,basename,directory = None):
+        from popupcad.algorithms.batch_export import export_laminates
+        return export_laminates([(basename,self)],['svg'],directory)
     
     def transform(self,T):     
         geoms = {}
@@ -211,27 +200,29 @@ class GenericLaminate(object):
         return bounds
 
     def mass_properties(self):
+        from popupcad.algorithms.mass_properties import sum_moments, extruded_inertia_tensor
         zvalues = self.layerdef.z_values2
         volume_total = 0
         center_of_mass_accumulator = 0
         next_args = []
         mass_total = 0
         for layer in self.layers():
-            layer_volume = 0
+            if len(self.geoms[layer])==0:
+                continue
             density = layer.density
-            z_lower = zvalues[layer]['lower']
-            z_upper = zvalues[layer]['upper']
-            for geom in self.geoms[layer]:
-                area,centroid,volume,mass,tris = geom.mass_properties(density,z_lower,z_upper)
-                volume_total+=volume
-                layer_volume+=volume
-                center_of_mass_accumulator+=volume*centroid*density
-                next_args.append((geom,(density,z_lower,z_upper,tris)))
+            z_lower = zvalues[layer]['lower']/popupcad.SI_length_scaling
+            z_upper = zvalues[layer]['upper']/popupcad.SI_length_scaling
+            moments = sum_moments([geom.area_moments() for geom in self.geoms[layer]])
+            area,first,second = moments
+            layer_volume = area*(z_upper-z_lower)
+            volume_total+=layer_volume
             mass_total+=layer_volume*density
+            center_of_mass_accumulator+=density*(z_upper-z_lower)*numpy.r_[first,area*(z_lower+z_upper)/2]
+            next_args.append((moments,density,z_lower,z_upper))
         center_of_mass = center_of_mass_accumulator/mass_total
         I = 0
-        for geom,args in next_args:
-            I+=geom.inertia_tensor(center_of_mass,*args)
+        for moments,density,z_lower,z_upper in next_args:
+            I+=extruded_inertia_tensor(moments,center_of_mass,density,z_lower,z_upper)
         return volume_total,mass_total,center_of_mass,I
 
     def cross_sectional_area(self):
@@ -271,13 +262,13 @@ class GenericLaminate(object):
         import popupcad_gazebo.laminate_adders
         return popupcad_gazebo.laminate_adders.toSDFTag(self, *args,**kwargs)            
 
-    def toSTL(self, *args,**kwargs):
-        import popupcad_gazebo.laminate_adders
-        return popupcad_gazebo.laminate_adders.toSTL(self,*args,**kwargs)            
+    def toSTL(self, filename=None, binary=True):
+        import popupcad.algorithms.mesh
+        return popupcad.algorithms.mesh.laminate_stl(self, filename, binary)
 
-    def toDAE(self, *args,**kwargs):
-        import popupcad_gazebo.laminate_adders
-        return popupcad_gazebo.laminate_adders.toDAE(self, *args,**kwargs)            
+    def toDAE(self, filename=None, directory=None, centered=False):
+        import popupcad.algorithms.mesh
+        return popupcad.algorithms.mesh.laminate_dae(self, filename, directory, centered)
 
     def createDAEFromShape(self, *args,**kwargs):
         import popupcad_gazebo.laminate_adders
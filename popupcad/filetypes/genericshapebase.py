@@ -46,6 +46,12 @@ class GenericShapeBase(object):
         self.exterior = self.remove_redundant_points(self.exterior)
         self.interiors = [self.remove_redundant_points(interior) for interior in self.interiors]
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ['_exteriorhandles', '_interiorhandles', '_handles']:
+            state.pop(key, None)
+        return state
+
     def is_valid_bool(self):
         try: 
             self.is_valid()
@@ -257,6 +263,26 @@ class GenericShapeBase(object):
         else:
             return loop
 
+    @staticmethod
+    def conditioned_points(points, decimal_places = None):
+        '''
+        the positions _condition_loop would leave in a loop with its default
+        options, found from the positions alone without copying any vertices
+        '''
+        if len(points)==0:
+            return []
+        if decimal_places is None:
+            decimal_places = popupcad.geometry_round_value
+        points = numpy.array(points, dtype=float).reshape(-1,2)
+        rounded = points.round(decimal_places)
+        keep = numpy.ones(len(points),dtype = bool)
+        keep[1:] = (rounded[1:]!=rounded[:-1]).any(1)
+        points = points[keep]
+        rounded = rounded[keep]
+        if (rounded[0]==rounded[-1]).all():
+            points = points[:-1]
+        return [tuple(point) for point in points.tolist()]
+
     def _condition(self,round_vertices = False, test_rounded_vertices = True, remove_forward_redundancy=True, remove_loop_reduncancy=True,terminate_with_start = False,decimal_places = None):
         self.exterior = self._condition_loop(self.exterior,round_vertices = False, test_rounded_vertices = True, remove_forward_redundancy=True, remove_loop_reduncancy=True,terminate_with_start = False,decimal_places = None)
         self.interiors = [self._condition_loop(interior,round_vertices = False, test_rounded_vertices = True, remove_forward_redundancy=True, remove_loop_reduncancy=True,terminate_with_start = False,decimal_places = None) for interior in self.interiors]
@@ -415,16 +441,8 @@ class GenericShapeBase(object):
 
     @classmethod
     def remove_redundant_points(cls, points, scaling=1,loop_test = True):
-        newpoints = []
-        if len(points)>0:
-            points = points[:]
-            newpoints.append(points.pop(0))
-            while not not points:
-                newpoint = points.pop(0)
-                if not popupcad.algorithms.points.twopointsthesame(newpoints[-1].getpos(scaling),newpoint.getpos(scaling),popupcad.distinguishable_number_difference):
-                    if len(points)==0 and loop_test:
-                        if not popupcad.algorithms.points.twopointsthesame(newpoints[0].getpos(scaling),newpoint.getpos(scaling),popupcad.distinguishable_number_difference):
-                            newpoints.append(newpoint)
-                    else:
-                        newpoints.append(newpoint)
-        return newpoints
\ No newline at end of file
+        if len(points)==0:
+            return []
+        positions = numpy.array([point.getpos(scaling) for point in points])
+        keep = popupcad.algorithms.points.distinct_points(positions,popupcad.distinguishable_number_difference,loop_test)
+        return [point for point,test in zip(points,keep) if test]
@@ -144,11 +144,14 @@ class GenericPoly(GenericShapeBase):
         cdt.Triangulate()
         return cdt
         
+    def triangulation_loops(self):
+        exterior = self.conditioned_points(self.exteriorpoints())
+        interiors = [self.conditioned_points(interior) for interior in self.interiorpoints()]
+        return exterior, interiors
+
     def triangles3(self):
-        cdt = self.triangles_inner()
-        tris = [tri.toList() for tri in cdt.GetTriangles()]
-        tris = (numpy.array(tris)/popupcad.triangulation_scaling).tolist()
-        return tris
+        exterior, interiors = self.triangulation_loops()
+        return popupcad.algorithms.triangulation_engine.triangulate(exterior, interiors)
 
     def to_shapely(self,scaling = 1):
         exterior_p = self.exteriorpoints(scaling = scaling)
@@ -162,7 +165,30 @@ class GenericPoly(GenericShapeBase):
     def segments(self):
         return self.segments_closed()
         
+    def area_moments(self):
+        exterior = numpy.array(self.exteriorpoints())/popupcad.SI_length_scaling
+        interiors = [numpy.array(interior)/popupcad.SI_length_scaling for interior in self.interiorpoints()]
+        return popupcad.algorithms.mass_properties.area_moments(exterior,interiors)
+
     def mass_properties(self,density,z_lower,z_upper):
+        z_lower = z_lower/popupcad.SI_length_scaling
+        z_upper = z_upper/popupcad.SI_length_scaling
+        moments = self.area_moments()
+        area,first,second = moments
+        z_center = (z_lower+z_upper)/2
+        centroid = numpy.r_[first/area,z_center]
+
+        thickness = z_upper - z_lower
+        volume = area*thickness
+        mass = volume*density
+        return area,centroid,volume,mass,moments
+
+    def inertia_tensor(self,about_point,density,z_lower,z_upper,moments):
+        z_lower = z_lower/popupcad.SI_length_scaling
+        z_upper = z_upper/popupcad.SI_length_scaling
+        return popupcad.algorithms.mass_properties.extruded_inertia_tensor(moments,about_point,density,z_lower,z_upper)
+
+    def mass_properties_triangulated(self,density,z_lower,z_upper):
         z_lower = z_lower/popupcad.SI_length_scaling
         z_upper = z_upper/popupcad.SI_length_scaling
         tris = numpy.array(self.triangles3())/popupcad.SI_length_scaling
@@ -182,7 +208,7 @@ class GenericPoly(GenericShapeBase):
         mass = volume*density
         return area,centroid,volume,mass,tris
 
-    def inertia_tensor(self,about_point,density,z_lower,z_upper,tris):
+    def inertia_tensor_triangulated(self,about_point,density,z_lower,z_upper,tris):
         z_lower = z_lower/popupcad.SI_length_scaling
         z_upper = z_upper/popupcad.SI_length_scaling
         import idealab_tools.geometry.triangle as triangle
@@ -231,35 +257,9 @@ class GenericPoly(GenericShapeBase):
     def extrudeVertices(self, extrusion_factor, z0=0):
         """Extrudes the vertices of a shape and returns the three dimensional values
         """
-        a = self.triangles3()
-        vertices = []
-        
-        for coord in a: 
-            for dec in coord:            
-                vertices.append(dec[0]) #x-axis
-                vertices.append(dec[1]) #y-axis            
-                vertices.append(z0) #z-axis
-        
-        for coord in a: 
-            for dec in reversed(coord):            
-                vertices.append(dec[0]) #x-axis
-                vertices.append(dec[1]) #y-axis            
-                vertices.append(z0 + extrusion_factor) #z-axi            
-                
-        top_edges = self.exteriorpoints_3d(z0=z0)
-        bottom_edges = self.exteriorpoint_3d(z0=z0 + extrusion_factor)
-            
-        sideTriangles = list(zip(top_edges, top_edges[1:] + top_edges[:1], bottom_edges))
-        sideTriangles2 = list(zip(bottom_edges[1:] + bottom_edges[:1], bottom_edges, top_edges[1:] + top_edges[:1]))
-        sideTriangles.extend(sideTriangles2)
-        sideTriangles = [list(triangle) for triangle in sideTriangles]
-        import itertools
-        sideTriangles = list(itertools.chain.from_iterable(sideTriangles))
-        sideTriangles = [list(point) for point in sideTriangles]
-        sideTriangles = list(itertools.chain.from_iterable(sideTriangles))            
-        vertices.extend(sideTriangles)
-                        
-        return vertices
+        from popupcad.algorithms.mesh import extrude
+        triangles = extrude(self.triangles3(), self.triangulation_loops(), z0, z0 + extrusion_factor)
+        return triangles.flatten().tolist()
 
         
 class GenericCircle(GenericShapeBase):
@@ -342,8 +342,8 @@ if __name__=='__main__':
     z_lower = -.1
     z_upper = .1
     density = 1
-    area,centroid,volume,mass,tris = a.mass_properties(density,z_lower,z_upper)
+    area,centroid,volume,mass,moments = a.mass_properties(density,z_lower,z_upper)
     about_point = centroid
-    I = a.inertia_tensor(about_point,density,z_lower,z_upper,tris)
+    I = a.inertia_tensor(about_point,density,z_lower,z_upper,moments)
     area2 = a.trueArea()
     print(area,area2)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import glob
+import shutil
+import struct
+import zlib
+import popupcad
+import popupcad.filetypes.binary_format as binary_format
+from popupcad.filetypes.lazydict import LazyValue
+from dev_tools.genericfile import NoFileName
+
+
+class Journal(object):
+    '''
+    append-only record of the edits made to a design since its last checkpoint.
+
+    autosaving appends only the operations, sketches, subdesigns and layer
+    definition which changed since the last flush, and the journal is rolled
+    into a new checkpoint once it grows past popupcad.journal_checkpoint_size.
+    recovery loads the checkpoint and replays the journal on top of it.
+    '''
+    extension = 'journal'
+    backupstring = '_journal_'
+    header = struct.Struct('<II')
+
+    def __init__(self, design, folder=None):
+        if folder is None:
+            folder = popupcad.backupdir
+        self.design = design
+        self.folder = folder
+        self.stem = None
+        self.size = 0
+        self.initial_size = 0
+        self.written = {}
+        self.dirty = set()
+
+    def prefix(self):
+        basename = os.path.splitext(self.design.get_basename())[0]
+        return os.path.normpath(os.path.join(self.folder, basename + self.backupstring))
+
+    def checkpoint_filename(self):
+        return self.stem + '.' + self.design.defaultfiletype
+
+    def journal_filename(self):
+        return self.stem + '.' + self.extension
+
+    def new_stem(self):
+        '''picks the next generation for this design, removing all but the newest few'''
+        prefix = self.prefix()
+        stems = set([os.path.splitext(item)[0] for item in glob.glob(prefix + '[0-9]*.*')])
+        stems = sorted(stems, reverse=True)
+        for stem in stems[popupcad.backup_limit - 1:]:
+            self.remove(stem)
+        if stems:
+            generation = int(stems[0][len(prefix):]) + 1
+        else:
+            generation = 0
+        return prefix + '{0:06d}'.format(generation)
+
+    def remove(self, stem):
+        for filename in glob.glob(stem + '.*'):
+            os.remove(filename)
+
+    def start(self, source=None):
+        '''
+        takes a new checkpoint and starts an empty journal after it. source is
+        a file already holding the design as it is now, which is copied rather
+        than serializing the design again.
+        '''
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        previous = self.stem
+        self.stem = self.new_stem()
+        if source is None:
+            self.design.save_yaml(self.checkpoint_filename(), update_filename=False)
+        else:
+            shutil.copyfile(source, self.checkpoint_filename())
+        with open(self.journal_filename(), 'wb'):
+            pass
+        if previous is not None:
+            self.remove(previous)
+        self.size = 0
+        self.written = {}
+        self.dirty = set()
+        self.commit(self.changes())
+        self.append([('file', None, self.file_info())])
+        self.initial_size = self.size
+
+    def discard(self):
+        '''removes the checkpoint and journal, once they are no longer needed'''
+        if self.stem is not None:
+            self.remove(self.stem)
+            self.stem = None
+
+    def file_info(self):
+        try:
+            dirname = os.path.dirname(self.design.filename())
+        except NoFileName:
+            dirname = None
+        return {'dirname': dirname, 'basename': self.design.get_basename()}
+
+    def operation_changed(self, operation):
+        self.dirty.add(('operation', operation.id))
+
+    def operations_changed(self):
+        for operation in self.design.operations:
+            self.operation_changed(operation)
+
+    def layerdef_changed(self):
+        self.dirty.add(('layerdef', None))
+
+    @staticmethod
+    def signature(obj):
+        '''
+        the objects obj's saved state refers to directly. the editors replace
+        these when something is edited, so comparing them by identity finds
+        changed objects without serializing anything.
+        '''
+        state = binary_format.get_state(obj)
+        return sorted(state.items(), key=lambda item: item[0])
+
+    @staticmethod
+    def same(signature1, signature2):
+        if len(signature1) != len(signature2):
+            return False
+        for (key1, value1), (key2, value2) in zip(signature1, signature2):
+            if key1 != key2:
+                return False
+            if value1 is value2:
+                continue
+            if type(value1) is list and type(value2) is list and len(value1) == len(value2):
+                if all([a is b for a, b in zip(value1, value2)]):
+                    continue
+            return False
+        return True
+
+    def structure(self):
+        return {'operations': [operation.id for operation in self.design.operations],
+                'sketches': sorted(self.design.sketches.keys()),
+                'subdesigns': sorted(self.design.subdesigns.keys())}
+
+    def items(self):
+        '''the objects the journal keeps track of. values of a lazily loaded
+        design which have not been loaded yet cannot have changed, and are skipped.'''
+        design = self.design
+        items = [('operation', operation.id, operation) for operation in design.operations]
+        for kind, dict1 in [('sketch', design.sketches), ('subdesign', design.subdesigns)]:
+            for key, value in dict.items(dict1):
+                if isinstance(value, LazyValue):
+                    if not value.loaded():
+                        continue
+                    value = value.value()
+                items.append((kind, key, value))
+        items.append(('layerdef', None, design.return_layer_definition()))
+        return items
+
+    def changes(self):
+        '''returns the objects which changed since they were last written'''
+        changes = []
+        for kind, key, value in self.items():
+            signature = self.signature(value)
+            try:
+                written, written_signature = self.written[(kind, key)]
+                if (kind, key) not in self.dirty and written is value and self.same(written_signature, signature):
+                    continue
+            except KeyError:
+                pass
+            changes.append((kind, key, value, signature))
+        structure = self.structure()
+        if structure != self.written.get(('structure', None)):
+            changes.append(('structure', None, structure, None))
+        return changes
+
+    def commit(self, changes):
+        keys = set([(kind, key) for kind, key, value in self.items()])
+        for key in list(self.written.keys()):
+            if key[0] != 'structure' and key not in keys:
+                del self.written[key]
+        for kind, key, value, signature in changes:
+            if kind == 'structure':
+                self.written[(kind, key)] = value
+            else:
+                self.written[(kind, key)] = value, signature
+        self.dirty = set()
+
+    def modified(self):
+        '''whether anything was changed since the checkpoint was taken'''
+        return self.size > self.initial_size or len(self.changes()) > 0
+
+    def append(self, records):
+        with open(self.journal_filename(), 'ab') as f:
+            for kind, key, value in records:
+                payload = binary_format.dumps({'kind': kind, 'key': key, 'value': value})
+                f.write(self.header.pack(len(payload), zlib.crc32(payload) & 0xffffffff))
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            self.size = f.tell()
+
+    def flush(self):
+        '''appends whatever changed since the last flush, checkpointing the
+        design instead once the journal has grown large enough'''
+        if self.stem is None:
+            return self.start()
+        changes = self.changes()
+        if not changes:
+            return
+        if self.size > popupcad.journal_checkpoint_size:
+            return self.start()
+        self.append([(kind, key, value) for kind, key, value, signature in changes])
+        self.commit(changes)
+
+    @classmethod
+    def read_records(cls, filename):
+        '''reads records up to the end of the file, or up to the first one
+        which was cut short or corrupted by a crash'''
+        records = []
+        with open(filename, 'rb') as f:
+            while True:
+                header = f.read(cls.header.size)
+                if len(header) < cls.header.size:
+                    break
+                length, crc = cls.header.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) & 0xffffffff != crc:
+                    break
+                record = binary_format.loads(payload)
+                records.append((record['kind'], record['key'], record['value']))
+        return records
+
+    @staticmethod
+    def apply(design, kind, key, value):
+        if kind == 'operation':
+            for ii, operation in enumerate(design.operations):
+                if operation.id == key:
+                    design.operations[ii] = value
+                    break
+            else:
+                design.operations.append(value)
+        elif kind == 'sketch':
+            design.sketches[key] = value
+        elif kind == 'subdesign':
+            design.subdesigns[key] = value
+        elif kind == 'layerdef':
+            design.define_layers(value)
+        elif kind == 'structure':
+            operations = dict([(operation.id, operation) for operation in design.operations])
+            design.operations[:] = [operations[item] for item in value['operations']]
+            for dict1, keys in [(design.sketches, value['sketches']), (design.subdesigns, value['subdesigns'])]:
+                for item in set(dict1.keys()) - set(keys):
+                    dict1.pop(item)
+        elif kind == 'file':
+            if value['dirname'] is None:
+                design.__dict__.pop('dirname', None)
+                design.set_basename(value['basename'])
+            else:
+                design.updatefilename(os.path.join(value['dirname'], value['basename']))
+
+    @classmethod
+    def recover(cls, filename):
+        '''rebuilds a design from a checkpoint and its journal. filename may be either one.'''
+        from popupcad.filetypes.design import Design
+        stem = os.path.splitext(filename)[0]
+        design = Design.load_yaml(stem + '.' + Design.defaultfiletype, upgrade=False, lazy=False)
+        journal = stem + '.' + cls.extension
+        if os.path.exists(journal):
+            for kind, key, value in cls.read_records(journal):
+                cls.apply(design, kind, key, value)
+        design = design.upgrade()
+        design.update_operation_design()
+        return design
@@ -171,6 +171,31 @@ class Laminate(IterableLaminate):
         new = GenericLaminate(self.layerdef, genericgeometry)
         return new
 
+    def pack(self):
+        '''packs the geometry of every layer, in layer order, into flat arrays'''
+        import numpy
+        geoms = []
+        layer_counts = []
+        for layer in self.layerdef.layers:
+            layer_geoms = self.layer_sequence[layer].geoms
+            layer_counts.append(len(layer_geoms))
+            geoms.extend(layer_geoms)
+        packed = popupcad.algorithms.csg_shapely.pack_entities(geoms)
+        packed['layers'] = numpy.array(layer_counts, dtype='<i4').tobytes()
+        return packed
+
+    @classmethod
+    def unpack(cls, layerdef, packed):
+        import numpy
+        geoms = popupcad.algorithms.csg_shapely.unpack_entities(packed)
+        layer_counts = numpy.frombuffer(packed['layers'], dtype='<i4').tolist()
+        new = cls(layerdef)
+        start = 0
+        for layer, count in zip(layerdef.layers, layer_counts):
+            new.replacelayergeoms(layer, geoms[start:start + count])
+            start += count
+        return new
+
     def switch_layer_defs(self,layerdef_to):
         new = Laminate(layerdef_to)
         for layer_from, layer_to in zip(self.layerdef.layers,layerdef_to.layers):
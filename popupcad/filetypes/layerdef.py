@@ -11,6 +11,11 @@ class LayerDef(object):
     def __init__(self, *args):
         self.layers = list(args)
         
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_z_values', None)
+        return state
+
     def copy(self):
         layers = [layer.copy() for layer in self.layers]
         new = type(self)(*layers)
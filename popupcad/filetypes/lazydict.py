@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import functools
+import yaml
+
+
+class LazyValue(object):
+    '''a value which is only loaded from its source the first time it is needed'''
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._dependents = []
+
+    def loaded(self):
+        return hasattr(self, '_value')
+
+    def value(self):
+        if not self.loaded():
+            self._set(self._loader())
+        return self._value
+
+    def _set(self, value):
+        self._value = value
+        self._loader = None
+        dependents, self._dependents = self._dependents, []
+        for dependent, function in dependents:
+            if not dependent.loaded():
+                dependent._set(function(value))
+
+    def _load_dependent(self, dependent):
+        self.value()
+        return dependent._value
+
+    def derive(self, function):
+        '''returns function(value), lazily if this value has not been loaded.
+        a lazy result is computed from the value as it is when first loaded,
+        before anyone else gets a chance to modify it.'''
+        if self.loaded():
+            return function(self._value)
+        new = LazyValue(None)
+        new._loader = lambda: self._load_dependent(new)
+        self._dependents.append((new, function))
+        return new
+
+
+class LazyDict(dict):
+    '''dictionary whose values may be LazyValues, which are loaded on first access'''
+
+    def _resolve(self, key, value):
+        if isinstance(value, LazyValue):
+            value = value.value()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __getitem__(self, key):
+        return self._resolve(key, dict.__getitem__(self, key))
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def values(self):
+        return [self[key] for key in list(self.keys())]
+
+    def items(self):
+        return [(key, self[key]) for key in list(self.keys())]
+
+    def pop(self, key, *default):
+        if key in self:
+            return self._resolve(key, dict.pop(self, key))
+        return dict.pop(self, key, *default)
+
+    def copy(self):
+        return type(self)(dict.items(self))
+
+    def is_loaded(self, key):
+        value = dict.__getitem__(self, key)
+        return not isinstance(value, LazyValue) or value.loaded()
+
+    def unloaded_keys(self):
+        return [key for key in self.keys() if not self.is_loaded(key)]
+
+    def map(self, function):
+        '''applies function to every value, deferring it for values not loaded yet'''
+        new = type(self)()
+        for key, value in dict.items(self):
+            if isinstance(value, LazyValue):
+                dict.__setitem__(new, key, value.derive(function))
+            else:
+                dict.__setitem__(new, key, function(value))
+        return new
+
+    @staticmethod
+    def representer(dumper, data):
+        return dumper.represent_dict(dict(data.items()))
+
+
+def map_values(dict1, function):
+    '''applies function to every value of a plain or lazy dictionary'''
+    if isinstance(dict1, LazyDict):
+        return dict1.map(function)
+    return dict([(key, function(value)) for key, value in dict1.items()])
+
+
+class LazyLoader(yaml.FullLoader):
+    '''yaml loader which leaves the values of dictionaries named in a class's
+    lazy_attributes unconstructed until they are accessed'''
+    lazy_tag = u'!lazydict'
+    object_prefix = u'tag:yaml.org,2002:python/object:'
+
+    def lazy_attributes(self, node):
+        try:
+            cls = self.find_python_name(node.tag[len(self.object_prefix):], node.start_mark)
+        except yaml.constructor.ConstructorError:
+            return ()
+        return getattr(cls, 'lazy_attributes', ())
+
+    def mark_lazy_nodes(self, root):
+        visited = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if isinstance(node, yaml.MappingNode):
+                if node.tag.startswith(self.object_prefix):
+                    lazy_attributes = self.lazy_attributes(node)
+                    for key_node, value_node in node.value:
+                        if key_node.value in lazy_attributes and isinstance(value_node, yaml.MappingNode) and value_node.tag == u'tag:yaml.org,2002:map':
+                            value_node.tag = self.lazy_tag
+                for key_node, value_node in node.value:
+                    stack.append(key_node)
+                    stack.append(value_node)
+            elif isinstance(node, yaml.SequenceNode):
+                stack.extend(node.value)
+
+    def construct_object(self, node, deep=False):
+        if node.tag == self.lazy_tag and node not in self.constructed_objects:
+            self.constructed_objects[node] = self.construct_lazy_dict(node)
+        return super(LazyLoader, self).construct_object(node, deep)
+
+    def construct_lazy_dict(self, node):
+        new = LazyDict()
+        for key_node, value_node in node.value:
+            key = self.construct_object(key_node, deep=True)
+            dict.__setitem__(new, key, LazyValue(functools.partial(self.construct_object, value_node, True)))
+        return new
+
+    def get_lazy_data(self):
+        node = self.get_single_node()
+        if node is None:
+            return None
+        self.mark_lazy_nodes(node)
+        return self.construct_object(node, deep=True)
+
+
+def load_yaml(stream):
+    '''loads a yaml document lazily. the loader is kept alive by the
+    unloaded values, so that anchors between them still resolve.'''
+    return LazyLoader(stream).get_lazy_data()
+
+
+yaml.add_representer(LazyDict, LazyDict.representer)
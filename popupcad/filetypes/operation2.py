@@ -12,6 +12,7 @@ from popupcad.filetypes.operationoutput import OperationOutput
 
 class Operation2(Node, UserData):
     name = 'Operation'
+    output_is_embeddable = True
 
     def __init__(self):
         Node.__init__(self)
@@ -23,6 +24,12 @@ class Operation2(Node, UserData):
         self.design_links = design_links
         self.clear_output()
 
+    def __getstate__(self):
+        state = Node.__getstate__(self)
+        state.pop('_design', None)
+        state.pop('output', None)
+        return state
+
     def get_design(self):
         return self._design
     def set_design(self,design):
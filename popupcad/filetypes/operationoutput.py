@@ -49,6 +49,8 @@ class OperationOutput(UserData):
 
     @staticmethod
     def getcontrols(genericgeometry):
+        import popupcad
+        from popupcad.algorithms.vertex_index import VertexIndex
         from popupcad.geometry.line import ReferenceLine
         from popupcad.geometry.vertex import ReferenceVertex
         vertices = []
@@ -71,16 +73,18 @@ class OperationOutput(UserData):
             if is_unique:
                 unique_geoms.append(geom)
 
-        vertices = list(set(vertices))
-        controlpoints = [ReferenceVertex(p) for p in vertices]
+        index = VertexIndex(vertices)
+        representatives, index_map = index.weld(popupcad.distinguishable_number_difference)
+        controlpoints = [ReferenceVertex(p) for p in index.points[representatives].tolist()]
 
-        lines = list(set(lines))
-        lines2 = [(vertices.index(p1), vertices.index(p2)) for p1, p2 in lines]
+        endpoints = index_map[index.lookup([p for line in lines for p in line])].reshape(-1, 2)
+        endpoints.sort(1)
+        lines2 = set([(ii, jj) for ii, jj in endpoints.tolist() if ii != jj])
         controllines = [
             ReferenceLine(
                 controlpoints[ii],
                 controlpoints[jj]) for ii,
-            jj in lines2]
+            jj in sorted(lines2)]
         return controlpoints, controllines, unique_geoms
 
     def edit(self, *args, **kwargs):
@@ -5,7 +5,7 @@ Email: danaukes<at>asu.edu.
 Please see LICENSE for full license.
 """
 import popupcad
-from dev_tools.genericfile import GenericFile
+from dev_tools.genericfile import GenericFile, atomic_write
 
 class popupCADFile(GenericFile):
 
@@ -17,7 +17,55 @@ class popupCADFile(GenericFile):
     def get_parent_program_version(self):
         return popupcad.version
 
-    def backup(self,folder = None,backupstring = '_backup_'):
+    @classmethod
+    def get_file_format_version(self):
+        return popupcad.file_format_version
+
+    @classmethod
+    def binaryfiletype(cls):
+        return cls.defaultfiletype + 'b'
+
+    def is_binary_filename(self, filename):
+        import os
+        return os.path.splitext(filename)[1].lower() == '.' + self.binaryfiletype()
+
+    @classmethod
+    def load_yaml(cls, filename, lazy=False):
+        import popupcad.filetypes.binary_format as binary_format
+        if binary_format.is_binary(filename):
+            return cls.load_binary(filename, lazy)
+        if not lazy:
+            return super(popupCADFile, cls).load_yaml(filename)
+        import popupcad.filetypes.lazydict as lazydict
+        with open(filename, 'r') as f:
+            obj1 = lazydict.load_yaml(f)
+        obj1.updatefilename(filename)
+        return obj1
+
+    @classmethod
+    def load_binary(cls, filename, lazy=False):
+        import popupcad.filetypes.binary_format as binary_format
+        obj1 = binary_format.load(filename, lazy)
+        obj1.updatefilename(filename)
+        return obj1
+
+    def save_yaml(self, filename, identical=True, update_filename=True):
+        if self.is_binary_filename(filename):
+            return self.save_binary(filename, identical, update_filename)
+        return super(popupCADFile, self).save_yaml(filename, identical, update_filename)
+
+    def save_binary(self, filename, identical=True, update_filename=True, compress=False):
+        import popupcad.filetypes.binary_format as binary_format
+        if update_filename:
+            self.updatefilename(filename)
+        self.parent_program_name = self.get_parent_program_name()
+        self.parent_program_version = self.get_parent_program_version()
+        self.file_format_version = self.get_file_format_version()
+        with atomic_write(filename, 'wb') as f:
+            binary_format.write(self.save_state(identical), f, compress)
+        return True
+
+    def backup_filename(self,folder = None,backupstring = '_backup_'):
         import os
         import glob
         import popupcad
@@ -38,5 +86,17 @@ class popupCADFile(GenericFile):
         time = popupcad.basic_functions.return_formatted_time(specificity = 'minute')
         
         backupfilename = filename+backupstring+time+'.'+self.defaultfiletype
-            
-        self.save_yaml(backupfilename, update_filename=False)
+        return backupfilename
+
+    def backup(self,folder = None,backupstring = '_backup_'):
+        from popupcad.filetypes.backup_store import BackupStore
+        if folder is None:
+            folder = self.dirname
+        return BackupStore(folder).backup(self,backupstring)
+
+    def backup_source(self,source,folder = None,backupstring = '_backup_'):
+        '''backs up the file this object was loaded from, byte for byte'''
+        from popupcad.filetypes.backup_store import BackupStore
+        if folder is None:
+            folder = self.dirname
+        return BackupStore(folder).backup_source(self,source,backupstring)
@@ -17,7 +17,7 @@ from popupcad.filetypes.genericshapes import GenericPoly
 from popupcad.filetypes.genericshapes import GenericLine
 
 class Sketch(popupCADFile):
-    file_filter = 'Sketch File(*.sketch);;DXF(*.dxf)'
+    file_filter = 'Sketch File(*.sketch);;Binary Sketch File(*.sketchb);;DXF(*.dxf)'
     selected_filter = 'Sketch File(*.sketch)'
     defaultfiletype = 'sketch'
 
@@ -41,6 +41,11 @@ class Sketch(popupCADFile):
         self = cls(operationgeometry,constraintsystem)
         return self
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['operationgeometry'] = [geom for geom in self.operationgeometry if geom.isValid()]
+        return state
+
     def copy(self, identical=True):
         operationgeometry = [
             geom.copy(
@@ -103,12 +108,9 @@ class Sketch(popupCADFile):
 
     @classmethod
     def load_dxf(cls, filename, parent=None):
-        import ezdxf
-        ezdxf.options.template_dir = popupcad.supportfiledir        
-        
-        import ezdxf.modern
-        dxf = ezdxf.readfile(filename)
-        layer_names = [layer.dxf.name for layer in dxf.layers]
+        from popupcad.filetypes.dxfimport import DXFImport
+        importer = DXFImport(filename)
+        layer_names = importer.layer_names()
         
         dialog = qg.QDialog()
         lw = qg.QListWidget()
@@ -130,54 +132,11 @@ class Sketch(popupCADFile):
         result = dialog.exec_()
         
         if result:
-            selected_layers = [
+            importer.layers = [
                 item.data(
                     qc.Qt.DisplayRole) for item in lw.selectedItems()]
-            entities = [item for item in dxf.modelspace()]
-            generics = []
-            for entity in entities:
-                if entity.dxf.layer in selected_layers:
-                    if isinstance(entity, ezdxf.modern.graphics.Line):
-                        import numpy
-                        points = numpy.array(
-                            [entity.dxf.start[:2], entity.dxf.end[:2]])
-                        generics.append(
-                            GenericLine.gen_from_point_lists(
-                                points.tolist(),
-                                []))
-                    elif isinstance(entity, ezdxf.modern.graphics.LWPolyline):
-                        import numpy
-                        points = numpy.array([item for item in entity.get_points()])
-                        points = points[:,:2]
-                        if entity.closed:
-                            generics.append(GenericPoly.gen_from_point_lists(points.tolist(),[]))
-                        else:
-                            generics.append(GenericPolyline.gen_from_point_lists(points.tolist(),[]))
-                    elif isinstance(entity, ezdxf.modern.graphics.Point):
-                        from popupcad.geometry.vertex import DrawnPoint
-                        point = DrawnPoint(numpy.array(entity.get_dxf_attrib('location')[:2]))
-                        generics.append(point)
-                    elif isinstance(entity, ezdxf.modern.spline.Spline):
-                        knots = entity.get_knot_values()
-                        control_points = entity.get_control_points()
-                        weights = entity.get_weights()
-                        n = len(control_points)-1
-                        domain = popupcad.algorithms.spline_functions.make_domain(knots,n*5)
-                        points = popupcad.algorithms.spline_functions.interpolated_points(control_points,knots,weights,domain)
-                        points = points[:,:2]
-                        if entity.closed:
-                            generics.append(GenericPoly.gen_from_point_lists(points.tolist(),[]))
-                        else:
-                            generics.append(GenericPolyline.gen_from_point_lists(points.tolist(),[]))
-
-#                        print(points)
-                    else:
-                        print(entity)
-            new = cls.new()
-            new.addoperationgeometries(generics)
-            newfile = os.path.splitext(filename)[0]+'.sketch'
-            new.updatefilename(newfile)
-            return filename, new
+            importer.read()
+            return filename, importer.sketch()
         else:
             return None, None
 
@@ -6,6 +6,7 @@ Please see LICENSE for full license.
 """
 
 
+import time
 import numpy
 from popupcad.filetypes.genericshapes import GenericPoly
 from popupcad.filetypes.genericshapebase import NotSimple, ShapeInvalid, GenericShapeBase
@@ -50,7 +51,8 @@ class Assembly(popupCADFile):
             area_ratio=1e-3,
             colinear_tol=1e-1,
             bufferval=0.,
-            cleanup=.01):
+            cleanup=.01,
+            callback=None):
         ok1 = True
         ok2 = True
         ok3 = True
@@ -82,81 +84,68 @@ class Assembly(popupCADFile):
                 area_ratio,
                 colinear_tol,
                 bufferval,
-                cleanup)
+                cleanup,
+                callback)
 
-    def _convert(self,scalefactor,area_ratio,colinear_tol,bufferval,cleanup):
-        self.geoms = []
+    def _convert(self,scalefactor,area_ratio,colinear_tol,bufferval,cleanup,callback=None):
+        '''converts the faces of every component, several components at a time.
+        callback is called with the number of components done and the total.'''
+        t0 = time.time()
         T1 = numpy.array(self.transform)
-        R1 = T1[0:3, 0:3]
-        b1 = T1[0:3, 3:4]
-        for ii, component in enumerate(self.components):
-            T2 = numpy.array(component.transform)
-            R2 = T2[0:3, 0:3]
-            b2 = T2[0:3, 3:4]
-            if component.faces is not None:
-                for jj, face in enumerate(component.faces):
-                    try:
-                        loops = face.loops
-
-                        ints_c = [self.transform_loop(interior,R1,b1,R2,b2,scalefactor) for interior in loops]
-
-                        a = [
-                            GenericPoly.gen_from_point_lists(
-                                loop,
-                                []) for loop in ints_c]
-                        b = [item.to_shapely(scaling = popupcad.csg_processing_scaling) for item in a]
-                        if cleanup >= 0:
-                            b = [
-                                item.simplify(
-                                    cleanup *
-                                    popupcad.csg_processing_scaling) for item in b]
-                        c = b.pop(0)
-                        for item in b:
-                            c = c.symmetric_difference(item)
-                        d = popupcad.algorithms.csg_shapely.condition_shapely_entities(c)
-                        e = popupcad.algorithms.csg_shapely.condition_shapely_entities(*[item.buffer(bufferval * popupcad.csg_processing_scaling,resolution=popupcad.default_buffer_resolution) for item in d])
-                        f = [popupcad.algorithms.csg_shapely.to_generic(item) for item in e]
-                        self.geoms.extend(f)
-                    except NotSimple:
-                        pass
-                    except ShapeInvalid:
-                        pass
-                    except ValueError as ex:
-                        print(ex)
-#                        if ex.message!='A LinearRing must have at least 3 coordinate tuples':
-#                            print(ex.message)
-        self.filter_small_areas(area_ratio)
+        tasks = [(ii, T1, component.transform, [face.loops for face in component.faces or []], scalefactor, bufferval, cleanup) for ii, component in enumerate(self.components)]
+        results = popupcad.algorithms.parallel.map_parallel(convert_component, tasks, callback=callback)
+        self.geoms = []
+        areas = []
+        self.timings = []
+        for (ii, entities, errors, elapsed), component in zip(results, self.components):
+            self.geoms.extend([popupcad.algorithms.csg_shapely.to_generic(item) for item in entities])
+            areas.extend([abs(item.area) for item in entities])
+            self.timings.append((self.component_name(ii, component), len(component.faces or []), len(entities), elapsed))
+            for error in errors:
+                print(error)
+        self.filter_small_areas(area_ratio, areas)
+        self.total_time = time.time() - t0
 
     @staticmethod
-    def transform_loop(loop, R1, b1, R2, b2, scalefactor):
-        looparray = numpy.array(loop).T
+    def component_name(ii, component):
+        return str(getattr(component, 'name', None) or 'component {0:d}'.format(ii))
+
+    def report(self):
+        '''the time spent on each component during the last conversion'''
+        lines = ['{0:<32}{1:>8}{2:>8}{3:>10}'.format('component', 'faces', 'shapes', 'time')]
+        for name, faces, shapes, elapsed in self.timings:
+            lines.append('{0:<32}{1:>8}{2:>8}{3:>9.3f}s'.format(name, faces, shapes, elapsed))
+        lines.append('{0:<32}{1:>8}{2:>8}{3:>9.3f}s'.format('total', '', len(self.geoms), self.total_time))
+        return '\n'.join(lines)
 
-        v2 = R1.T.dot(R2.T.dot(looparray) + b2)
-        v2 = v2[0:2, :].T
-        v2 = v2 * scalefactor * popupcad.solidworks_mm_conversion
-        return v2.tolist()
+    @staticmethod
+    def transform_loop(loop, R1, b1, R2, b2, scalefactor):
+        return transform_loops([loop], R1, b1, R2, b2, scalefactor)[0].tolist()
 
     def build_face_sketch(self):
-        self.convert(scalefactor=None, bufferval=None, cleanup=None)
+        progress = qg.QProgressDialog('Converting components...', None, 0, len(self.components))
+        progress.setWindowModality(qc.Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def update(done, total):
+            progress.setValue(done)
+            qg.QApplication.processEvents()
+
+        self.convert(scalefactor=None, bufferval=None, cleanup=None, callback=update)
+        progress.close()
         sketch = popupcad.filetypes.sketch.Sketch.new()
         sketch.addoperationgeometries(self.geoms)
         return sketch
 
-    def filter_small_areas(self, area_ratio):
-        areas = []
-        for geom in self.geoms:
-            shape = geom.to_shapely(scaling = popupcad.csg_processing_scaling)
-            areas.append(abs(shape.area))
-        goodgeoms = []
-        badgeoms = []
-        for geom in self.geoms:
-            shape = geom.to_shapely(scaling = popupcad.csg_processing_scaling)
-            if abs(shape.area) < max(areas) * area_ratio:
-                badgeoms.append(geom)
-            else:
-                goodgeoms.append(geom)
-        self.geoms = goodgeoms
-        self.badgeoms = badgeoms
+    def filter_small_areas(self, area_ratio, areas=None):
+        if areas is None:
+            areas = [abs(geom.to_shapely(scaling = popupcad.csg_processing_scaling).area) for geom in self.geoms]
+        areas = numpy.array(areas, dtype=float)
+        if len(areas):
+            good = areas >= areas.max() * area_ratio
+        else:
+            good = numpy.zeros(0, dtype=bool)
+        self.geoms, self.badgeoms = [geom for geom, test in zip(self.geoms, good) if test], [geom for geom, test in zip(self.geoms, good) if not test]
 
     @staticmethod
     def buildloops(geoms):
@@ -166,6 +155,62 @@ class Assembly(popupCADFile):
             loops.extend(geom.interiorpoints())
         return loops
 
+def transform_loops(loops, R1, b1, R2, b2, scalefactor):
+    '''moves loops of 3d points from part to assembly coordinates and drops
+    them into the plane, all at once. returns an (n,2) array for each loop.'''
+    if not loops:
+        return []
+    loops = [numpy.asarray(loop, dtype=float).reshape(-1, 3) for loop in loops]
+    points = numpy.concatenate(loops).T
+    v2 = R1.T.dot(R2.T.dot(points) + b2)
+    v2 = v2[0:2, :].T * (scalefactor * popupcad.solidworks_mm_conversion)
+    return numpy.split(v2, numpy.cumsum([len(loop) for loop in loops])[:-1])
+
+
+def remove_redundant_points(points):
+    '''the array equivalent of GenericShapeBase.remove_redundant_points for a closed loop'''
+    return points[popupcad.algorithms.points.distinct_points(points, popupcad.distinguishable_number_difference)]
+
+
+def convert_face(loops, bufferval, cleanup):
+    '''the shapely polygons left by a face's loops once holes are cut and the result is buffered'''
+    import shapely.geometry as sg
+    scaling = popupcad.csg_processing_scaling
+    b = [sg.Polygon(remove_redundant_points(loop) * scaling) for loop in loops]
+    if cleanup >= 0:
+        b = [item.simplify(cleanup * scaling) for item in b]
+    c = b.pop(0)
+    for item in b:
+        c = c.symmetric_difference(item)
+    d = popupcad.algorithms.csg_shapely.condition_shapely_entities(c)
+    e = popupcad.algorithms.csg_shapely.condition_shapely_entities(*[item.buffer(bufferval * scaling,resolution=popupcad.default_buffer_resolution) for item in d])
+    return e
+
+
+def convert_component(task):
+    '''
+    converts the faces of one component into shapely polygons. module level, so
+    that it can run in a worker process. every loop of the component is moved
+    into the plane with one matrix product.
+    '''
+    t0 = time.time()
+    ii, T1, T2, loops, scalefactor, bufferval, cleanup = task
+    T1 = numpy.array(T1)
+    T2 = numpy.array(T2)
+    points = transform_loops([loop for item in loops for loop in item], T1[0:3, 0:3], T1[0:3, 3:4], T2[0:3, 0:3], T2[0:3, 3:4], scalefactor)
+    entities = []
+    errors = []
+    start = 0
+    for face_loops in loops:
+        face_points = points[start:start + len(face_loops)]
+        start += len(face_loops)
+        try:
+            entities.extend(convert_face(face_points, bufferval, cleanup))
+        except ValueError as ex:
+            errors.append(str(ex))
+    return ii, entities, errors, time.time() - t0
+
+
 if __name__ == '__main__':
     import sys
 
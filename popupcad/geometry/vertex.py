@@ -94,7 +94,7 @@ class BaseVertex(object):
         return tuple(numpy.r_[self.getpos(),0].tolist())
 
     def setsymbol(self, variable, value):
-        p = self.constraints_ref().p()
+        p = self.constraints_ref().variables()
         if p[0] == variable:
             self.setpos((value, self.getpos()[1]))
         if p[1] == variable:
@@ -36,6 +36,7 @@ triangulation_scaling = 1e3
 geometry_round_value = 8
 distinguishable_number_difference = 10**(-geometry_round_value)
 undistinguishable_number_difference = 10**(-geometry_round_value - 1)
+mesh_round_value = 9 #decimal places of exported meshes, in meters
 
 SI_length_scaling = 1000
 
@@ -53,6 +54,11 @@ version = basic_functions.return_formatted_time(
     small_separator='.',
     big_separator='.')
 
+#increment whenever a change to the saved classes needs upgrade() to run on older files
+file_format_version = 1
+#increment whenever a change to an algorithm changes the outputs operations generate, so that outputs embedded in older files are generated again
+output_version = 1
+
 default_buffer_resolution = 4
 
 gui_default_decimals = 6
@@ -82,6 +88,10 @@ backup_timeout = 1000 * 60 * 5
 #backup_timeout = 1000 * 2
 backup_limit = 10
 #backup_limit = 3
+backup_store_limit = 100
+lazy_loading = False
+journal_checkpoint_size = 1024 * 1024 * 16
+embed_outputs = False
 
 designdir = os.path.normpath(os.path.join(popupcad_home_path, 'designs'))
 importdir = os.path.normpath(os.path.join(popupcad_home_path, 'import'))
@@ -89,6 +99,7 @@ exportdir = os.path.normpath(os.path.join(popupcad_home_path, 'export'))
 sketchdir = os.path.normpath(os.path.join(popupcad_home_path, 'sketches'))
 shapedir = os.path.normpath(os.path.join(popupcad_home_path, 'shapes'))
 backupdir = os.path.normpath(os.path.join(popupcad_home_path, 'backup'))
+constraint_cache_dir = os.path.normpath(os.path.join(popupcad_home_path, 'constraint_cache'))
 
 user_materials_filename = os.path.normpath(os.path.join(popupcad_home_path,'materials.yaml'))
 internal_materials_filename = os.path.normpath(os.path.join(supportfiledir,'materials.yaml'))
@@ -119,6 +130,17 @@ nominal_height = 720
 
 text_approximation = 2
 
+parallel_processes = None
+parallel_start_method = None #how worker processes are started, 'fork', 'spawn' or 'forkserver'; None uses the platform's default, or spawn inside the gui
+
+triangulation_backend = 'auto'
+triangulation_cache_size = 10000
+
+sparse_constraint_threshold = 200 #number of variables above which the constraint solver works with sparse jacobians
+parallel_constraint_threshold = 2000 #number of variables a group of constraints needs to be solved in a worker process
+constraint_kernels = True #evaluate built-in constraints with batched numpy kernels rather than functions compiled from their sympy equations
+drag_time_budget = .015 #seconds each mouse move may spend solving constraints while dragging
+
 custom_settings_filename = os.path.normpath(os.path.join(popupcad_home_path,'settings.yaml'))
 plugins = ['popupcad_manufacturing_plugins','popupcad_gazebo','popupcad_microrobotics']
 user_plugins = []
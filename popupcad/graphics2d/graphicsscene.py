@@ -59,6 +59,7 @@ class SketcherSupport(object):
         self.setBackgroundBrush(qg.QBrush(qg.QColor.fromRgbF(*popupcad.graphics_scene_background_color),qc.Qt.SolidPattern))
         self.temp = None
         self.extraobjects = []
+        self.reference_index = None
         self.nextgeometry = None
 
     def connect_mouse_modes(self,view):
@@ -182,7 +183,18 @@ class SketcherSupport(object):
         self.constraints_on = constraints_on
 
     def update_extra_objects(self, extraobjects):
+        from popupcad.algorithms.vertex_index import VertexIndex
         self.extraobjects = extraobjects
+        vertices = [item.get_generic() for item in extraobjects if isinstance(item, ReferenceInteractiveVertex)]
+        self.reference_index = VertexIndex.from_vertices(vertices)
+
+    def snap_to_reference(self, point, radius):
+        if self.reference_index is None:
+            return point
+        vertex = self.reference_index.nearest_vertex(point, radius)
+        if vertex is None:
+            return point
+        return vertex.getpos()
 
     def updatevertices(self):
         self.removecontrolpoints()
@@ -63,6 +63,10 @@ class Proto(Common):
             self.minradius /
             self.scene().views()[0].zoom())
 
+    def snap(self, point):
+        radius = self.minradius / self.scene().views()[0].zoom() / popupcad.view_scaling
+        return self.scene().snap_to_reference(point, radius)
+
     def finish_definition(self):
         scene = self.scene()
         self.deltemphandle()
@@ -104,6 +108,7 @@ class ProtoMultiPoint(Proto):
     def mousepress(self, point):
         import numpy
         point = tuple(numpy.array(qh.to_tuple(point)) / popupcad.view_scaling)
+        point = self.snap(point)
 
         if not self.temphandle:
             a = ShapeVertex(point)
@@ -149,6 +154,7 @@ class ProtoTwoPoint(Proto):
     def mousepress(self, point):
         import numpy
         point = tuple(numpy.array(qh.to_tuple(point)) / popupcad.view_scaling)
+        point = self.snap(point)
 
         if not self.temphandle:
             a = ShapeVertex(point)
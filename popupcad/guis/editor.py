@@ -8,11 +8,12 @@ Please see LICENSE for full license.
 import sys
 import os
 
+import qt
 import qt.QtCore as qc
 import qt.QtGui as qg
 import glob
 import imp
-from popupcad.widgets.export_widget import DxfExportWidget
+from popupcad.widgets.export_widget import DxfExportWidget, BatchExportWidget
 import popupcad
 import yaml
 from popupcad.filetypes.design import Design
@@ -109,7 +110,34 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
         self.error_log.closeEvent = lambda event: self.action_uncheck(self.menu_system.actions['view_error_log'])
 
     def autosave(self):
-        self.design.backup(popupcad.backupdir,'_autosave_')
+        try:
+            self.journal.flush()
+        except (IOError, OSError) as ex:
+            self.error_log.appendText('Autosave failed: {0}'.format(ex))
+
+    def start_journal(self, source=None):
+        try:
+            self.journal.start(source)
+        except (IOError, OSError) as ex:
+            self.error_log.appendText('Could not start the autosave journal: {0}'.format(ex))
+
+    def recover(self):
+        from popupcad.filetypes.journal import Journal
+        filter1 = 'Autosave Journal(*.{0})'.format(Journal.extension)
+        if qt.loaded == 'PySide' or qt.loaded == 'PyQt5':
+            filename, selectedfilter = qg.QFileDialog.getOpenFileName(self, 'Recover', popupcad.backupdir, filter1)
+        else:
+            filename = qg.QFileDialog.getOpenFileName(self, 'Recover', popupcad.backupdir, filter1)
+        if filename:
+            try:
+                design = Journal.recover(filename)
+            except (IOError, OSError) as ex:
+                qg.QMessageBox.warning(self, 'Recover', 'Could not recover {0}: {1}'.format(filename, ex))
+                return
+            self.load_design(design)
+            if self.menu_system.actions['project_auto_reprocess'].isChecked():
+                self.reprocessoperations()
+            self.view_2d.zoomToFit()
         
     def show_hide_view_3d(self):
         if self.menu_system.actions['view_3d'].isChecked():
@@ -213,13 +241,32 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
     
     def newoperationslot(self, operation):
         self.design.append_operation(operation)
+        self.journal.operation_changed(operation)
         if self.menu_system.actions['project_auto_reprocess'].isChecked():
             self.reprocessoperations([operation])
     
     def editedoperationslot(self, operation):
+        self.journal.operation_changed(operation)
         if self.menu_system.actions['project_auto_reprocess'].isChecked():
             self.reprocessoperations([operation])
     
+    def reprocess_missing_outputs(self):
+        '''regenerates only the operations which were not loaded with an embedded output'''
+        missing = [op for op in self.design.operations if not hasattr(op,'output')]
+        if len(missing) == len(self.design.operations):
+            self.reprocessoperations()
+        elif missing:
+            self.reprocessoperations(missing)
+        else:
+            self.operationeditor.refresh()
+            self.showcurrentoutput()
+
+    def set_embed_outputs(self):
+        popupcad.embed_outputs = self.menu_system.actions['file_embed_outputs'].isChecked()
+        if popupcad.embed_outputs:
+            #only outputs generated while embedding is on are known to be current
+            self.reprocessoperations()
+
     def reprocessoperations_outer(self):
         self.reprocessoperations(None)
         
@@ -234,6 +281,19 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
         finally:
             self.operationeditor.refresh()
 
+    def restore_backup(self):
+        from popupcad.filetypes.backup_store import BackupStore
+        filter1 = 'Backup(*.{0})'.format(BackupStore.extension)
+        if qt.loaded == 'PySide' or qt.loaded == 'PyQt5':
+            filename, selectedfilter = qg.QFileDialog.getOpenFileName(self, 'Restore Backup', popupcad.backupdir, filter1)
+        else:
+            filename = qg.QFileDialog.getOpenFileName(self, 'Restore Backup', popupcad.backupdir, filter1)
+        if filename:
+            self.load_design(Design.load_backup(filename))
+            if self.menu_system.actions['project_auto_reprocess'].isChecked():
+                self.reprocessoperations()
+            self.view_2d.zoomToFit()
+
     def newfile(self):
         from popupcad.filetypes.layerdef import LayerDef
         import popupcad.filetypes.material2 as materials
@@ -246,31 +306,47 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
     def open_filename(self,filename):
         design = Design.load_yaml(filename)
         if not design is None:
-            self.load_design(design)
+            self.load_design(design, design.filename())
             if self.menu_system.actions['project_auto_reprocess'].isChecked():
-                self.reprocessoperations()
+                self.reprocess_missing_outputs()
             self.view_2d.zoomToFit()
         
     def open(self):
         design = Design.open(self)
         if not design is None:
-            self.load_design(design)
+            self.load_design(design, design.filename())
             if self.menu_system.actions['project_auto_reprocess'].isChecked():
-                self.reprocessoperations()
+                self.reprocess_missing_outputs()
             self.view_2d.zoomToFit()
 
     def save(self):
         value = self.design.save(self)
+        if value:
+            self.start_journal(self.design.filename())
         self.update_window_title()
         return value
     
     def saveAs(self):
         value = self.design.saveAs(self)
+        if value:
+            self.start_journal(self.design.filename())
         self.update_window_title()
         return value
     
-    def load_design(self, design):
+    def load_design(self, design, source=None):
+        from popupcad.filetypes.journal import Journal
+        try:
+            journal = self.journal
+        except AttributeError:
+            journal = None
+        if journal is not None:
+            if journal.modified():
+                self.autosave()
+            else:
+                journal.discard()
         self.design = design
+        self.journal = Journal(design)
+        self.start_journal(source)
         self.operationeditor.blockSignals(True)
         self.layerlistwidget.blockSignals(True)
         self.scene.deleteall()
@@ -295,6 +371,7 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
         result = window.exec_()
         if result == window.Accepted:
             self.design.define_layers(window.layerdef)
+            self.journal.layerdef_changed()
         self.updatelayerlist()
         self.layerlistwidget.selectAll()
     
@@ -303,6 +380,7 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
         dialog = self.builddialog(PropertyEditor(self.design.return_layer_definition().layers))
         dialog.exec_()
         del self.design.return_layer_definition().z_values
+        self.journal.layerdef_changed()
     
     def sketchlist(self):
         from popupcad.widgets.listmanager import AdvancedSketchListManager
@@ -392,6 +470,7 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
 
     def closeEvent(self, event):
         if self.checkSafe():
+            self.journal.discard()
             self.error_log.close()
             event.accept()
         else:
@@ -430,6 +509,7 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
             self.design.replace_op_refs(
                 self.operationeditor.currentRefs()[0],
                 operationlist.currentRefs()[0])
+            self.journal.operations_changed()
         self.reprocessoperations()
     
     def insert_and_replace(self):
@@ -441,9 +521,11 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
         self.design.replace_op_refs(
             (operation_ref, output_index), (newop.id, 0))
         newop.operation_links['unary'].append((operation_ref, output_index))
+        self.journal.operations_changed()
         self.reprocessoperations()
 
     def upgrade(self):
+        self.design.backup(popupcad.backupdir,'_pre-upgrade_')
         try:
             self.load_design(self.design.upgrade())
         except popupcad.filetypes.design.UpgradeError as ex:
@@ -485,6 +567,20 @@ class Editor(popupcad.widgets.widgetcommon.MainGui, qg.QMainWindow):
             basename = self.design.get_basename() + '_'+str(self.design.operations[ii])
             generic.save_dxf(basename,separate_files=accept_data['separate_layers'],directory = accept_data['directory'])
 
+    def export_layers(self):
+        try:
+            dirname = self.design.dirname        
+        except AttributeError:
+            dirname = popupcad.exportdir
+        dialog = BatchExportWidget(dirname)
+        result = dialog.exec_()
+        if result:
+            accept_data = dialog.accept_data()
+            indices = self.operationeditor.currentIndeces2()
+            if len(indices)==0:
+                indices = None
+            popupcad.algorithms.batch_export.export_outputs(self.design,indices,accept_data['formats'],accept_data['directory'],accept_data['separate_layers'])
+
     def import_foldable_laminate(self):
         pass
     
@@ -221,6 +221,16 @@ class Sketcher(MainGui,qg.QMainWindow):
         self.scene.updateshape()
         self.constraint_editor.refresh()
 
+    def show_constraint_diagnostics(self):
+        import popupcad.widgets.textwindow
+        diagnostics = self.sketch.constraintsystem.diagnostics()
+        self.diagnostics_window = popupcad.widgets.textwindow.TextWindow()
+        self.diagnostics_window.setWindowTitle('Constraint Diagnostics')
+        self.diagnostics_window.te.setReadOnly(True)
+        self.diagnostics_window.te.setFontFamily('Courier')
+        self.diagnostics_window.te.setText(diagnostics.report())
+        self.diagnostics_window.show()
+
     def get_sketch_vertices(self):
         self.update_sketch_geometries()
         vertices = [vertex for geom in self.sketch.operationgeometry for vertex in geom.vertices()]
@@ -303,6 +313,17 @@ class Sketcher(MainGui,qg.QMainWindow):
             sketch = a.build_face_sketch()
             self.loadsketch(sketch)
             self.undoredo.restartundoqueue()
+            if hasattr(a, 'timings'):
+                self.show_import_report(a.report())
+
+    def show_import_report(self, report):
+        import popupcad.widgets.textwindow
+        self.import_report_window = popupcad.widgets.textwindow.TextWindow()
+        self.import_report_window.setWindowTitle('Import Report')
+        self.import_report_window.te.setReadOnly(True)
+        self.import_report_window.te.setFontFamily('Courier')
+        self.import_report_window.te.setText(report)
+        self.import_report_window.show()
 
     def open(self):
         sketch = popupcad.filetypes.sketch.Sketch.open()
@@ -216,6 +216,8 @@ class MainWidget(qg.QDialog):
 
 class JointOperation3(Operation2, LayerBasedOperation):
     name = 'JointOp'
+    #generate() also finds the bodies and joints used for simulation, which are not embedded
+    output_is_embeddable = False
     resolution = 2
 
     def copy(self):
@@ -230,6 +232,12 @@ class JointOperation3(Operation2, LayerBasedOperation):
         self.editdata(*args)
         self.id = id(self)
 
+    def __getstate__(self):
+        state = super(JointOperation3, self).__getstate__()
+        for key in ['fixed_bodies', 'bodies_generic', 'connections', 'all_joint_props', 'layer_def']:
+            state.pop(key, None)
+        return state
+
     def editdata(self, operation_links,sketch_links,joint_defs):
         super(JointOperation3,self).editdata(operation_links,sketch_links,{})
         self.joint_defs = joint_defs
@@ -58,6 +58,25 @@ class DxfExportWidget(qg.QDialog):
         data['separate_layers'] = self.separate_layers.isChecked()
         return data
         
+class BatchExportWidget(DxfExportWidget):
+
+    def __init__(self,folder = None):
+        super(BatchExportWidget, self).__init__(folder)
+        self.separate_layers.setChecked(True)
+        self.format_boxes = {}
+        layout = qg.QHBoxLayout()
+        for file_format in ['dxf','svg']:
+            box = qg.QCheckBox(file_format.upper())
+            box.setChecked(True)
+            self.format_boxes[file_format] = box
+            layout.addWidget(box)
+        self.layout().insertLayout(1,layout)
+
+    def accept_data(self):
+        data = super(BatchExportWidget, self).accept_data()
+        data['formats'] = [key for key,box in sorted(self.format_boxes.items()) if box.isChecked()]
+        return data
+        
 if __name__ == '__main__':
     import sys
     app = qg.QApplication(sys.argv)
@@ -522,7 +522,6 @@ def createRobotPart(joint_laminate, counter, tree, buildMesh=True, approxCollisi
     """
     Creates the SDF for each link in the Robot
     """
-    filename = str(joint_laminate.id)
     _, trueMass, center_of_mass, I =  joint_laminate.mass_properties()      
     
     xml_name = tree.getNode(joint_laminate).getID()   
@@ -543,13 +542,15 @@ def createRobotPart(joint_laminate, counter, tree, buildMesh=True, approxCollisi
     etree.SubElement(ode_params, "slip2").text = "1"
     
     if buildMesh: #Decides if you want to use an external mesh file or the polyline feature (experimental)
-        joint_laminate.toDAE()      
+        #links with identical shapes share one mesh file, placed by the pose
+        mesh_filename, offset = joint_laminate.toDAE(centered=True)
+        mesh_pose = str(offset[0]) + " " + str(offset[1]) + " " + str(offset[2]) + " 0 0 0"
         visual_of_robot = etree.SubElement(root_of_robot, "visual", name="basic_bot_visual" + str(counter))        
-        etree.SubElement(visual_of_robot, "pose").text = "0 0 0 0 0 0"
+        etree.SubElement(visual_of_robot, "pose").text = mesh_pose
         
         geometry_of_robot = etree.Element("geometry")
         robo_mesh = etree.SubElement(geometry_of_robot, "mesh")
-        etree.SubElement(robo_mesh, "uri").text = "file://" + popupcad.exportdir + os.path.sep  + filename + ".dae"
+        etree.SubElement(robo_mesh, "uri").text = "file://" + mesh_filename
         #etree.SubElement(robo_mesh, "scale").text = "1 1 1000000"    #For debugging
         visual_of_robot.append(geometry_of_robot)
 
@@ -563,6 +564,7 @@ def createRobotPart(joint_laminate, counter, tree, buildMesh=True, approxCollisi
             collision = etree.SubElement(root_of_robot, "collision", name="basic_bot_collision" + str(counter))        
             collision.insert(0, deepcopy(geometry_of_robot))
             collision.insert(0, surface_tree)
+            etree.SubElement(collision, "pose").text = mesh_pose
     else:
         visuals_of_robot = joint_laminate.toSDFTag("visual", "basic_bot_visual" + str(counter))    
         for visual_of_robot in visuals_of_robot:
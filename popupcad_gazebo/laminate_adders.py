@@ -34,83 +34,23 @@ def toSDFTag(self, tag, name_value):
         counter+=1
     return tree_tags
  
-#TODO Clean up variable names so it satisifes pylint and whatnot.
-#Exports the mesh as an STL files
-def toSTL(self):
+#Exports the mesh as an STL file
+def toSTL(self, filename=None, binary=True):
     """
-    Exports the current laminate as an STL file
+    Exports the current laminate as an STL file, in meters, returning its name
     """
-    from stl.mesh import Mesh #Requires numpy-stl 
-    layerdef = self.layerdef
-    laminate_verts = []
-    for layer in layerdef.layers:
-        shapes = self.geoms[layer]#TODO Add it in for other shapes         
-        zvalue = layerdef.z_values[layer]      
-        thickness = layer.thickness
-        if (len(shapes) == 0) : #In case there are no shapes.
-            print("No shapes skipping")            
-            continue
-        for s in shapes:
-            shape_verts = s.extrudeVertices(thickness, z0=zvalue)
-            laminate_verts.extend(shape_verts)
-
-    laminate_verts = [point/popupcad.SI_length_scaling for point in laminate_verts]
-    # Or creating a new mesh (make sure not to overwrite the `mesh` import by
-    # naming it `mesh`):
-    VERTICE_COUNT = len(laminate_verts)//3 #Number of verticies
-    data = numpy.zeros(VERTICE_COUNT, dtype=Mesh.dtype) #We create an array full of zeroes. Will edit it later.
-    #Creates a mesh from the specified set of points
-    for dtype, points in zip(data, numpy.array(laminate_verts).reshape(-1,9)):
-        points = points.reshape(-1, 3) #Splits each triangle into points
-        numpy.copyto(dtype[1], points) #Copies the list of points into verticies index
-    
-    data = Mesh.remove_duplicate_polygons(data)
-    
-    #This constructs the mesh objects, generates the normals and all
-    your_mesh = Mesh(data, remove_empty_areas=True)
-
-    filename =  str(self.id) + '.stl'
-            
-    old_path = os.getcwd() #Save old directory
-    new_path = popupcad.exportdir + os.path.sep #Load export directory
-    os.chdir(new_path) #Change to export directory
-    print("Saving in " + str(new_path))
-    your_mesh.save(filename)#Apparently save does not like absolute paths
-    print(filename + " has been saved")
-    os.chdir(old_path) #Change back to old directory
+    import popupcad.algorithms.mesh
+    return popupcad.algorithms.mesh.laminate_stl(self, filename, binary)
     
 #Allows the laminate to get exported as a DAE.
-def toDAE(self):
+def toDAE(self, filename=None, directory=None, centered=False):
     """
-    Exports the current lamiante to a DAE file format
+    Exports the current laminate to a DAE file format, with one geometry and
+    one shared material per layer. Returns the filename and the offset
+    removed from the mesh, as popupcad.algorithms.mesh.laminate_dae does.
     """
-    import collada
-    mesh = collada.Collada()
-    layerdef = self.layerdef
-    nodes = [] # Each node of the mesh scene. Typically one per layer.
-    for layer in layerdef.layers:
-        layer_thickness = layer.thickness    
-        shapes = self.geoms[layer]
-        zvalue = layerdef.z_values[layer]        
-        height = float(zvalue) #* 100 #* 
-        if (len(shapes) == 0) : #In case there are no shapes.
-            continue
-        for s in shapes:
-            geom = self.createDAEFromShape(s, height, mesh, layer_thickness)
-            mesh.geometries.append(geom) 
-            effect = collada.material.Effect("effect", [], "phone", diffuse=(1,0,0), specular=(0,1,0))
-            mat = collada.material.Material("material", "mymaterial" + str(s.id), effect)    
-            matnode = collada.scene.MaterialNode("materialref" + str(s.id), mat, inputs=[])
-            mesh.effects.append(effect)
-            mesh.materials.append(mat)
-            geomnode = collada.scene.GeometryNode(geom, [matnode])
-            node = collada.scene.Node("node" + str(s.id), children=[geomnode])    
-            nodes.append(node)
-    myscene = collada.scene.Scene("myscene", nodes)
-    mesh.scenes.append(myscene)
-    mesh.scene = myscene
-    filename = popupcad.exportdir + os.path.sep +  str(self.id) + '.dae' # 
-    mesh.write(filename)
+    import popupcad.algorithms.mesh
+    return popupcad.algorithms.mesh.laminate_dae(self, filename, directory, centered)
     
 def createDAEFromShape(self, s, layer_num, mesh, thickness): #TODO Move this method into the shape class.
     import collada
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import popupcad
+from popupcad.geometry.vertex import ShapeVertex
+from popupcad.constraints.constraint_system import ConstraintSystem
+import popupcad.constraints.constraints as constraints
+
+def system(*items):
+    a,b,c = vertices = [ShapeVertex((0.,0.)),ShapeVertex((1.,.2)),ShapeVertex((3.,4.))]
+    new = ConstraintSystem()
+    for item in items:
+        new.add_constraint(item(a.id,b.id))
+    new.get_vertices = lambda: vertices
+    return new
+
+def test_rank_and_dof():
+    diagnostics = system(lambda a,b: constraints.FixedConstraint([a],[(0.,0.)]),
+                         lambda a,b: constraints.DistanceConstraint(1.,[a,b],[])).diagnostics()
+    assert diagnostics.rank == 3
+    assert diagnostics.dof == 3
+    assert not diagnostics.redundant and not diagnostics.conflicting
+    assert diagnostics.components[0].residual < 1e-8
+
+def test_redundant_and_conflicting():
+    new = system(lambda a,b: constraints.HorizontalConstraint([a,b],[]),
+                 lambda a,b: constraints.HorizontalConstraint([b,a],[]),
+                 lambda a,b: constraints.DistanceConstraint(1.,[a,b],[]),
+                 lambda a,b: constraints.DistanceConstraint(2.,[a,b],[]))
+    diagnostics = new.diagnostics()
+    assert diagnostics.rank == 2
+    assert [[new.constraints.index(item) for item in group] for group in diagnostics.redundant] == [[0,1]]
+    assert [[new.constraints.index(item) for item in group] for group in diagnostics.conflicting] == [[2,3]]
+    assert 'conflicting' in diagnostics.report()
+
+def test_vertices_are_not_moved():
+    new = system(lambda a,b: constraints.FixedConstraint([a],[(0.,0.)]),
+                 lambda a,b: constraints.DistanceConstraint(2.,[a,b],[]))
+    positions = [vertex.getpos() for vertex in new.get_vertices]
+    diagnostics = new.diagnostics()
+    assert [vertex.getpos() for vertex in new.get_vertices] == positions
+    assert diagnostics.components[0].residual < 1e-8
+
+    kernels = popupcad.constraint_kernels
+    try:
+        popupcad.constraint_kernels = False
+        new.diagnostics()
+        assert new.diagnostics().counts.get('compile',0) > 0
+    finally:
+        popupcad.constraint_kernels = kernels
+        for constraint in new.constraints:
+            del constraint.generated_equations
+
+if __name__=='__main__':
+    test_rank_and_dof()
+    test_redundant_and_conflicting()
+    test_vertices_are_not_moved()
+    print('passed')
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import numpy
+import sympy
+import popupcad
+from popupcad.constraints import constraint_cache
+from popupcad.geometry.vertex import ShapeVertex
+from popupcad.constraints.constraint_system import ConstraintSystem
+import popupcad.constraints.constraints as constraints
+
+def sketch(seed=0):
+    r = numpy.random.RandomState(seed)
+    vertices = [ShapeVertex(tuple(r.rand(2) * 10 - 5)) for ii in range(8)]
+    a,b,c,d,e,f,g,h = [vertex.id for vertex in vertices]
+    items = []
+    items.append(constraints.FixedConstraint([a,b],[(1.,2.),(-3.,.5)]))
+    items.append(constraints.HorizontalConstraint([a,b,c],[]))
+    items.append(constraints.VerticalConstraint([d],[(e,f)]))
+    items.append(constraints.DistanceConstraint(2.5,[a,b],[]))
+    items.append(constraints.DistanceConstraint(0.,[c,d],[]))
+    items.append(constraints.CoincidentConstraint([a,b,c],[]))
+    items.append(constraints.XDistanceConstraint(1.5,[a],[]))
+    items.append(constraints.XDistanceConstraint(-1.5,[a,b],[]))
+    items.append(constraints.YDistanceConstraint(2.,[c],[]))
+    items.append(constraints.YDistanceConstraint(2.,[c,d],[]))
+    items.append(constraints.AngleConstraint(30.,[],[(a,b)]))
+    items.append(constraints.AngleConstraint(0.,[],[(a,b)]))
+    items.append(constraints.AngleConstraint(-60.,[],[(a,b),(c,d)]))
+    items.append(constraints.AngleConstraint(0.,[],[(a,b),(c,d)]))
+    items.append(constraints.ParallelLinesConstraint([],[(a,b),(c,d),(e,f)]))
+    items.append(constraints.EqualLengthLinesConstraint([],[(a,b),(c,d),(e,f)]))
+    items.append(constraints.PerpendicularLinesConstraint([],[(a,b),(g,h)]))
+    items.append(constraints.PointLineDistanceConstraint(0.,[g],[(a,h)]))
+    items.append(constraints.PointLineDistanceConstraint(1.2,[g],[(a,h)]))
+    items.append(constraints.LineMidpointConstraint([h],[(e,b)]))
+    return vertices, items
+
+def values(vertices):
+    return dict([(variable,value) for vertex in vertices for variable,value in zip(vertex.constraints_ref().variables(),vertex.getpos())])
+
+def symbolic(constraint,known):
+    equations = sympy.Matrix(constraint.symbolic_equations())
+    jacobian = equations.jacobian(constraint.variables)
+    f = numpy.array(equations.subs(known).evalf(),dtype=float).flatten()
+    j = numpy.array(jacobian.subs(known).evalf(),dtype=float).reshape(len(f),len(constraint.variables))
+    return f,j
+
+def test_kernels_match_symbolic():
+    vertices, items = sketch()
+    known = values(vertices)
+    for constraint in items:
+        assert constraint.terms is not None
+        args = [known[item] for item in constraint.variables]
+        f,j = symbolic(constraint,known)
+        assert constraint.num_equations() == len(f)
+        assert numpy.allclose(constraint.f_constraints(*args),f,rtol=1e-12,atol=1e-12), constraint.name
+        assert numpy.allclose(constraint.f_jacobian(*args),j,rtol=1e-12,atol=1e-12), constraint.name
+
+def test_flip_y():
+    flip_y = popupcad.flip_y
+    try:
+        for value in [True,False]:
+            popupcad.flip_y = value
+            vertices, items = sketch(1)
+            constraint = constraints.YDistanceConstraint(2.,[vertices[0].id],[])
+            known = values(vertices)
+            f,j = symbolic(constraint,known)
+            assert numpy.allclose(constraint.f_constraints(*[known[item] for item in constraint.variables]),f)
+    finally:
+        popupcad.flip_y = flip_y
+
+def system_residual(system):
+    generator = system.generator
+    q = system.inilist(generator.variables,system.ini(None))
+    return generator.variables,generator.residual(q),generator.sparse_jacobian(q).toarray()
+
+def test_system_matches_compiled():
+    vertices, items = sketch(2)
+    system = ConstraintSystem()
+    for constraint in items:
+        system.add_constraint(constraint)
+    system.get_vertices = lambda: vertices
+    variables1,f1,j1 = system_residual(system)
+
+    kernels = popupcad.constraint_kernels
+    try:
+        popupcad.constraint_kernels = False
+        for constraint in items:
+            del constraint.generated_equations
+        del system.generator
+        assert all([constraint.terms is None for constraint in items])
+        variables2,f2,j2 = system_residual(system)
+    finally:
+        popupcad.constraint_kernels = kernels
+
+    assert variables1 == variables2
+    assert numpy.allclose(f1,f2,rtol=1e-12,atol=1e-12)
+    assert numpy.allclose(j1,j2,rtol=1e-12,atol=1e-12)
+
+def test_constraint_cache():
+    vertices, items = sketch(3)
+    known = values(vertices)
+    folder = tempfile.mkdtemp()
+    settings = popupcad.constraint_cache_dir, popupcad.constraint_kernels
+    try:
+        popupcad.constraint_cache_dir = folder
+        popupcad.constraint_kernels = False
+        constraint_cache.clear()
+        for constraint in items:
+            del constraint.generated_equations
+            constraint.compiled
+        filenames = os.listdir(folder)
+        assert filenames
+
+        constraint_cache.clear()
+        keys = [constraint_cache.signature(constraint) for constraint in items]
+        assert all([constraint_cache.load(key) is not None for key in keys])
+        for constraint in items:
+            del constraint.generated_equations
+            args = [known[item] for item in constraint.variables]
+            f,j = symbolic(constraint,known)
+            assert numpy.allclose(constraint.f_constraints(*args),f,rtol=1e-12,atol=1e-12), constraint.name
+            assert numpy.allclose(numpy.array(constraint.f_jacobian(*args),dtype=float).reshape(j.shape),j,rtol=1e-12,atol=1e-12), constraint.name
+
+        filename = os.path.join(folder,filenames[0])
+        with open(filename,'r') as f:
+            data = json.load(f)
+        data['f'][0] = "Symbol(__import__('os').getcwd())"
+        with open(filename,'w') as f:
+            json.dump(data,f)
+        key = [item for item in keys if constraint_cache.cache_filename(item) == filename][0]
+        assert constraint_cache.load(key) is None
+        assert not os.path.exists(filename)
+    finally:
+        popupcad.constraint_cache_dir, popupcad.constraint_kernels = settings
+        constraint_cache.clear()
+        for constraint in items:
+            del constraint.generated_equations
+        shutil.rmtree(folder)
+
+if __name__=='__main__':
+    test_kernels_match_symbolic()
+    test_flip_y()
+    test_system_matches_compiled()
+    test_constraint_cache()
+    print('passed')
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import time
+import numpy
+import sympy
+import scipy.optimize
+import popupcad
+from popupcad.geometry.vertex import ShapeVertex
+from popupcad.constraints.constraint_support import Variable
+from popupcad.constraints.constraint_system import ConstraintSystem
+import popupcad.constraints.constraints as constraints
+
+def sketch(free=True):
+    '''
+    groups of constraints sharing no vertices: a linear one and two nonlinear
+    ones, each with a single solution nearby, and with free set, a linear one
+    free to slide and a nonlinear one free to turn. solving everything at
+    once with root(lm) often stalls on the free groups, so the solves compared
+    against it leave them out.
+    '''
+    positions = [(.02,-.01),(2.95,.03),(4.02,1.97),
+                 (5.01,4.98),(6.95,5.04),
+                 (-3.,1.),(-2.2,1.3),
+                 (8.,-2.),(8.2,-1.1),(9.,0.),
+                 (-4.,-3.),(-3.9,-1.6)]
+    vertices = [ShapeVertex(item) for item in positions]
+    a,b,c,d,e,f,g,h,i,j,k,l = [vertex.id for vertex in vertices]
+    items = []
+    items.append(constraints.FixedConstraint([a],[(0.,0.)]))
+    items.append(constraints.XDistanceConstraint(3.,[a,b],[]))
+    items.append(constraints.HorizontalConstraint([a,b],[]))
+    items.append(constraints.XDistanceConstraint(1.,[b,c],[]))
+    items.append(constraints.YDistanceConstraint(2.,[b,c],[]))
+    items.append(constraints.FixedConstraint([d],[(5.,5.)]))
+    items.append(constraints.HorizontalConstraint([d,e],[]))
+    items.append(constraints.DistanceConstraint(2.,[d,e],[]))
+    items.append(constraints.FixedConstraint([k],[(-4.,-3.)]))
+    items.append(constraints.VerticalConstraint([k,l],[]))
+    items.append(constraints.DistanceConstraint(1.5,[k,l],[]))
+    if free:
+        items.append(constraints.HorizontalConstraint([f,g],[]))
+        items.append(constraints.XDistanceConstraint(1.,[f,g],[]))
+        items.append(constraints.FixedConstraint([h],[(8.,-2.)]))
+        items.append(constraints.DistanceConstraint(1.,[h,i],[]))
+        items.append(constraints.DistanceConstraint(2.,[i,j],[]))
+    system = ConstraintSystem()
+    for item in items:
+        system.add_constraint(item)
+    system.get_vertices = lambda: vertices
+    return system,vertices
+
+#the vertices which have only one solution nearby
+determined = [0,1,2,3,4,10,11]
+
+def positions(vertices):
+    return numpy.array([vertex.getpos() for vertex in vertices],dtype=float)
+
+def reference_functions(system):
+    '''the residual and dense jacobian of the whole system, lambdified from its equations as before they were assembled sparsely'''
+    equations = sympy.Matrix([equation for constraint in system.constraints for equation in constraint.generated_equations])
+    variables = sorted(set(equations.atoms(Variable)),key=lambda item:str(item))
+    symbols = [sympy.Symbol(str(item)) for item in variables]
+    equations = equations.xreplace(dict(zip(variables,symbols)))
+    f = sympy.lambdify(symbols,equations,modules='numpy')
+    j = sympy.lambdify(symbols,equations.jacobian(symbols),modules='numpy')
+    n_eq,n_vars = len(equations),len(variables)
+    def dq(q):
+        return numpy.r_[numpy.array(f(*q),dtype=float).flatten(),numpy.zeros(max(n_vars-n_eq,0))]
+    def jac(q):
+        return numpy.r_[numpy.array(j(*q),dtype=float).reshape(n_eq,n_vars),numpy.zeros((max(n_vars-n_eq,0),n_vars))]
+    return variables,dq,jac
+
+def reference_update(system):
+    '''solves the whole system at once with a dense root(lm), as update did before it was split into components'''
+    variables,dq,jac = reference_functions(system)
+    q0 = system.inilist(variables,system.ini(None))
+    qout = scipy.optimize.root(dq,q0,jac=jac,tol=system.atol,method='lm')
+    system.set_variables(variables,qout.x)
+
+def reference_shift(system,items):
+    '''moves vertices along the null space of the full jacobian, found by its svd, as constrained_shift did before drags'''
+    variables,dq,jac = reference_functions(system)
+    dx = numpy.zeros(len(variables))
+    for vertex,dxdy in items:
+        for key,value in zip(vertex.constraints_ref().variables(),dxdy):
+            dx[variables.index(key)] = value
+    x0 = system.inilist(variables,system.ini(None))
+    L,S,R = numpy.linalg.svd(jac(x0))
+    m = (abs(S) > (abs(S[0]) / 100)).sum()
+    rnull = R[m:]
+    system.set_variables(variables,x0 + rnull.T.dot(rnull.dot(dx)))
+
+def residual(system):
+    variables,dq,jac = reference_functions(system)
+    return abs(dq(system.inilist(variables,system.ini(None)))).max()
+
+def test_sparse_assembly():
+    system,vertices = sketch()
+    variables,dq,jac = reference_functions(system)
+    generator = system.generator
+    assert [str(item) for item in generator.variables] == [str(item) for item in variables]
+    r = numpy.random.RandomState(0)
+    for ii in range(3):
+        q = r.rand(len(variables))*10-5
+        n_eq = generator.system.n_eq
+        assert numpy.allclose(generator.residual(q),dq(q)[:n_eq],rtol=1e-12,atol=1e-12)
+        assert numpy.allclose(generator.sparse_jacobian(q).toarray(),jac(q)[:n_eq],rtol=1e-12,atol=1e-12)
+
+def test_sparse_solve():
+    threshold = popupcad.sparse_constraint_threshold
+    try:
+        for value in [threshold,0]:
+            popupcad.sparse_constraint_threshold = value
+            system,vertices = sketch()
+            reference,reference_vertices = sketch(False)
+            system.update()
+            reference_update(reference)
+            assert residual(system) < 1e-8
+            assert residual(reference) < 1e-8
+            assert numpy.allclose(positions(vertices)[determined],positions(reference_vertices)[determined],atol=1e-8)
+    finally:
+        popupcad.sparse_constraint_threshold = threshold
+
+def test_components():
+    system,vertices = sketch()
+    components = system.generator.components()
+    # the sliding pair's x and y coordinates are not tied to each other
+    assert len(components) == 6
+    variables = numpy.concatenate([component.variables for component in components])
+    assert sorted(variables.tolist()) == list(range(system.generator.n_vars()))
+
+    system.update()
+    assert residual(system) < 1e-8
+    solved = positions(vertices)
+
+    reference,reference_vertices = sketch(False)
+    [item.setpos(tuple(position)) for item,position in zip(reference_vertices,solved)]
+    vertices[1].setpos((3.5,.7))
+    vertices[4].setpos((6.5,5.3))
+    reference_vertices[4].setpos((6.5,5.3))
+    system.update([vertices[4]])
+    reference_update(reference)
+    assert positions(vertices)[1].tolist() == [3.5,.7]
+    assert numpy.allclose(positions(vertices)[4],positions(reference_vertices)[4],atol=1e-8)
+    assert numpy.allclose(positions(vertices)[4],solved[4],atol=1e-8)
+    assert (numpy.delete(positions(vertices),[1,4],0) == numpy.delete(solved,[1,4],0)).all()
+
+def test_drag():
+    system,vertices = sketch()
+    system.update()
+    reference,reference_vertices = sketch()
+    [item.setpos(tuple(position)) for item,position in zip(reference_vertices,positions(vertices))]
+
+    # along a linear constraint the drag and the svd projection agree exactly
+    for ii in range(5):
+        system.constrained_shift([(vertices[5],(.1,.05))])
+        reference_shift(reference,[(reference_vertices[5],(.1,.05))])
+    assert numpy.allclose(positions(vertices),positions(reference_vertices),atol=1e-10)
+    assert system._drag.factorizations == len(system._drag.components)
+
+    # around a nonlinear one the svd projection drifts off the constraints,
+    # while the drag steps back onto them, reusing its factorization
+    moves = 20
+    before = positions(vertices)
+    for ii in range(moves):
+        system.constrained_shift([(vertices[8],(-.01,.01))])
+        reference_shift(reference,[(reference_vertices[8],(-.01,.01))])
+    drag = system._drag
+    assert drag.moves == moves
+    assert drag.factorizations < moves
+    assert residual(system) < 1e-8
+    assert residual(reference) > residual(system)
+    assert numpy.allclose(positions(vertices),positions(reference_vertices),atol=5e-2)
+    assert (numpy.delete(positions(vertices),[8,9],0) == numpy.delete(before,[8,9],0)).all()
+
+    system.update()
+    reference.update()
+    assert not hasattr(system,'_drag')
+    assert residual(system) < 1e-8
+    assert numpy.allclose(positions(vertices),positions(reference_vertices),atol=5e-2)
+
+class Clock(object):
+    '''a clock which advances a second every time it is read'''
+    def __init__(self):
+        self.now = 0.
+    def time(self):
+        self.now += 1.
+        return self.now
+
+def test_drag_budget():
+    import popupcad.constraints.constraint_system as constraint_system
+    budget = popupcad.drag_time_budget
+    try:
+        system,vertices = sketch()
+        system.update()
+        # each move has time for one slow correction, but not for the
+        # refactorization it calls for. the first move factors anyway
+        popupcad.drag_time_budget = 2.5
+        constraint_system.time = Clock()
+        for ii in range(5):
+            system.constrained_shift([(vertices[8],(-.2,.2))])
+        assert system._drag.moves == 5
+        assert system._drag.factorizations == len(system._drag.components)
+    finally:
+        constraint_system.time = time
+        popupcad.drag_time_budget = budget
+
+if __name__=='__main__':
+    test_sparse_assembly()
+    test_sparse_solve()
+    test_components()
+    test_drag()
+    test_drag_budget()
+    print('passed')
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import io
+import re
+import glob
+import time
+import shutil
+import tempfile
+import yaml
+import popupcad
+import dev_tools.streamingyaml as streamingyaml
+import popupcad.filetypes.binary_format as binary_format
+from popupcad.filetypes.design import Design
+from popupcad.filetypes.journal import Journal
+from popupcad.filetypes.backup_store import BackupStore
+from popupcad.filetypes.dxfimport import DXFImport
+
+source = os.path.join(popupcad.supportfiledir, 'test_files', 'basic_operations.cad')
+
+def canonical(text):
+    '''yaml text with its anchors numbered in order of appearance'''
+    names = {}
+    def rename(match):
+        names.setdefault(match.group(2), 'id{0:03d}'.format(len(names) + 1))
+        return match.group(1) + names[match.group(2)]
+    return re.sub(r'([&*])(id\d+)', rename, text)
+
+def dump(design):
+    return canonical(yaml.dump(design))
+
+def load(folder):
+    filename = os.path.join(folder, 'design.cad')
+    shutil.copyfile(source, filename)
+    design = Design.load_yaml(filename)
+    design.save_yaml(filename)
+    return design
+
+def same_file(design, reference):
+    design.updatefilename(reference.filename())
+    assert dump(design) == dump(reference)
+
+def test_streaming_dumper():
+    design = Design.load_yaml(source)
+    stream = io.StringIO()
+    streamingyaml.dump(design, stream)
+    assert canonical(stream.getvalue()) == dump(design)
+
+def test_processed_outputs_are_not_saved():
+    folder = tempfile.mkdtemp()
+    try:
+        design = load(folder)
+        expected = dump(design)
+        design.reprocessoperations()
+        assert all([hasattr(operation, 'output') for operation in design.operations])
+        assert dump(design) == expected
+    finally:
+        shutil.rmtree(folder)
+
+def test_binary_round_trip():
+    folder = tempfile.mkdtemp()
+    try:
+        design = load(folder)
+        binary = os.path.join(folder, 'design.cadb')
+        yaml_again = os.path.join(folder, 'again.cad')
+        binary_format.convert(design.filename(), binary)
+        assert binary_format.is_binary(binary)
+        binary_format.convert(binary, yaml_again)
+        for lazy in [False, True]:
+            for filename in [design.filename(), binary, yaml_again]:
+                new = Design.load_yaml(filename, lazy=lazy)
+                same_file(new, design)
+        lazy = Design.load_yaml(binary, lazy=True)
+        eager = Design.load_yaml(binary, lazy=False)
+        key = list(eager.sketches.keys())[0]
+        assert dump(lazy.sketches[key]) == dump(eager.sketches[key])
+    finally:
+        shutil.rmtree(folder)
+
+def test_binary_does_not_import_modules():
+    import sys
+    import json
+    import numpy
+    arrays = binary_format.encode(Design.load_yaml(source))
+    header = json.loads(arrays['tree'].tobytes().decode('utf-8'))
+    header['classes'].append('this:s')
+    arrays['tree'] = numpy.frombuffer(json.dumps(header).encode('utf-8'), dtype=numpy.uint8)
+    stream = io.BytesIO()
+    binary_format.write_arrays(arrays, stream)
+    sys.modules.pop('this', None)
+    try:
+        binary_format.loads(stream.getvalue())
+    except Exception as ex:
+        assert 'this' in str(ex)
+    else:
+        assert False, 'a file naming an unimported module should not load'
+    assert 'this' not in sys.modules
+
+def test_current_files_are_not_upgraded():
+    folder = tempfile.mkdtemp()
+    backupdir = popupcad.backupdir
+    upgrade = Design.upgrade
+    try:
+        popupcad.backupdir = os.path.join(folder, 'backups')
+        design = load(folder)
+        assert design.is_current()
+        manifests = glob.glob(os.path.join(popupcad.backupdir, '*.' + BackupStore.extension))
+        assert len(manifests) == 1
+
+        def fail(self, *args, **kwargs):
+            raise Exception('current files should not be upgraded')
+        Design.upgrade = fail
+        Design.load_yaml(design.filename())
+        assert glob.glob(os.path.join(popupcad.backupdir, '*.' + BackupStore.extension)) == manifests
+    finally:
+        Design.upgrade = upgrade
+        popupcad.backupdir = backupdir
+        shutil.rmtree(folder)
+
+def test_journal_replay():
+    folder = tempfile.mkdtemp()
+    try:
+        design = load(folder)
+        journal = Journal(design, folder)
+        journal.start(design.filename())
+        first, second = design.operations[0], design.operations[-1]
+        first.customname = 'first edit'
+        journal.operation_changed(first)
+        journal.flush()
+        size = os.path.getsize(journal.journal_filename())
+        second.customname = 'second edit'
+        journal.operation_changed(second)
+        journal.flush()
+
+        recovered = Journal.recover(journal.journal_filename())
+        assert recovered.operations[0].customname == 'first edit'
+        assert recovered.operations[-1].customname == 'second edit'
+
+        with open(journal.journal_filename(), 'rb+') as f:
+            f.truncate(os.path.getsize(journal.journal_filename()) - 3)
+        assert os.path.getsize(journal.journal_filename()) > size
+        recovered = Journal.recover(journal.checkpoint_filename())
+        assert recovered.operations[0].customname == 'first edit'
+        assert recovered.operations[-1].customname != 'second edit'
+    finally:
+        shutil.rmtree(folder)
+
+def test_backup_store():
+    folder = tempfile.mkdtemp()
+    try:
+        design = load(folder)
+        store = BackupStore(os.path.join(folder, 'backups'))
+        objects = os.path.join(store.objects_folder, '*', '*.*')
+        manifest1 = store.backup(design, '_1_')
+        expected = dump(design)
+        count = len(glob.glob(objects))
+        design.operations[-1].customname = 'edited'
+        manifest2 = store.backup(design, '_2_')
+        assert len(glob.glob(objects)) == count + 1
+        restored = Design.load_backup(manifest1, upgrade=False)
+        restored.updatefilename(design.filename())
+        assert dump(restored) == expected
+        same_file(Design.load_backup(manifest2, upgrade=False), design)
+
+        time.sleep(.01)
+        pending = store.put({'not yet': 'in a manifest'})
+        store.collect_garbage()
+        assert os.path.exists(store.object_filename(pending))
+        os.utime(store.object_filename(pending), (0, 0))
+        store.collect_garbage()
+        assert not os.path.exists(store.object_filename(pending))
+        assert len(glob.glob(objects)) == count + 1
+    finally:
+        shutil.rmtree(folder)
+
+def test_embedded_outputs():
+    folder = tempfile.mkdtemp()
+    settings = popupcad.embed_outputs, popupcad.output_version
+    try:
+        popupcad.embed_outputs = True
+        design = load(folder)
+        design.reprocessoperations()
+        design.save_yaml(design.filename())
+        embedded = [op.id for op in design.operations if op.output_is_embeddable]
+        assert embedded
+        loaded = Design.load_yaml(design.filename())
+        assert [op.id for op in loaded.operations if hasattr(op, 'output')] == embedded
+        popupcad.output_version += 1
+        loaded = Design.load_yaml(design.filename())
+        assert not any([hasattr(op, 'output') for op in loaded.operations])
+    finally:
+        popupcad.embed_outputs, popupcad.output_version = settings
+        shutil.rmtree(folder)
+
+def test_dxf_splines():
+    import ezdxf
+    folder = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(folder, 'splines.dxf')
+        document = ezdxf.new()
+        modelspace = document.modelspace()
+        modelspace.add_line((0, 0), (1, 0))
+        modelspace.add_open_spline([(0, 0), (1, 2), (3, 2), (4, 0)], degree=3)
+        modelspace.add_spline(fit_points=[(0, 0), (1, 1), (2, 0), (3, 1)])
+        modelspace.add_spline()
+        document.saveas(filename)
+        importer = DXFImport(filename)
+        generics = importer.read()['0']
+        assert importer.counts == {'LINE': 1, 'SPLINE': 1, 'FIT SPLINE': 1, 'BAD SPLINE': 1}
+        assert len(generics) == 3
+        assert generics[2].exteriorpoints() == [(0, 0), (1, 1), (2, 0), (3, 1)]
+        assert 'BAD SPLINE' in importer.report() and '(skipped)' in importer.report()
+    finally:
+        shutil.rmtree(folder)
+
+if __name__=='__main__':
+    test_streaming_dumper()
+    test_processed_outputs_are_not_saved()
+    test_binary_round_trip()
+    test_binary_does_not_import_modules()
+    test_current_files_are_not_upgraded()
+    test_journal_replay()
+    test_backup_store()
+    test_embedded_outputs()
+    test_dxf_splines()
+    print('passed')
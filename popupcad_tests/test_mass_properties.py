@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+import popupcad
+from popupcad.filetypes.genericshapes import GenericPoly
+
+def compare(poly, density, z_lower, z_upper):
+    area,centroid,volume,mass,moments = poly.mass_properties(density,z_lower,z_upper)
+    area2,centroid2,volume2,mass2,tris = poly.mass_properties_triangulated(density,z_lower,z_upper)
+    about_point = centroid + numpy.array([.001,-.002,.0005])
+    I = poly.inertia_tensor(about_point,density,z_lower,z_upper,moments)
+    I2 = poly.inertia_tensor_triangulated(about_point,density,z_lower,z_upper,tris)
+
+    assert numpy.isclose(area,area2,rtol=1e-9)
+    assert numpy.isclose(volume,volume2,rtol=1e-9)
+    assert numpy.isclose(mass,mass2,rtol=1e-9)
+    assert numpy.allclose(centroid,centroid2,rtol=1e-9,atol=1e-12)
+    assert numpy.allclose(I,I2,rtol=1e-8,atol=1e-8*abs(I2).max())
+
+def test_polygon():
+    poly = GenericPoly.gen_from_point_lists([[0,0],[0,1],[1,2],[2,1],[2,-1],[1,-2],[0,-1]],[])
+    compare(poly,1000,-.1,.1)
+
+def test_polygon_with_holes():
+    exterior = [[0,0],[10,0],[10,10],[0,10]]
+    interiors = [[[1,1],[1,3],[3,3],[3,1]],[[5,5],[8,6],[6,8]]]
+    poly = GenericPoly.gen_from_point_lists(exterior,interiors)
+    compare(poly,1400,.5,1.2)
+
+def test_clockwise_polygon():
+    poly = GenericPoly.gen_from_point_lists([[0,0],[0,4],[3,5],[6,1]],[[[2,2],[3,3],[4,2]]])
+    compare(poly,800,0,.3)
+
+if __name__=='__main__':
+    test_polygon()
+    test_polygon_with_holes()
+    test_clockwise_polygon()
+    print('passed')
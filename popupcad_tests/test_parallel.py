@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import os
+import sys
+import types
+import popupcad
+import popupcad.algorithms.parallel as parallel
+
+def square(x):
+    return x * x, os.getpid()
+
+def test_map_parallel_spawn():
+    settings = popupcad.parallel_processes, popupcad.parallel_start_method
+    parallel.shutdown()
+    try:
+        popupcad.parallel_processes = 2
+        popupcad.parallel_start_method = 'spawn'
+        results = parallel.map_parallel(square, range(8), threshold=2)
+        done = []
+        results2 = parallel.map_parallel(square, range(8), threshold=2, callback=lambda ii, n: done.append(ii))
+    finally:
+        parallel.shutdown()
+        popupcad.parallel_processes, popupcad.parallel_start_method = settings
+    assert [item for item, pid in results] == [item * item for item in range(8)]
+    assert [item for item, pid in results2] == [item * item for item in range(8)]
+    assert done == list(range(1, 9))
+    assert os.getpid() not in [pid for item, pid in results + results2]
+
+def test_start_method_in_gui():
+    class Application(object):
+        running = None
+        @classmethod
+        def instance(cls):
+            return cls.running
+    settings = popupcad.parallel_start_method
+    module = sys.modules.get('qt.QtCore')
+    try:
+        popupcad.parallel_start_method = None
+        sys.modules['qt.QtCore'] = types.SimpleNamespace(QCoreApplication=Application)
+        assert parallel.start_method() is None
+        Application.running = Application()
+        assert parallel.start_method() == 'spawn'
+        popupcad.parallel_start_method = 'forkserver'
+        assert parallel.start_method() == 'forkserver'
+    finally:
+        popupcad.parallel_start_method = settings
+        if module is None:
+            del sys.modules['qt.QtCore']
+        else:
+            sys.modules['qt.QtCore'] = module
+
+if __name__=='__main__':
+    test_map_parallel_spawn()
+    test_start_method_in_gui()
+    print('passed')
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+import popupcad
+import popupcad.algorithms.points as points
+from popupcad.algorithms.getjoints import getjoints
+from popupcad.algorithms.vertex_index import VertexIndex
+from popupcad.filetypes.genericshapes import GenericPoly
+from popupcad.geometry.vertex import ShapeVertex
+from popupcad.filetypes.genericshapebase import GenericShapeBase
+from popupcad.filetypes.genericlaminate import GenericLaminate
+from popupcad.filetypes.operationoutput import OperationOutput
+
+tolerance = 1e-5
+
+def reference_pointinpoints(pt1, pts, tolerance):
+    tests = [points.twopointsthesame(pt1, pt2, tolerance) for pt2 in pts]
+    return True in tests
+
+def reference_remove_redundant_points(pts, tolerance, loop_test=True):
+    newpoints = []
+    if len(pts)>0:
+        pts = pts[:]
+        newpoints.append(pts.pop(0))
+        while not not pts:
+            newpoint = pts.pop(0)
+            if not points.twopointsthesame(newpoints[-1],newpoint,tolerance):
+                if len(pts)==0 and loop_test:
+                    if not points.twopointsthesame(newpoints[0],newpoint,tolerance):
+                        newpoints.append(newpoint)
+                else:
+                    newpoints.append(newpoint)
+    return newpoints
+
+def reference_order_vertices(vertices, segment_seed, tolerance):
+    vertices = list(set(vertices))
+    ordering = list(segment_seed)
+    while vertices:
+        c = vertices.pop()
+        a = ordering[0]
+        b = ordering[-1]
+        if points.point_within_line(a, [c, b], tolerance):
+            ordering.insert(0, c)
+        elif points.point_within_line(b, [a, c], tolerance):
+            ordering.append(c)
+        else:
+            for ii, b in enumerate(ordering[1:]):
+                if points.point_within_line(c, [a, b], tolerance):
+                    ordering.insert(ii + 1, c)
+                    break
+    return ordering
+
+def reference_shared_segments(lines, roundvalue):
+    '''the shared segments found the way getjoints found them before it was vectorized'''
+    tolerance = 10**(-roundvalue)
+    m = numpy.c_[[points.distance_of_lines(lines, point) for point in [[0, 0], [10 * tolerance, 0], [10 * tolerance, 10 * tolerance], [0, 10 * tolerance], [10 * tolerance, 20 * tolerance]]]].T
+    m2 = [tuple(items) for items in m.round(roundvalue).tolist()]
+    m3 = list(set(m2))
+    indeces_to_orig = [[] for item in m3]
+    [indeces_to_orig[m3.index(item)].append(ii) for ii, item in enumerate(m2)]
+    newsegments = []
+    for segments in indeces_to_orig:
+        if len(segments) > 1:
+            a = [lines[ii] for ii in segments]
+            vertices = []
+            [vertices.extend(item) for item in a[1:]]
+            ordered_vertices = reference_order_vertices(vertices, a[0], tolerance)
+            segs = list(zip(ordered_vertices[:-1], ordered_vertices[1:]))
+            midpoints = points.segment_midpoints(segs)
+            count = [0 for item in midpoints]
+            for ii in segments:
+                for jj, point in enumerate(midpoints):
+                    if points.point_within_line(point, lines[ii], tolerance):
+                        count[jj] += 1
+            newsegments.extend([seg for count_ii, seg in zip(count, segs) if count_ii > 1])
+    return newsegments
+
+def normalize(segments, roundvalue):
+    return sorted([tuple(sorted([tuple(numpy.round(p, roundvalue - 1) + 0.) for p in segment])) for segment in segments])
+
+def geom_lines(geoms):
+    lines = []
+    for geom in geoms:
+        p = geom.exteriorpoints()
+        lines.extend(zip(p, p[1:] + p[:1]))
+    return lines
+
+def compare_joints(geoms, roundvalue=5):
+    lines = geom_lines(geoms)
+    found = [tuple(tuple(p) for p in item.exteriorpoints()) for item in getjoints(geoms, roundvalue)]
+    assert normalize(found, roundvalue) == normalize(reference_shared_segments(lines, roundvalue), roundvalue)
+    return found
+
+def test_getjoints_grid():
+    geoms = []
+    for ii in range(4):
+        for jj in range(3):
+            geoms.append(GenericPoly.gen_from_point_lists([[ii, jj], [ii + 1, jj], [ii + 1, jj + 1], [ii, jj + 1]], []))
+    assert len(compare_joints(geoms)) == 3 * 3 + 4 * 2
+
+def test_getjoints_collinear_overlap():
+    geoms = [GenericPoly.gen_from_point_lists([[0, 0], [4, 0], [4, 1], [0, 1]], []),
+             GenericPoly.gen_from_point_lists([[2, 1], [6, 1], [6, 3], [2, 3]], []),
+             GenericPoly.gen_from_point_lists([[1, 1], [3, 1], [3, -2], [1, -2]], [])]
+    found = compare_joints(geoms)
+    assert len(found) == 3
+
+def test_getjoints_near_tolerance():
+    offset = .3 * tolerance
+    geoms = [GenericPoly.gen_from_point_lists([[0, 0], [2, 0], [2, 1], [0, 1]], []),
+             GenericPoly.gen_from_point_lists([[2 + offset, .5], [3, .5], [3, 2], [2 + offset, 2]], [])]
+    assert len(compare_joints(geoms)) == 1
+
+def test_point_predicates():
+    r = numpy.random.RandomState(0)
+    lines = r.rand(200, 2, 2) * 10
+    t = r.rand(200, 1) * 1.4 - .2
+    normal = (lines[:, 1] - lines[:, 0])[:, ::-1] * [1, -1]
+    normal /= (normal**2).sum(1, keepdims=True)**.5
+    offsets = r.choice([0, .5 * tolerance, 2 * tolerance, .1], size=(200, 1))
+    pts = lines[:, 0] + t * (lines[:, 1] - lines[:, 0]) + offsets * normal
+    on = points.points_on_lines(pts, lines, tolerance)
+    within = points.points_within_lines(pts, lines, tolerance)
+    assert on.tolist() == [points.point_on_line(p, l, tolerance) for p, l in zip(pts, lines)]
+    assert within.tolist() == [points.point_within_line(p, l, tolerance) for p, l in zip(pts, lines)]
+    assert on.any() and not on.all() and within.any()
+
+def test_pointsinpoints():
+    r = numpy.random.RandomState(1)
+    pts2 = r.rand(400, 2)
+    near = pts2[:300] + r.choice([.5 * tolerance, 2 * tolerance], size=(300, 1)) * [[.6, .8]]
+    pts1 = numpy.r_[near, r.rand(300, 2)]
+    expected = [reference_pointinpoints(p, pts2, tolerance) for p in pts1]
+    assert points.pointsinpoints(pts1, pts2, tolerance).tolist() == expected
+    assert points.pointsinpoints(pts1[:5], pts2, tolerance).tolist() == expected[:5]
+    assert points.pointinpoints(pts1[0], pts2, tolerance) == expected[0]
+    index = VertexIndex(pts2)
+    assert points.pointsinpoints(pts1[:5], index, tolerance).tolist() == expected[:5]
+    large = numpy.r_[pts1, pts1]
+    assert points.pointsinpoints(large, numpy.r_[pts2, pts2], tolerance).tolist() == expected * 2
+
+def test_remove_redundant_points():
+    step = .4 * popupcad.distinguishable_number_difference
+    chain = [(ii * step, 0.) for ii in range(10)]
+    loops = [chain + [(1., 0.), (1., 1.), (0., 1.)],
+             [(0., 0.), (1., 0.)] + [(1. + ii * step, ii * step) for ii in range(1, 6)] + [(1., 1.), (0., step)],
+             [(0., 0.)], [(0., 0.), (0., step)]]
+    r = numpy.random.RandomState(2)
+    loops.append([tuple(item) for item in (r.rand(300, 2) * 4 * popupcad.distinguishable_number_difference).cumsum(0)])
+    for loop in loops:
+        for loop_test in [True, False]:
+            vertices = [ShapeVertex(item) for item in loop]
+            kept = GenericShapeBase.remove_redundant_points(vertices, loop_test=loop_test)
+            assert [vertex.getpos() for vertex in kept] == reference_remove_redundant_points(loop, popupcad.distinguishable_number_difference, loop_test)
+    assert len(GenericShapeBase.remove_redundant_points([ShapeVertex(item) for item in loops[0]])) == 7
+
+def test_weld():
+    d = popupcad.distinguishable_number_difference
+    pts = [(5., 5.), (0., 0.), (5. + .5 * d, 5.), (.6 * d, 0.), (1.2 * d, 0.), (9., 9.)]
+    representatives, index_map = VertexIndex(pts).weld(d)
+    # the first and last of the chain are further apart than d, but still weld
+    assert representatives.tolist() == [0, 1, 5]
+    assert index_map.tolist() == [0, 1, 0, 1, 1, 2]
+    empty = VertexIndex([]).weld(d)
+    assert [len(item) for item in empty] == [0, 0]
+
+def test_getcontrols_welds_shared_edges():
+    d = popupcad.distinguishable_number_difference
+    left = GenericPoly.gen_from_point_lists([(0., 0.), (1., 0.), (1., 1.), (0., 1.)], [])
+    right = GenericPoly.gen_from_point_lists([(1. + .5 * d, 0.), (2., 0.), (2., 1.), (1. + .5 * d, 1.)], [])
+    laminate = GenericLaminate(None, {'layer': [left, right]})
+    controlpoints, controllines, unique_geoms = OperationOutput.getcontrols(laminate)
+    assert sorted([vertex.getpos() for vertex in controlpoints]) == [(0., 0.), (0., 1.), (1., 0.), (1., 1.), (2., 0.), (2., 1.)]
+    # the shared edge is one line, and every line ends on a control point
+    assert len(controllines) == 7
+    ids = [id(vertex) for vertex in controlpoints]
+    for line in controllines:
+        assert id(line.vertex1) in ids and id(line.vertex2) in ids
+    assert len(unique_geoms) == 2
+
+if __name__=='__main__':
+    test_getjoints_grid()
+    test_getjoints_collinear_overlap()
+    test_getjoints_near_tolerance()
+    test_point_predicates()
+    test_pointsinpoints()
+    test_remove_redundant_points()
+    test_weld()
+    test_getcontrols_welds_shared_edges()
+    print('passed')
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes and CONTRIBUTORS
+Email: danaukes<at>asu.edu.
+Please see LICENSE for full license.
+"""
+
+import numpy
+import shapely.geometry as sg
+import popupcad
+from popupcad.algorithms import raster
+
+def test_coverage_of_polygon_with_hole():
+    polygon = sg.Polygon([(0,0),(10,0),(10,7),(3,9),(0,6)],[[(2,2),(6,2.5),(5,5),(2.5,4)]])
+    loops = [numpy.array(polygon.exterior.coords)] + [numpy.array(item.coords) for item in polygon.interiors]
+    layers = [((1,0,0,1),loops,[])]
+    shape,lower,upper,scale = raster.frame(layers,size=(400,300))
+    result = raster.coverage(loops,shape,lower,upper,scale,samples=4)
+    assert abs(result.sum()/scale**2-polygon.area)/polygon.area < .01
+
+def test_strokes_and_background():
+    loops = [numpy.array([(0,0),(4,0),(4,4),(0,4)],dtype=float)]
+    strokes = [numpy.array([(5,0),(9,4)],dtype=float),numpy.array([(8,1)],dtype=float)]
+    layers = [((0,0,1,1),loops,strokes)]
+    shape,lower,upper,scale = raster.frame(layers,size=(100,50))
+    mask = raster.layer_coverage(loops,strokes,shape,lower,upper,scale)
+    x,y = raster.pixel_coordinates(numpy.array([(7,2),(8,1),(6,3)],dtype=float),lower,upper,scale)
+    assert mask[int(y[0]),int(x[0])] == 1
+    assert mask[int(y[1]),int(x[1])] == 1
+    assert mask[int(y[2]),int(x[2])] == 0
+    image = raster.composite([((0,0,1,1),mask)],shape,popupcad.graphics_scene_background_color)
+    assert (image[:,:,3] == 255).all()
+    assert numpy.allclose(image[int(y[2]),int(x[2]),:3]/255.,popupcad.graphics_scene_background_color[:3],atol=1/255.)
+
+if __name__=='__main__':
+    test_coverage_of_polygon_with_hole()
+    test_strokes_and_background()
+    print('passed')